@@ -20,8 +20,9 @@ except ImportError:
 # Append parent directory to sys.path to enable importing from utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.model_utils import load_model, make_prediction
-from utils.data_utils import save_prediction_data, load_student_data
+from utils.model_utils import load_model, make_prediction, make_predictions, prediction_records, explain_prediction, warm_up_model, FEATURE_DISPLAY_NAMES
+from utils.data_utils import save_prediction_data, save_prediction_records
+from utils.analytics_snapshot import load_prediction_frame
 from utils.image_base64 import get_base64_images # Only need this for the image dict
 from utils.language_utils import get_text, load_app_settings, save_app_settings
 
@@ -49,6 +50,17 @@ st.set_page_config(
 # Apply modern UI styles - CRITICAL to be at the top of the script
 add_exact_ui_styles()
 
+@st.cache_resource(show_spinner=False)
+def start_model_warmup():
+    """Start loading (or, if missing, training) the model in the background, once per server process"""
+    return warm_up_model()
+
+start_model_warmup()
+
+# Columns read from the analytics snapshot by Historical Analysis
+HISTORICAL_COLUMNS = ['timestamp', 'student_name', 'risk_level', 'math_score', 'reading_score',
+                      'writing_score', 'attendance', 'behavior', 'literacy', 'probability']
+
 # Initialize language and theme in session state (these are usually inherited from app.py)
 if 'app_language' not in st.session_state:
     settings = load_app_settings()
@@ -197,6 +209,29 @@ def create_risk_visualization(prediction_prob, student_data):
     
     return fig_gauge, fig_radar
 
+def create_contribution_chart(student_data):
+    """Create a bar chart of how much each input pushed the risk up or down"""
+    explanation = explain_prediction(student_data)
+    if explanation is None:
+        return None
+    
+    contributions = explanation['contributions']
+    features = sorted(contributions, key=lambda feature: contributions[feature])
+    values = [contributions[feature] * 100 for feature in features]
+    
+    fig_contrib = go.Figure(go.Bar(
+        x=values,
+        y=[FEATURE_DISPLAY_NAMES[feature] for feature in features],
+        orientation='h',
+        marker_color=["red" if value > 0 else "lightgreen" for value in values]
+    ))
+    fig_contrib.update_layout(
+        title=f"Why this result? (baseline risk {explanation['base_value']:.1%})",
+        xaxis_title="Contribution to risk (percentage points)",
+        height=350
+    )
+    return fig_contrib
+
 def display_recommendations(risk_level, student_data):
     """Display personalized recommendations based on risk level"""
     
@@ -540,6 +575,10 @@ def main():
                         st.plotly_chart(fig_radar, use_container_width=True)
                         st.markdown('</div>', unsafe_allow_html=True)
                     
+                    fig_contrib = create_contribution_chart(student_data)
+                    if fig_contrib is not None:
+                        st.plotly_chart(fig_contrib, use_container_width=True)
+                    
                     # Image removed from here, replaced with animated fallback in previous iteration
                     st.markdown(f"""
                     <div class="results-section section-animated-text">
@@ -634,6 +673,10 @@ def main():
                 st.plotly_chart(fig_radar, use_container_width=True)
                 st.markdown('</div>', unsafe_allow_html=True)
             
+            fig_contrib = create_contribution_chart(student_data)
+            if fig_contrib is not None:
+                st.plotly_chart(fig_contrib, use_container_width=True)
+            
             # Image removed, replaced by animated fallback
             st.markdown(f"""
             <div class="results-section section-animated-text">
@@ -685,36 +728,39 @@ def main():
                     st.dataframe(df.head())
                     
                     if st.button("Process Batch Predictions", key="process_batch_predictions_button"):
-                        progress_bar = st.progress(0)
-                        results = []
+                        with st.spinner(f"Scoring {len(df)} students..."):
+                            scored_df = make_predictions(df, explain=True)
                         
-                        for idx, row in df.iterrows():
-                            try:
-                                prediction, prediction_prob = make_prediction(row.to_dict())
-                                
-                                if prediction_prob < 0.3:
-                                    risk_level = "Low Risk"
-                                elif prediction_prob < 0.7:
-                                    risk_level = "Medium Risk"
-                                else:
-                                    risk_level = "High Risk"
-                                
-                                results.append({
-                                    'Student_ID': idx + 1,
-                                    'Risk_Level': risk_level,
-                                    'Risk_Probability': f"{prediction_prob:.1%}",
-                                    **row.to_dict()
-                                })
-                                
-                                progress_bar.progress((idx + 1) / len(df))
-                            
-                            except Exception as e:
-                                st.error(f"Error processing student {idx + 1}: {str(e)}")
+                        invalid_rows = scored_df[~scored_df['valid']]
+                        for idx, row in invalid_rows.head(20).iterrows():
+                            st.error(f"Error processing student {idx + 1}: {row['validation_error']}")
+                        if len(invalid_rows) > 20:
+                            st.error(f"...and {len(invalid_rows) - 20} more rows with invalid data")
                         
-                        results_df = pd.DataFrame(results)
+                        valid_rows = scored_df['valid'].to_numpy()
+                        valid_scored = scored_df.loc[valid_rows]
+                        results_df = pd.DataFrame({
+                            'Student_ID': np.arange(1, len(df) + 1)[valid_rows],
+                            'Risk_Level': valid_scored['risk_level'].to_numpy(),
+                            'Risk_Probability': (valid_scored['probability'] * 100).round(1).astype(str).to_numpy() + '%',
+                            'Top_Risk_Factor': valid_scored['top_risk_factor'].map(FEATURE_DISPLAY_NAMES).to_numpy()
+                        })
+                        # Per-feature contributions to the risk probability, in percentage points
+                        contribution_df = pd.DataFrame({
+                            f"{FEATURE_DISPLAY_NAMES[feature]} Contribution": (valid_scored[f'contribution_{feature}'] * 100).round(1).to_numpy()
+                            for feature in FEATURE_DISPLAY_NAMES
+                        })
+                        results_df = pd.concat([results_df, df.reset_index(drop=True).loc[valid_rows].reset_index(drop=True), contribution_df], axis=1)
                         st.markdown("### Batch Prediction Results")
                         st.dataframe(results_df)
                         
+                        # All valid rows are saved with one write, not one save per student
+                        batch_records = prediction_records(scored_df)
+                        if save_prediction_records(batch_records):
+                            st.success(f" Saved {len(batch_records)} predictions")
+                        else:
+                            st.error(f"{get_material_icon_html('error', style='fill')} Could not save the batch predictions", unsafe_allow_html=True)
+                        
                         risk_counts = results_df['Risk_Level'].value_counts()
                         fig_pie = px.pie(values=risk_counts.values, names=risk_counts.index, 
                                          title="Risk Level Distribution")
@@ -736,13 +782,10 @@ def main():
     
     else:
         st.markdown("### Historical Analysis")
-        historical_data = load_student_data()
+        # Typed columnar snapshot: timestamps arrive already parsed
+        df_historical = load_prediction_frame(HISTORICAL_COLUMNS)
         
-        if historical_data:
-            df_historical = pd.DataFrame(historical_data)
-            
-            df_historical['timestamp'] = pd.to_datetime(df_historical['timestamp'])
-            
+        if not df_historical.empty:
             analysis_type = st.selectbox(
                 "Select analysis type:",
                 ["Risk Trends Over Time", "Performance Correlation", "Student Progress Tracking"],
@@ -20,7 +20,8 @@ except ImportError:
 # Append parent directory to sys.path to enable importing from utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.data_utils import save_parent_observation, load_parent_observations
+from utils.data_utils import save_parent_observation, load_observation_records, page_parent_observations, iter_parent_observations
+from utils.records import records_to_frame
 from utils.image_base64 import get_base64_images # Only need this for the image dict
 from utils.language_utils import get_text, load_app_settings, save_app_settings
 
@@ -114,13 +115,11 @@ def remove_lottie_background(lottie_json):
     
     return lottie_json
 
-def create_progress_chart(data, metric):
-    """Create progress chart for specific metric"""
-    df = pd.DataFrame(data)
+def create_progress_chart(df, metric):
+    """Create progress chart for specific metric from a typed observations frame (see utils.records)"""
     if df.empty:
         return None
     
-    df['date'] = pd.to_datetime(df['date'])
     df = df.sort_values('date')
     
     fig = px.line(df, x='date', y=metric, 
@@ -135,14 +134,12 @@ def create_progress_chart(data, metric):
     
     return fig
 
-def create_weekly_summary(data):
-    """Create weekly summary visualization"""
-    if not data:
+def create_weekly_summary(df):
+    """Create weekly summary visualization from a typed observations frame (see utils.records)"""
+    if df.empty:
         return None, None
     
-    df = pd.DataFrame(data)
-    df['date'] = pd.to_datetime(df['date'])
-    df['week'] = df['date'].dt.to_period('W')
+    df = df.assign(week=df['date'].dt.to_period('W'))
     
     # Calculate weekly averages
     weekly_avg = df.groupby('week')[['homework_completion', 'behavior_rating', 'sleep_hours', 'mood_rating']].mean()
@@ -500,10 +497,7 @@ def main():
         st.markdown(f"## {get_text('progress_tracking', language)}")
         st.markdown(f"Analyzing progress for **{child_name}** from {start_date} to {end_date}")
         
-        all_observations = load_parent_observations()
-        child_observations = [obs for obs in all_observations 
-                                if obs.get('child_name') == child_name 
-                                and start_date <= date.fromisoformat(obs['date']) <= end_date]
+        child_observations = load_observation_records(child_name, start_date, end_date)
         
         if not child_observations:
             custom_alert(
@@ -514,6 +508,9 @@ def main():
 
             return
         
+        # One typed frame (dates already parsed) shared by every chart and metric below
+        df_child = records_to_frame(child_observations)
+        
         tab1, tab2, tab3, tab4 = st.tabs(["Academic", "Behavioral", "Emotional", "Health"])
         
         with tab1:
@@ -522,12 +519,12 @@ def main():
             col1, col2 = st.columns(2)
             
             with col1:
-                homework_fig = create_progress_chart(child_observations, 'homework_completion')
+                homework_fig = create_progress_chart(df_child, 'homework_completion')
                 if homework_fig:
                     st.plotly_chart(homework_fig, use_container_width=True)
             
             with col2:
-                reading_fig = create_progress_chart(child_observations, 'reading_time')
+                reading_fig = create_progress_chart(df_child, 'reading_time')
                 if reading_fig:
                     st.plotly_chart(reading_fig, use_container_width=True)
             
@@ -535,7 +532,7 @@ def main():
             
             all_subjects = []
             for obs in child_observations:
-                all_subjects.extend(obs.get('subjects_struggled', []))
+                all_subjects.extend(obs.subjects_struggled)
             
             if all_subjects:
                 subject_counts = pd.Series(all_subjects).value_counts()
@@ -549,11 +546,11 @@ def main():
         with tab2:
             st.markdown("### Behavioral Progress")
             
-            behavior_fig = create_progress_chart(child_observations, 'behavior_rating')
+            behavior_fig = create_progress_chart(df_child, 'behavior_rating')
             if behavior_fig:
                 st.plotly_chart(behavior_fig, use_container_width=True)
             
-            df = pd.DataFrame(child_observations)
+            df = df_child
             if not df.empty:
                 col1, col2, col3 = st.columns(3)
                 
@@ -572,11 +569,11 @@ def main():
         with tab3:
             st.markdown("### Emotional Well-being")
             
-            mood_fig = create_progress_chart(child_observations, 'mood_rating')
+            mood_fig = create_progress_chart(df_child, 'mood_rating')
             if mood_fig:
                 st.plotly_chart(mood_fig, use_container_width=True)
             
-            df = pd.DataFrame(child_observations)
+            df = df_child
             if not df.empty:
                 mood_dist = df['mood_rating'].value_counts().sort_index()
                 fig_mood_dist = px.pie(values=mood_dist.values, names=[f"Mood {i}" for i in mood_dist.index],
@@ -589,16 +586,16 @@ def main():
             col1, col2 = st.columns(2)
             
             with col1:
-                sleep_fig = create_progress_chart(child_observations, 'sleep_hours')
+                sleep_fig = create_progress_chart(df_child, 'sleep_hours')
                 if sleep_fig:
                     st.plotly_chart(sleep_fig, use_container_width=True)
             
             with col2:
-                activity_fig = create_progress_chart(child_observations, 'physical_activity')
+                activity_fig = create_progress_chart(df_child, 'physical_activity')
                 if activity_fig:
                     st.plotly_chart(activity_fig, use_container_width=True)
             
-            df = pd.DataFrame(child_observations)
+            df = df_child
             if not df.empty:
                 st.markdown("#### Chart Health Summary")
                 
@@ -624,10 +621,7 @@ def main():
         st.markdown(f"## {get_text('weekly_summary', language)}")
         st.markdown(f"Weekly analysis for **{child_name}**")
         
-        all_observations = load_parent_observations()
-        child_observations = [obs for obs in all_observations 
-                                if obs.get('child_name') == child_name 
-                                and start_date <= date.fromisoformat(obs['date']) <= end_date]
+        child_observations = load_observation_records(child_name, start_date, end_date)
         
         if not child_observations:
             custom_alert(
@@ -638,7 +632,7 @@ def main():
 
             return
         
-        weekly_fig, weekly_data = create_weekly_summary(child_observations)
+        weekly_fig, weekly_data = create_weekly_summary(records_to_frame(child_observations))
         
         if weekly_fig:
             st.plotly_chart(weekly_fig, use_container_width=True)
@@ -696,10 +690,10 @@ def main():
         st.markdown(f"## {get_text('observations_log', language)}")
         st.markdown(f"Complete observation history for **{child_name}**")
         
-        all_observations = load_parent_observations()
-        child_observations = [obs for obs in all_observations if obs.get('child_name') == child_name]
+        # Only the page on screen is ever loaded; one row is enough to know the child has a history
+        latest_observation, _ = page_parent_observations(page_size=1, child_name=child_name, descending=True)
         
-        if not child_observations:
+        if not latest_observation:
             custom_alert(
             message=f"{get_text('no_observations_recorded', language)}. {get_text('start_by_adding_daily_observations', language)}",
             icon_html=get_material_icon_html('info', style='fill'),
@@ -707,8 +701,6 @@ def main():
             )
             return
         
-        child_observations.sort(key=lambda x: x['date'], reverse=True)
-        
         col1, col2 = st.columns(2)
         
         with col1:
@@ -717,12 +709,20 @@ def main():
         with col2:
             show_detailed = st.checkbox("Show detailed observations", value=False, key="pt_log_show_detailed")
         
-        for obs in child_observations[:20]:
+        # Keyset cursor of the page being shown, per child and date filter
+        page_cursor_key = f"pt_log_cursor_{child_name}_{date_filter}"
+        log_observations, next_cursor = page_parent_observations(
+            page_size=20,
+            cursor=st.session_state.get(page_cursor_key),
+            child_name=child_name,
+            start_date=date_filter or None,
+            end_date=date_filter or None,
+            descending=True
+        )
+        
+        for obs in log_observations:
             obs_date = date.fromisoformat(obs['date'])
             
-            if date_filter and obs_date != date_filter:
-                continue
-            
             with st.expander(f"{obs_date.strftime('%B %d, %Y')} - Rating: {obs['behavior_rating']}/5"):
                 col1, col2, col3 = st.columns(3)
                 
@@ -763,8 +763,18 @@ def main():
                         st.markdown(f"**{get_material_icon_html('groups')} Social Interactions:**", unsafe_allow_html=True)
                         st.write(obs['social_interactions'])
         
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.session_state.get(page_cursor_key) is not None and st.button("Newest observations", key="pt_log_newest_button"):
+                st.session_state[page_cursor_key] = None
+                st.rerun()
+        with col2:
+            if next_cursor is not None and st.button("Older observations", key="pt_log_older_button"):
+                st.session_state[page_cursor_key] = next_cursor
+                st.rerun()
+        
         if st.button("📥 Export Observations", key="pt_export_observations_button"):
-            df_export = pd.DataFrame(child_observations)
+            df_export = pd.DataFrame(iter_parent_observations(child_name, descending=True))
             csv = df_export.to_csv(index=False)
             st.download_button(
                 label="Download CSV",
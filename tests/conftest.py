@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from utils import data_utils, retention
+
+
+@pytest.fixture(scope='session')
+def forest_data():
+    """A small fitted forest on the app's six features, and rows to evaluate"""
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 100, size=(300, 6))
+    y = (X[:, 0] + X[:, 1] + rng.normal(0, 15, size=300) < 100).astype(int)
+    model = RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0).fit(X, y)
+    return model, rng.uniform(0, 100, size=(200, 6))
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run in an empty temporary working directory with fresh data_utils caches"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    monkeypatch.setattr(data_utils, '_journals', {})
+    monkeypatch.setattr(data_utils, '_observation_index', None)
+    monkeypatch.setattr(data_utils, '_observation_index_source', None)
+    monkeypatch.setattr(data_utils, '_sqlite_ready', False)
+    monkeypatch.setattr(data_utils, 'SYNC_ENABLED', False)
+    # Fixtures save records from past terms; the retention tests turn this back on
+    monkeypatch.setattr(data_utils, 'RETENTION_ENABLED', False)
+    monkeypatch.setattr(data_utils, '_retention_terms', {})
+    monkeypatch.setattr(data_utils, '_typed_cache', {})
+    data_utils.clear_data_cache()
+    retention._read_segment_file.cache_clear()
+    return tmp_path
@@ -0,0 +1,142 @@
+import os
+from datetime import date
+
+import pytest
+
+from utils import analytics_snapshot, data_utils, sqlite_store
+from utils.journal import Journal
+
+pytest.importorskip('pyarrow')
+
+
+def _prediction(n):
+    return {'timestamp': f"2024-03-{n + 1:02d}T09:00:00", 'student_name': f"Student {n}",
+            'math_score': 50 + n, 'prediction': n % 2, 'risk_level': 'Low Risk'}
+
+
+@pytest.fixture
+def snapshot_dir(data_dir, monkeypatch):
+    monkeypatch.setattr(analytics_snapshot, '_frame_cache', {})
+    return data_dir
+
+
+@pytest.fixture
+def sqlite_backend(snapshot_dir, monkeypatch):
+    monkeypatch.setenv('EDUSCAN_SQLITE_PATH', str(snapshot_dir / 'data' / 'eduscan.db'))
+    monkeypatch.setattr(data_utils, 'STORAGE_BACKEND', 'sqlite')
+    monkeypatch.setattr(analytics_snapshot, 'STORAGE_BACKEND', 'sqlite')
+    yield
+    sqlite_store.close_connections()
+
+
+def test_journal_refresh_converts_only_new_records(snapshot_dir):
+    for n in range(3):
+        data_utils.save_prediction_data(_prediction(n))
+    state = analytics_snapshot.refresh_snapshot('predictions')
+    assert state['source_rows'] == 3 and len(state['parts']) == 1
+
+    data_utils.save_prediction_data(_prediction(3))
+    state = analytics_snapshot.refresh_snapshot('predictions')
+    assert state['parts'][-1] == 'part-000000003-000000004.parquet'
+
+    frame = analytics_snapshot.load_prediction_frame(['student_name', 'math_score'])
+    assert list(frame['student_name']) == [f"Student {n}" for n in range(4)]
+    assert frame['math_score'].dtype == 'float64'
+
+
+def test_rewritten_store_rebuilds_the_snapshot(snapshot_dir):
+    for n in range(3):
+        data_utils.save_prediction_data(_prediction(n))
+    analytics_snapshot.refresh_snapshot('predictions')
+
+    # The journal is rewritten and no longer starts with the snapshot's records
+    replacement = f"{data_utils.STUDENT_DATA_JOURNAL}.new"
+    Journal(replacement).append(_prediction(7))
+    os.replace(replacement, data_utils.STUDENT_DATA_JOURNAL)
+    state = analytics_snapshot.refresh_snapshot('predictions')
+    assert state['source_rows'] == 1
+    assert state['parts'] == ['part-000000000-000000001.parquet']
+    assert list(analytics_snapshot.load_prediction_frame(['student_name'])['student_name']) == ['Student 7']
+
+
+def test_missing_part_rebuilds_the_snapshot(snapshot_dir):
+    for n in range(2):
+        data_utils.save_prediction_data(_prediction(n))
+        analytics_snapshot.refresh_snapshot('predictions')
+    parts = analytics_snapshot._read_state('predictions')['parts']
+    assert len(parts) == 2
+
+    # Another process compacted the parts away, but this state still lists them
+    os.remove(os.path.join(analytics_snapshot._dataset_dir('predictions'), parts[0]))
+    data_utils.save_prediction_data(_prediction(2))
+    frame = analytics_snapshot.load_prediction_frame(['student_name'])
+    assert list(frame['student_name']) == ['Student 0', 'Student 1', 'Student 2']
+
+    state = analytics_snapshot._read_state('predictions')
+    assert state['source_rows'] == 3 and state['parts'] == ['part-000000000-000000003.parquet']
+    assert all(os.path.exists(os.path.join(analytics_snapshot._dataset_dir('predictions'), part))
+               for part in state['parts'])
+
+def test_sqlite_refresh_reads_only_rows_after_the_watermark(sqlite_backend, monkeypatch):
+    for n in range(3):
+        data_utils.save_prediction_data(_prediction(n))
+    state = analytics_snapshot.refresh_snapshot('predictions')
+    assert state['backend'] == 'sqlite'
+    assert (state['source_rows'], state['last_id']) == (3, 3)
+
+    for n in range(3, 5):
+        data_utils.save_prediction_data(_prediction(n))
+    reads = []
+    iter_rows_from = sqlite_store.iter_rows_from
+
+    def recording_iter_rows_from(table, first_id=0, db_path=None):
+        rows = list(iter_rows_from(table, first_id, db_path))
+        reads.append((first_id, len(rows)))
+        return iter(rows)
+
+    monkeypatch.setattr(sqlite_store, 'iter_rows_from', recording_iter_rows_from)
+    state = analytics_snapshot.refresh_snapshot('predictions')
+    # The last row already in the snapshot is read again to check it is unchanged
+    assert reads == [(3, 3)]
+    assert (state['source_rows'], state['last_id']) == (5, 5)
+    assert len(state['parts']) == 2
+
+    frame = analytics_snapshot.load_prediction_frame(['student_name', 'timestamp'])
+    assert list(frame['student_name']) == [f"Student {n}" for n in range(5)]
+    assert str(frame['timestamp'].dtype).startswith('datetime64')
+
+
+def test_snapshot_is_rebuilt_when_the_backend_changes(snapshot_dir, monkeypatch):
+    for n in range(2):
+        data_utils.save_prediction_data(_prediction(n))
+    analytics_snapshot.refresh_snapshot('predictions')
+
+    monkeypatch.setenv('EDUSCAN_SQLITE_PATH', str(snapshot_dir / 'data' / 'eduscan.db'))
+    monkeypatch.setattr(data_utils, 'STORAGE_BACKEND', 'sqlite')
+    monkeypatch.setattr(analytics_snapshot, 'STORAGE_BACKEND', 'sqlite')
+    try:
+        # The database is seeded from the journal on first use
+        state = analytics_snapshot.refresh_snapshot('predictions')
+    finally:
+        sqlite_store.close_connections()
+    assert state['backend'] == 'sqlite'
+    assert (state['source_rows'], state['last_id']) == (2, 2)
+    assert state['parts'] == ['part-000000000-000000002.parquet']
+
+
+def test_sqlite_snapshot_keeps_rows_rolled_into_the_archive(sqlite_backend, monkeypatch):
+    for n in range(3):
+        data_utils.save_prediction_data(_prediction(n))
+    assert analytics_snapshot.refresh_snapshot('predictions')['source_rows'] == 3
+
+    # A new term starts: the March rows leave the table for the archive
+    monkeypatch.setattr(data_utils, 'RETENTION_ENABLED', True)
+    monkeypatch.setattr(data_utils, 'get_term_start', lambda: date(2024, 3, 3))
+    monkeypatch.setattr('utils.retention.get_term_start', lambda day=None: date(2024, 3, 3))
+    data_utils.save_prediction_data(_prediction(3))
+    assert sqlite_store.count_rows('predictions') == 2
+
+    state = analytics_snapshot.refresh_snapshot('predictions')
+    assert (state['source_rows'], state['archived']) == (4, 2)
+    frame = analytics_snapshot.load_prediction_frame(['student_name'])
+    assert list(frame['student_name']) == [f"Student {n}" for n in range(4)]
@@ -0,0 +1,184 @@
+import os
+
+import pytest
+
+from utils import data_utils, sqlite_store
+from utils.journal import Journal
+
+
+def _observation(n, child_name='Amina'):
+    return {'child_name': child_name, 'reading_time': n}
+
+
+def _reading_times(records):
+    return [record['reading_time'] for record in records]
+
+
+def test_unchanged_journal_is_served_from_the_cache(data_dir):
+    for n in range(3):
+        data_utils.save_parent_observation(_observation(n))
+    first = data_utils.load_parent_observations()
+    second = data_utils.load_parent_observations()
+    assert _reading_times(second) == [0, 1, 2]
+    # Callers get their own list
+    assert first is not second
+    first.clear()
+    assert len(data_utils.load_parent_observations()) == 3
+
+    stats = data_utils.get_data_cache_stats()
+    assert stats['misses'] == 1 and stats['hits'] >= 2
+    assert stats['cached_records'] == 3
+
+
+def test_own_saves_extend_the_cache_in_place(data_dir):
+    data_utils.save_parent_observation(_observation(0))
+    data_utils.load_parent_observations()
+    data_utils.save_parent_observation(_observation(1))
+    assert _reading_times(data_utils.load_parent_observations()) == [0, 1]
+    stats = data_utils.get_data_cache_stats()
+    assert (stats['misses'], stats['in_place_updates'], stats['tail_reads']) == (1, 1, 0)
+
+
+def test_appends_from_elsewhere_are_read_from_the_tail(data_dir):
+    data_utils.save_parent_observation(_observation(0))
+    data_utils.load_parent_observations()
+
+    # Another process appending to the same journal
+    Journal(data_utils.PARENT_OBSERVATIONS_JOURNAL).append(_observation(1))
+    assert _reading_times(data_utils.load_parent_observations()) == [0, 1]
+    stats = data_utils.get_data_cache_stats()
+    assert (stats['misses'], stats['tail_reads']) == (1, 1)
+
+    # A line still being written is left for the next load
+    with open(data_utils.PARENT_OBSERVATIONS_JOURNAL, 'a', encoding='utf-8') as f:
+        f.write('{"child_name": "Amina", "reading_')
+    assert _reading_times(data_utils.load_parent_observations()) == [0, 1]
+    with open(data_utils.PARENT_OBSERVATIONS_JOURNAL, 'a', encoding='utf-8') as f:
+        f.write('time": 2}\n')
+    assert _reading_times(data_utils.load_parent_observations()) == [0, 1, 2]
+
+
+def test_replaced_journal_is_reloaded_in_full(data_dir):
+    data_utils.save_parent_observation(_observation(0))
+    data_utils.save_parent_observation(_observation(1))
+    data_utils.load_parent_observations()
+
+    replacement = f"{data_utils.PARENT_OBSERVATIONS_JOURNAL}.new"
+    Journal(replacement).append(_observation(5))
+    os.replace(replacement, data_utils.PARENT_OBSERVATIONS_JOURNAL)
+    assert _reading_times(data_utils.load_parent_observations()) == [5]
+    assert data_utils.get_data_cache_stats()['misses'] == 2
+
+
+@pytest.fixture(params=['journal', 'sqlite'])
+def backend(request, data_dir, monkeypatch):
+    """Run a test against both storage backends"""
+    if request.param == 'sqlite':
+        monkeypatch.setenv('EDUSCAN_SQLITE_PATH', str(data_dir / 'data' / 'eduscan.db'))
+        monkeypatch.setattr(data_utils, 'STORAGE_BACKEND', 'sqlite')
+    yield request.param
+    sqlite_store.close_connections()
+
+
+def _dated_observation(child_name, day, note):
+    return {'child_name': child_name, 'date': day, 'timestamp': f"{day}T18:00:00", 'learning_wins': note}
+
+
+def _prediction(student_name, day, risk_level='Low Risk'):
+    return {'student_name': student_name, 'timestamp': f"{day}T09:30:00", 'risk_level': risk_level}
+
+
+def _page_through(page_size, **filters):
+    notes, cursor = [], None
+    while True:
+        page, cursor = data_utils.page_parent_observations(page_size, cursor, **filters)
+        notes.extend(record['learning_wins'] for record in page)
+        if cursor is None:
+            return notes
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('child_name', ['Amina', None])
+def test_pages_visit_every_observation_once(backend, descending, child_name):
+    for child, day in [('Amina', '2024-03-01'), ('Omar', '2024-03-02'), ('Amina', '2024-03-04'),
+                       ('Amina', '2024-03-02'), ('Amina', '2024-03-04'), ('Amina', '2024-03-06')]:
+        data_utils.save_parent_observation(_dated_observation(child, day, f"{child} {day}"))
+    expected = [note for _, note in sorted(
+        (record['date'], record['learning_wins']) for record in data_utils.load_parent_observations()
+        if child_name is None or record['child_name'] == child_name)]
+    if descending:
+        expected.reverse()
+
+    for page_size in (1, 2, 4, 10):
+        notes = _page_through(page_size, child_name=child_name, descending=descending)
+        assert sorted(notes) == sorted(expected)
+        assert [note.split()[1] for note in notes] == [note.split()[1] for note in expected]
+
+
+def test_cursor_is_stable_while_records_arrive(backend):
+    for day in ['2024-03-01', '2024-03-02', '2024-03-03']:
+        data_utils.save_parent_observation(_dated_observation('Amina', day, day))
+    page, cursor = data_utils.page_parent_observations(2, child_name='Amina')
+    assert [record['learning_wins'] for record in page] == ['2024-03-01', '2024-03-02']
+
+    # A back-dated entry before the cursor and a new one after it
+    data_utils.save_parent_observation(_dated_observation('Amina', '2024-02-20', 'back-dated'))
+    data_utils.save_parent_observation(_dated_observation('Amina', '2024-03-04', '2024-03-04'))
+    page, cursor = data_utils.page_parent_observations(2, cursor, child_name='Amina')
+    assert [record['learning_wins'] for record in page] == ['2024-03-03', '2024-03-04']
+    assert cursor is None
+
+
+def test_prediction_filters_and_columns(backend):
+    for student, day, risk in [('Amina', '2024-03-01', 'High Risk'), ('Omar', '2024-03-02', 'Low Risk'),
+                               ('Amina', '2024-03-03', 'Low Risk'), ('Amina', '2024-03-05', 'High Risk')]:
+        data_utils.save_prediction_data(_prediction(student, day, risk))
+
+    # The end date is inclusive although timestamps carry a time of day
+    in_range = data_utils.iter_student_data('Amina', start_date='2024-03-01', end_date='2024-03-03',
+                                            columns=['timestamp'])
+    assert list(in_range) == [{'timestamp': '2024-03-01T09:30:00'}, {'timestamp': '2024-03-03T09:30:00'}]
+
+    high = data_utils.iter_student_data(risk_level='High Risk', descending=True, limit=1)
+    assert [record['timestamp'][:10] for record in high] == ['2024-03-05']
+    assert [record['student_name'] for record in data_utils.iter_student_data()] == ['Amina', 'Omar', 'Amina', 'Amina']
+
+    page, cursor = data_utils.page_student_data(3, descending=True)
+    assert [record['timestamp'][:10] for record in page] == ['2024-03-05', '2024-03-03', '2024-03-02']
+    page, cursor = data_utils.page_student_data(3, cursor, descending=True)
+    assert [record['timestamp'][:10] for record in page] == ['2024-03-01']
+    assert cursor is None
+
+
+@pytest.mark.parametrize('child_name', ['Amina', None])
+def test_typed_records_come_from_the_snapshot_the_query_ran_on(data_dir, monkeypatch, child_name):
+    for n, name in enumerate(['Amina', 'Omar', 'Amina']):
+        data_utils.save_parent_observation(_dated_observation(name, f"2024-03-0{n + 1}", str(n)))
+    keyed_observations = data_utils._keyed_observations
+
+    def query_then_rewrite(*args, **kwargs):
+        pairs = keyed_observations(*args, **kwargs)
+        # Another process rewrites the journal before the typed records are looked up
+        replacement = f"{data_utils.PARENT_OBSERVATIONS_JOURNAL}.new"
+        Journal(replacement).append(_dated_observation('Zahra', '2024-03-09', 'rewritten'))
+        os.replace(replacement, data_utils.PARENT_OBSERVATIONS_JOURNAL)
+        return pairs
+
+    monkeypatch.setattr(data_utils, '_keyed_observations', query_then_rewrite)
+    records = data_utils.load_observation_records(child_name=child_name, end_date='2024-03-05')
+    assert [record.learning_wins for record in records] == (['0', '2'] if child_name else ['0', '1', '2'])
+
+
+def test_batch_of_predictions_is_saved_with_one_write(backend, monkeypatch):
+    queued = []
+    monkeypatch.setattr(data_utils, 'SYNC_ENABLED', True)
+    monkeypatch.setattr(data_utils, '_start_sync_worker', lambda: None)
+    monkeypatch.setattr('utils.sync_utils.enqueue_many', lambda kind, records: queued.append((kind, list(records))))
+    records = [_prediction(f"Student {n}", '2024-03-01') for n in range(5)]
+
+    assert data_utils.save_prediction_records(records)
+    assert [record['student_name'] for record in data_utils.load_student_data()] == [f"Student {n}" for n in range(5)]
+    assert queued == [('prediction', records)]
+    if backend == 'journal':
+        journal = data_utils._get_journal(data_utils.STUDENT_DATA_JOURNAL, data_utils.STUDENT_DATA_FILE)
+        assert journal.stats['fsyncs'] == 1
@@ -0,0 +1,113 @@
+"""
+Runs the migrations against a real PostgreSQL database.
+
+Set EDUSCAN_TEST_DATABASE_URL to a disposable database to run these tests;
+every EduScan table in it is dropped first. Skipped otherwise.
+"""
+
+import os
+from datetime import date
+
+import pytest
+
+TEST_DATABASE_URL = os.environ.get('EDUSCAN_TEST_DATABASE_URL')
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="EDUSCAN_TEST_DATABASE_URL is not set")
+
+from utils import db_utils, db_migrations  # noqa: E402
+from utils.db_migrations import MIGRATIONS, MigrationError, migrate  # noqa: E402
+
+TABLES = ['predictions', 'parent_observations', 'students', 'users', 'schema_migrations']
+
+
+@pytest.fixture
+def database(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', TEST_DATABASE_URL)
+    monkeypatch.setattr(db_utils, '_students_name_unique', None)
+    db_utils.close_db_pool()
+    with db_utils.db_connection() as conn:
+        assert conn is not None, "cannot connect to EDUSCAN_TEST_DATABASE_URL"
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {', '.join(TABLES)} CASCADE")
+        conn.commit()
+    yield
+    db_utils.close_db_pool()
+
+
+def _query(sql, params=None):
+    with db_utils.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def _prediction(student_name, timestamp='2024-03-01T10:00:00'):
+    return {'student_name': student_name, 'grade_level': 'Grade 3', 'math_score': 55, 'reading_score': 60,
+            'writing_score': 58, 'attendance': 90, 'behavior': 3, 'literacy': 6, 'prediction': 0,
+            'probability': 0.2, 'risk_level': 'Low Risk', 'timestamp': timestamp}
+
+
+def test_migrate_is_idempotent(database):
+    assert migrate() == [version for version, _, _ in MIGRATIONS]
+    # A second run finds everything applied
+    assert migrate() == []
+    assert [row[0] for row in _query("SELECT version FROM schema_migrations ORDER BY version")] == \
+        [version for version, _, _ in MIGRATIONS]
+
+
+def test_month_partitions_exist(database):
+    migrate()
+    month = date.today().replace(day=1)
+    for table in db_migrations.PARTITIONED_TABLES:
+        partitions = {row[0] for row in _query(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass", (table,))}
+        assert f"{table}_default" in partitions
+        assert f"{table}_{month.year:04d}_{month.month:02d}" in partitions
+        assert len(partitions) == db_migrations.PARTITION_MONTHS_BACK + db_migrations.PARTITION_MONTHS_AHEAD + 2
+    # Running again creates nothing new
+    assert db_migrations.ensure_month_partitions() == []
+
+
+def test_student_upsert_reuses_existing_rows(database):
+    migrate()
+    assert db_utils.save_predictions_to_db([_prediction('Amina'), _prediction('Omar')])
+    assert db_utils.save_predictions_to_db([_prediction('Amina', '2024-03-02T10:00:00')])
+    assert _query("SELECT name, COUNT(*) FROM students GROUP BY name ORDER BY name") == [('Amina', 1), ('Omar', 1)]
+    assert _query("SELECT COUNT(*) FROM predictions")[0][0] == 3
+    assert db_utils._students_name_unique is True
+
+
+def test_upsert_works_before_the_unique_index_exists(database):
+    migrate(target=1)
+    assert db_utils.save_predictions_to_db([_prediction('Amina')])
+    assert db_utils.save_predictions_to_db([_prediction('Amina', '2024-03-02T10:00:00')])
+    assert db_utils._students_name_unique is False
+    assert _query("SELECT COUNT(*) FROM students")[0][0] == 1
+
+
+def test_duplicate_student_names_are_merged_before_the_unique_index(database):
+    migrate(target=1)
+    with db_utils.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO students (name) VALUES ('Amina'), ('Amina'), ('Omar') RETURNING id")
+        first_id, second_id, _ = [row[0] for row in cur.fetchall()]
+        cur.execute("INSERT INTO predictions (student_id, timestamp) VALUES (%s, '2024-03-01'), (%s, '2024-03-02')",
+                    (first_id, second_id))
+        conn.commit()
+
+    assert migrate() == [2, 3]
+    assert _query("SELECT id FROM students WHERE name = 'Amina'") == [(first_id,)]
+    assert _query("SELECT DISTINCT student_id FROM predictions") == [(first_id,)]
+
+
+def test_duplicate_usernames_stop_the_migration(database):
+    migrate(target=1)
+    with db_utils.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO users (username, password) VALUES ('teacher', 'a'), ('teacher', 'b')")
+        conn.commit()
+
+    with pytest.raises(MigrationError, match="teacher"):
+        migrate()
+    # Migration 2 was rolled back as a whole
+    assert [row[0] for row in _query("SELECT version FROM schema_migrations")] == [1]
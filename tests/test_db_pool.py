@@ -0,0 +1,103 @@
+import threading
+import time
+
+import psycopg2.extensions
+import pytest
+
+from utils import db_utils
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class FakePool:
+    """Stands in for ThreadedConnectionPool without a server"""
+
+    def __init__(self, minconn, maxconn, dsn):
+        self.maxconn = maxconn
+        self.closed = False
+        self.used = []
+
+    def getconn(self):
+        if self.closed:
+            raise psycopg2.pool.PoolError("connection pool is closed")
+        if len(self.used) >= self.maxconn:
+            raise psycopg2.pool.PoolError("connection pool exhausted")
+        conn = FakeConnection()
+        self.used.append(conn)
+        return conn
+
+    def putconn(self, conn, close=False):
+        if self.closed:
+            raise psycopg2.pool.PoolError("connection pool is closed")
+        self.used.remove(conn)
+
+    def closeall(self):
+        for conn in self.used:
+            conn.close()
+        self.closed = True
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgresql://fake')
+    monkeypatch.setattr(db_utils.pg_pool, 'ThreadedConnectionPool', FakePool)
+    monkeypatch.setattr(db_utils, '_pool', None)
+    monkeypatch.setattr(db_utils, '_pool_slots', None)
+    monkeypatch.setattr(db_utils, 'DB_POOL_MAX', 2)
+    monkeypatch.setattr(db_utils, 'DB_POOL_TIMEOUT', 0.2)
+    monkeypatch.setitem(db_utils._pool_stats, 'in_use', 0)
+    yield
+    db_utils.close_db_pool()
+
+
+def test_checkout_waits_for_a_free_connection(fake_pool):
+    released = threading.Event()
+
+    def hold():
+        with db_utils.db_connection():
+            released.wait(5)
+
+    holders = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in holders:
+        thread.start()
+    while db_utils.get_pool_stats()['in_use'] < 2:
+        time.sleep(0.01)
+
+    # The pool is exhausted: a checkout times out instead of raising
+    with db_utils.db_connection() as conn:
+        assert conn is None
+    released.set()
+    for thread in holders:
+        thread.join()
+    with db_utils.db_connection() as conn:
+        assert conn is not None
+    assert db_utils.get_pool_stats()['timeouts'] >= 1
+
+
+def test_connection_outliving_close_db_pool_is_released_to_its_own_pool(fake_pool):
+    with db_utils.db_connection() as conn:
+        old_pool = db_utils._pool
+        db_utils.close_db_pool()
+        # A new pool is created while the old connection is still checked out
+        with db_utils.db_connection() as other:
+            assert other is not None
+            new_pool = db_utils._pool
+    assert conn.closed
+    assert new_pool is not old_pool and new_pool.used == []
+    assert db_utils.get_pool_stats()['in_use'] == 0
+    # Both semaphores got their slot back
+    with db_utils.db_connection() as first, db_utils.db_connection() as second:
+        assert first is not None and second is not None
@@ -0,0 +1,179 @@
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import psycopg2.errors
+import pytest
+
+from utils import db_utils
+
+
+class FakeCursor:
+    def __init__(self, statements, rows):
+        self.statements = statements
+        self.rows = rows
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchone(self):
+        return self.rows[0]
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+        self.rows = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, name=None):
+        return FakeCursor(self.statements, self.rows)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Routes db_utils statements to a FakeConnection; execute_values calls are recorded"""
+    conn = FakeConnection()
+    calls = []
+
+    @contextmanager
+    def db_connection():
+        yield conn
+
+    def execute_values(cur, sql, rows, page_size=100, fetch=False):
+        calls.append((sql, list(rows), page_size))
+        if fetch:
+            # The student upsert: hand out ids in row order
+            return [(100 + n, name) for n, (name, _) in enumerate(rows)]
+
+    monkeypatch.setattr(db_utils, 'db_connection', db_connection)
+    monkeypatch.setattr(db_utils, 'execute_values', execute_values)
+    monkeypatch.setattr(db_utils, '_students_name_unique', None)
+    conn.execute_values_calls = calls
+    return conn
+
+
+def _prediction(student_name, math_score):
+    return {'student_name': student_name, 'grade_level': 'Grade 5', 'math_score': math_score,
+            'prediction': 0, 'probability': 0.2, 'risk_level': 'Low', 'timestamp': '2024-03-01T10:00:00'}
+
+
+def test_bulk_save_upserts_each_student_once_in_one_transaction(fake_db):
+    predictions = [_prediction('Amina', 70), _prediction('Omar', 55), _prediction('Amina', 80)]
+    assert db_utils.save_predictions_to_db(predictions) is True
+
+    (upsert_sql, students, _), (insert_sql, rows, page_size) = fake_db.execute_values_calls
+    assert 'ON CONFLICT (name)' in upsert_sql
+    assert students == [('Amina', 'Grade 5'), ('Omar', 'Grade 5')]
+    assert insert_sql.startswith('INSERT INTO predictions')
+    assert page_size == db_utils.BULK_PAGE_SIZE
+    # Each row carries its student's id and keeps the input order
+    assert [(row[0], row[1]) for row in rows] == [(100, 70), (101, 55), (100, 80)]
+    assert fake_db.commits == 1
+
+
+def test_single_save_goes_through_the_bulk_path(fake_db):
+    assert db_utils.save_parent_observation_to_db({'child_name': 'Amina', 'date': '2024-03-01',
+                                                   'subjects_struggled': ['Math']}) is True
+    (_, students, _), (insert_sql, rows, _) = fake_db.execute_values_calls
+    assert students == [('Amina', 'Unknown')]
+    assert insert_sql.startswith('INSERT INTO parent_observations')
+    assert len(rows) == 1 and rows[0][6] == '["Math"]'
+
+
+def test_failed_bulk_save_rolls_back(fake_db, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("insert failed")
+    monkeypatch.setattr(db_utils, 'execute_values', fail)
+    assert db_utils.save_predictions_to_db([_prediction('Amina', 70)]) is False
+    assert (fake_db.commits, fake_db.rollbacks) == (0, 1)
+
+
+def test_empty_bulk_save_needs_no_connection(monkeypatch):
+    monkeypatch.setattr(db_utils, 'db_connection', None)
+    assert db_utils.save_predictions_to_db([]) is True
+
+
+def test_page_filters_and_keyset_are_pushed_into_sql(fake_db):
+    # page_size + 1 rows come back: the extra one says another page follows
+    fake_db.rows.extend([(0.2, '2024-03-02T09:00:00', 7), (0.4, '2024-03-01T09:00:00', 5),
+                         (0.9, '2024-02-28T09:00:00', 4)])
+    records, cursor = db_utils.page_student_predictions(
+        2, cursor=('2024-03-03T00:00:00', 9), student_name='Amina', start_date='2024-02-01',
+        end_date='2024-03-31', columns=['probability'])
+    assert records == [{'probability': 0.2}, {'probability': 0.4}]
+    assert cursor == ('2024-03-01T09:00:00', 5)
+
+    (sql, params), = fake_db.statements
+    assert 'JOIN students' not in sql
+    assert '(p.timestamp, p.id) < (%s, %s)' in sql
+    assert sql.endswith('ORDER BY p.timestamp DESC, p.id DESC LIMIT %s')
+    # The end date is inclusive, so the bound is the start of the next day
+    assert params == ['Amina', date(2024, 2, 1), date(2024, 4, 1), '2024-03-03T00:00:00', 9, 3]
+
+
+def test_last_page_has_no_cursor_and_student_fields_join(fake_db):
+    fake_db.rows.append(('Amina', datetime(2024, 3, 1, 9), 5))
+    records, cursor = db_utils.page_student_predictions(2, columns=['student_name'], descending=False)
+    assert records == [{'student_name': 'Amina'}]
+    assert cursor is None
+    (sql, _), = fake_db.statements
+    assert 'JOIN students s ON p.student_id = s.id' in sql
+    assert 'ORDER BY p.timestamp ASC' in sql
+
+
+def test_unknown_columns_are_rejected():
+    with pytest.raises(ValueError):
+        db_utils.page_parent_observations(columns=['password_hash'])
+
+
+def _stats_queries(conn):
+    return sum(sql == db_utils.DATABASE_STATS_SQL for sql, _ in conn.statements)
+
+
+def test_stats_are_one_query_cached_until_a_save(fake_db, monkeypatch):
+    monkeypatch.setattr(db_utils, '_stats_cache', {'expires': 0.0, 'stats': None})
+    fake_db.rows.append((3, 10, 4, 1, datetime(2024, 3, 1, 9), None))
+
+    stats = db_utils.get_database_stats()
+    assert stats['total_predictions'] == 10
+    assert stats['last_prediction_date'] == '2024-03-01T09:00:00'
+    assert stats['last_observation_date'] is None
+    assert db_utils.get_database_stats() == stats
+    assert _stats_queries(fake_db) == 1
+
+    assert db_utils.save_predictions_to_db([_prediction('Amina', 70)]) is True
+    db_utils.get_database_stats()
+    assert _stats_queries(fake_db) == 2
+    db_utils.get_database_stats(refresh=True)
+    assert _stats_queries(fake_db) == 3
+
+
+def test_students_without_the_unique_index_are_looked_up_first(fake_db, monkeypatch):
+    execute_values = db_utils.execute_values
+
+    def no_unique_index(cur, sql, rows, page_size=100, fetch=False):
+        if 'ON CONFLICT' in sql:
+            raise psycopg2.errors.InvalidColumnReference("no unique or exclusion constraint matching the ON CONFLICT")
+        return execute_values(cur, sql, rows, page_size, fetch)
+
+    monkeypatch.setattr(db_utils, 'execute_values', no_unique_index)
+    # Amina already exists; only Omar is inserted
+    fake_db.rows.append(('Amina', 7))
+    assert db_utils.save_predictions_to_db([_prediction('Amina', 70), _prediction('Omar', 55)]) is True
+
+    (insert_students_sql, students, _), (_, rows, _) = fake_db.execute_values_calls
+    assert insert_students_sql.startswith('INSERT INTO students') and students == [('Omar', 'Grade 5')]
+    assert [row[0] for row in rows] == [7, 100]
+    assert 'ROLLBACK TO SAVEPOINT upsert_students' in [sql for sql, _ in fake_db.statements]
+    # Later saves skip the upsert for the rest of the process
+    assert db_utils._students_name_unique is False
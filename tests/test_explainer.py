@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from utils.forest_engine import compile_forest
+from utils.model_utils import explain_prediction, make_prediction, make_predictions, FEATURE_COLUMNS
+
+
+def test_bias_plus_contributions_equals_probability(forest_data):
+    model, X = forest_data
+    bias, contributions = compile_forest(model).explain(X)
+    assert contributions.shape == X.shape
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict_proba(X)[:, 1], atol=1e-12)
+
+
+def test_explained_predictions_add_up():
+    students = [
+        {'math_score': 45, 'reading_score': 50, 'writing_score': 40, 'attendance': 70, 'behavior': 2, 'literacy': 3},
+        {'math_score': 90, 'reading_score': 85, 'writing_score': 88, 'attendance': 98, 'behavior': 5, 'literacy': 9}
+    ]
+    frame = make_predictions(pd.DataFrame(students), explain=True)
+    contribution_columns = [f'contribution_{column}' for column in FEATURE_COLUMNS]
+    np.testing.assert_allclose(frame['base_value'] + frame[contribution_columns].sum(axis=1),
+                               frame['probability'], atol=1e-9)
+
+    explanation = explain_prediction(students[0])
+    _, probability = make_prediction(students[0])
+    assert abs(explanation['base_value'] + sum(explanation['contributions'].values()) - probability) < 1e-9
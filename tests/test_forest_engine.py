@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from utils import forest_engine
+from utils.forest_engine import compile_forest, benchmark
+
+
+def test_compiled_forest_matches_predict_proba(forest_data):
+    model, X = forest_data
+    compiled = compile_forest(model)
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+    np.testing.assert_allclose(compiled.predict_proba(X[0]), model.predict_proba(X[:1]), atol=1e-12)
+
+
+def test_samples_on_a_split_threshold_go_the_same_way(forest_data):
+    model, X = forest_data
+    tree = model.estimators_[0].tree_
+    # Put every row exactly on the root split
+    X = X.copy()
+    X[:, tree.feature[0]] = tree.threshold[0]
+    np.testing.assert_allclose(compile_forest(model).predict_proba(X), model.predict_proba(X), atol=1e-12)
+
+
+def test_large_inputs_are_evaluated_in_chunks(forest_data, monkeypatch):
+    model, X = forest_data
+    monkeypatch.setattr(forest_engine, 'ROWS_PER_CHUNK', 7)
+    np.testing.assert_allclose(compile_forest(model).predict_proba(X), model.predict_proba(X), atol=1e-12)
+
+
+def test_unfitted_or_unsupported_models_are_not_compiled(forest_data):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    assert compile_forest(RandomForestClassifier()) is None
+    assert compile_forest(LogisticRegression()) is None
+
+
+def test_benchmark_compares_against_sklearn(forest_data):
+    model, _ = forest_data
+    results = benchmark(model, batch_size=50, repeats=2)
+    assert results['max_probability_difference'] < 1e-12
+    with pytest.raises(ValueError):
+        benchmark(compile_forest(model))
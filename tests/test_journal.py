@@ -0,0 +1,113 @@
+import json
+import threading
+import multiprocessing
+
+from utils import data_utils
+from utils.journal import Journal, iter_journal, read_journal_from
+
+
+def _append_from_process(path, worker, count):
+    journal = Journal(path)
+    for index in range(count):
+        journal.append({'worker': worker, 'index': index})
+    journal.close()
+
+
+def _assert_complete(path, workers, count):
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == workers * count
+    assert {(record['worker'], record['index']) for record in records} == {
+        (worker, index) for worker in range(workers) for index in range(count)
+    }
+
+
+def test_concurrent_thread_appends_lose_nothing(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal(path)
+    threads = [
+        threading.Thread(target=lambda worker=worker: [journal.append({'worker': worker, 'index': index}) for index in range(50)])
+        for worker in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    _assert_complete(path, 8, 50)
+    # Writers that arrived together shared their fsyncs
+    assert journal.stats['fsyncs'] < journal.stats['appends']
+
+
+def test_concurrent_process_appends_lose_nothing(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_append_from_process, args=(path, worker, 40)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+    _assert_complete(path, 4, 40)
+
+
+def test_torn_line_is_skipped_and_terminated(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"n": 1}\n{"n": 2')
+    assert list(iter_journal(path)) == [{'n': 1}]
+
+    # The next append starts on a fresh line instead of joining the torn one
+    Journal(path).append({'n': 3})
+    assert list(iter_journal(path)) == [{'n': 1}, {'n': 3}]
+
+
+def test_read_from_offset_leaves_partial_line(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"n": 1}\n{"n": 2}\n{"n": 3')
+    records, offset = read_journal_from(path)
+    assert records == [{'n': 1}, {'n': 2}]
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('}\n')
+    records, end = read_journal_from(path, offset)
+    assert records == [{'n': 3}]
+    assert read_journal_from(path, end) == ([], end)
+
+
+def test_append_many_returns_written_byte_range(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal(path)
+    journal.append({'n': 0})
+    start, end = journal.append_many([{'n': 1}, {'n': 2}])
+    with open(path, 'rb') as f:
+        f.seek(start)
+        assert f.read(end - start).decode('utf-8').splitlines() == ['{"n": 1}', '{"n": 2}']
+
+
+def test_legacy_json_is_migrated_once(data_dir):
+    legacy = [{'child_name': 'Amina', 'reading_time': 20}, {'child_name': 'Omar', 'reading_time': 35}]
+    (data_dir / 'data' / 'parent_observations.json').write_text(json.dumps(legacy))
+
+    assert data_utils.load_parent_observations() == legacy
+    data_utils.save_parent_observation({'child_name': 'Amina', 'reading_time': 15})
+    assert len(data_utils.load_parent_observations()) == 3
+    # The JSON file is left as it was
+    assert json.loads((data_dir / 'data' / 'parent_observations.json').read_text()) == legacy
+
+
+def test_write_behind_appends_are_readable_and_flushed(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal(path)
+    # A long interval keeps the background thread from flushing before the test does
+    journal.enable_write_behind(interval=60, max_pending=1000)
+    for n in range(5):
+        journal.append({'n': n}, sync=False)
+    assert [record['n'] for record in iter_journal(path)] == [0, 1, 2, 3, 4]
+    assert journal.pending == 5
+    assert journal.stats['deferred_appends'] == 5
+
+    journal.flush()
+    assert journal.pending == 0
+    assert journal.stats['fsyncs'] == 1
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from utils.model_artifact import save_model_artifact, load_model_artifact
+
+
+@pytest.fixture
+def artifact_dir(tmp_path, forest_data):
+    model, X = forest_data
+    package = {'model': model, 'scaler': StandardScaler().fit(X), 'version': '1.2'}
+    return str(save_model_artifact(package, str(tmp_path / 'model_artifact')))
+
+
+def test_artifact_round_trip(artifact_dir, forest_data):
+    model, X = forest_data
+    package = load_model_artifact(artifact_dir)
+    assert package['version'] == '1.2'
+    np.testing.assert_allclose(package['model'].predict_proba(X), model.predict_proba(X), atol=1e-12)
+    np.testing.assert_allclose(package['scaler'].transform(X), StandardScaler().fit(X).transform(X))
+
+
+def test_corrupted_artifact_fails_its_checksum(artifact_dir):
+    threshold_path = f"{artifact_dir}/threshold.npy"
+    threshold = np.load(threshold_path)
+    threshold[0] += 1.0
+    np.save(threshold_path, threshold)
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        load_model_artifact(artifact_dir)
+    # Only an explicit opt-out skips the check
+    assert load_model_artifact(artifact_dir, verify=False) is not None
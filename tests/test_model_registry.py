@@ -0,0 +1,109 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from utils.model_registry import (BundleChecksumError, discover_bundle, load_bundle, load_test_split,
+                                  normalize_feature_order, register_bundle, write_bundle_manifest)
+
+
+def _dump(path, obj):
+    with open(path, 'wb') as f:
+        pickle.dump(obj, f)
+    return str(path)
+
+
+@pytest.fixture
+def bundle_files(tmp_path, forest_data):
+    """A bare estimator and its scaler under the conventional file names"""
+    model, X = forest_data
+    model_path = _dump(tmp_path / 'learning_difficulty_detector.pkl', model)
+    scaler_path = _dump(tmp_path / 'scaler.pkl', StandardScaler().fit(X))
+    return model_path, scaler_path
+
+
+def test_registered_bundle_is_verified_and_assembled(bundle_files, forest_data):
+    model_path, scaler_path = bundle_files
+    write_bundle_manifest(model_path, scaler_path, version='2.0',
+                          feature_order=['Math_Score', 'Reading_Score', 'Writing_Score', 'Attendance_Rate',
+                                         'Behavior_Score', 'Literacy_Level'])
+    package = load_bundle(discover_bundle(model_path))
+
+    assert package['feature_order'] == ['math_score', 'reading_score', 'writing_score', 'attendance',
+                                        'behavior', 'literacy']
+    assert package['metadata']['version'] == '2.0'
+    assert package['metadata']['verified'] is True
+    assert package['metadata']['scaler_source'] == 'scaler.pkl'
+    np.testing.assert_allclose(package['scaler'].mean_, StandardScaler().fit(forest_data[1]).mean_)
+
+
+def test_changed_bundle_file_fails_its_checksum(bundle_files, forest_data):
+    model_path, scaler_path = bundle_files
+    write_bundle_manifest(model_path, scaler_path)
+    _dump(scaler_path, StandardScaler().fit(forest_data[1][:50]))
+
+    with pytest.raises(BundleChecksumError, match="scaler.pkl"):
+        load_bundle(discover_bundle(model_path))
+
+
+def test_unregistered_bundle_is_loaded_unverified(bundle_files):
+    model_path, _ = bundle_files
+    package = load_bundle(discover_bundle(model_path))
+    assert package['metadata']['verified'] is False
+    assert package['metadata']['scaler_source'] == 'scaler.pkl'
+
+
+@pytest.fixture
+def embedded_scaler_files(tmp_path, forest_data):
+    """A model package embedding its scaler, next to a scaler.pkl with other parameters"""
+    model, X = forest_data
+    embedded = StandardScaler().fit(X)
+    model_path = _dump(tmp_path / 'learning_difficulty_detector.pkl', {'model': model, 'scaler': embedded})
+    scaler_path = _dump(tmp_path / 'scaler.pkl', StandardScaler().fit(X[:50]))
+    return model_path, scaler_path, embedded
+
+
+def test_embedded_scaler_wins_over_a_mismatched_standalone_one(embedded_scaler_files, capsys):
+    model_path, _, embedded = embedded_scaler_files
+    package = load_bundle(discover_bundle(model_path))
+    assert package['scaler'] is not None
+    np.testing.assert_allclose(package['scaler'].mean_, embedded.mean_)
+    assert package['metadata']['scaler_source'] == 'embedded'
+    assert package['metadata']['scaler_mismatch'] is True
+    # The unregistered scaler.pkl is unused, so loading does not warn about it
+    assert 'Warning' not in capsys.readouterr().out
+
+
+def test_registering_an_embedded_scaler_leaves_the_standalone_one_out(embedded_scaler_files, capsys):
+    model_path, scaler_path, _ = embedded_scaler_files
+    with open(register_bundle(model_path, scaler_path, version='1.0')) as f:
+        manifest = json.load(f)
+    assert manifest['scaler_file'] is None
+    assert list(manifest['checksums']) == ['learning_difficulty_detector.pkl']
+
+    capsys.readouterr()
+    package = load_bundle(discover_bundle(model_path))
+    assert package['metadata']['verified'] is True
+    assert (package['metadata']['scaler_source'], package['metadata']['scaler_mismatch']) == ('embedded', False)
+    assert 'Warning' not in capsys.readouterr().out
+
+
+def test_bundle_without_a_test_split_falls_back_to_a_labelled_synthetic_sample(bundle_files, forest_data):
+    model_path, _ = bundle_files
+    package = load_bundle(discover_bundle(model_path))
+    X, y, source = load_test_split(package)
+    assert source == 'synthetic'
+    # The labels are the model's own predictions on the (scaled) sample
+    np.testing.assert_array_equal(y, forest_data[0].predict(X))
+
+    with open(register_bundle(model_path)) as f:
+        assert json.load(f)['metadata']['permutation_importance_source'] == 'synthetic'
+
+
+def test_unknown_feature_names_are_rejected():
+    assert normalize_feature_order(None) == ['math_score', 'reading_score', 'writing_score', 'attendance',
+                                             'behavior', 'literacy']
+    with pytest.raises(ValueError, match="shoe_size"):
+        normalize_feature_order(['math_score', 'shoe_size'])
@@ -0,0 +1,235 @@
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from utils import model_utils
+
+FEATURES = ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy']
+
+
+def _write_package(path, model):
+    with open(path, 'wb') as f:
+        pickle.dump({'model': model, 'scaler': None, 'feature_names': FEATURES, 'feature_order': FEATURES}, f)
+
+
+def _replace_model(model_file, forest_data):
+    """Overwrite the model file with a different forest"""
+    model, X = forest_data
+    _write_package(model_file, RandomForestClassifier(n_estimators=5, random_state=1).fit(X, 1 - model.predict(X)))
+    stat = os.stat(model_file)
+    os.utime(model_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def _student(math_score):
+    return {'math_score': math_score, 'reading_score': 60, 'writing_score': 58,
+            'attendance': 85, 'behavior': 3, 'literacy': 6}
+
+
+@pytest.fixture
+def model_file(tmp_path, monkeypatch, forest_data):
+    """A user model pickle in a temporary directory, served by load_model()"""
+    path = tmp_path / 'learning_difficulty_detector.pkl'
+    _write_package(path, forest_data[0])
+    monkeypatch.setattr(model_utils, 'get_model_path', lambda *args, **kwargs: str(path))
+    model_utils.clear_model_cache()
+    model_utils.clear_prediction_cache()
+    yield path
+    model_utils.clear_model_cache()
+    model_utils.clear_prediction_cache()
+
+
+def test_package_is_loaded_once_per_process(model_file):
+    package = model_utils.load_model()
+    assert model_utils.load_model() is package
+    assert model_utils.get_model_version() is not None
+
+
+def test_touched_but_unchanged_file_keeps_the_package(model_file):
+    package = model_utils.load_model()
+    version = model_utils.get_model_version()
+    stat = os.stat(model_file)
+    os.utime(model_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert model_utils.load_model() is package
+    assert model_utils.get_model_version() == version
+
+
+def test_changed_file_is_hot_reloaded(model_file, forest_data):
+    package = model_utils.load_model()
+    version = model_utils.get_model_version()
+    _replace_model(model_file, forest_data)
+
+    reloaded = model_utils.load_model()
+    assert reloaded is not package
+    assert reloaded['model'].n_estimators == 5
+    assert model_utils.get_model_version() != version
+
+
+def test_repeated_predictions_are_served_from_the_cache(model_file):
+    first = model_utils.make_prediction(_student(55))
+    assert model_utils.make_prediction(_student(55.0)) == first
+    stats = model_utils.get_prediction_cache_stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_cache_evicts_the_least_recently_used_entry(model_file, monkeypatch):
+    monkeypatch.setattr(model_utils, 'PREDICTION_CACHE_SIZE', 2)
+    for math_score in (10, 20, 10, 30):
+        model_utils.make_prediction(_student(math_score))
+    assert model_utils.get_prediction_cache_stats()['size'] == 2
+    # 20 was evicted, 10 was used more recently
+    model_utils.make_prediction(_student(10))
+    model_utils.make_prediction(_student(20))
+    stats = model_utils.get_prediction_cache_stats()
+    assert (stats['hits'], stats['misses']) == (2, 4)
+
+
+def test_model_change_invalidates_cached_predictions(model_file, forest_data):
+    before = model_utils.make_prediction(_student(55))
+    _replace_model(model_file, forest_data)
+
+    after = model_utils.make_prediction(_student(55))
+    stats = model_utils.get_prediction_cache_stats()
+    assert stats['invalidations'] == 1
+    assert stats['misses'] == 2 and stats['size'] == 1
+    assert after[0] != before[0]
+
+
+def test_results_are_keyed_on_the_computing_packages_version(model_file, forest_data):
+    old_package = model_utils.load_model()
+    _replace_model(model_file, forest_data)
+    new_package = model_utils.load_model()
+    assert model_utils.get_model_version() == new_package['model_version'] != old_package['model_version']
+    # A request still holding the old package caches under the old version, not the current one
+    assert model_utils._prediction_cache_key(old_package, _student(55))[0] == old_package['model_version']
+
+def test_batch_validation_flags_invalid_rows(model_file, forest_data):
+    students = pd.DataFrame({
+        'name': ['ok', 'high', 'text', 'two errors', 'ok too'],
+        'math_score': [55, 120, 'n/a', 60, 90],
+        'reading_score': [60, 70, 70, -1, 85],
+        'writing_score': [58, 70, 70, 60, 88],
+        'attendance': [80, 90, 90, 90, 97],
+        'behavior': [3, 4, 4, 9, 5],
+        'literacy': [5, 6, 6, 6, 9]
+    })
+    results = model_utils.make_predictions(students)
+
+    assert list(results['valid']) == [True, False, False, False, True]
+    assert results.loc[1, 'validation_error'] == "math_score must be between 0 and 100"
+    assert results.loc[2, 'validation_error'] == "math_score is missing or not numeric"
+    # The first failing column is reported
+    assert results.loc[3, 'validation_error'] == "reading_score must be between 0 and 100"
+    assert results.loc[1:3, 'probability'].isna().all()
+    assert results.loc[1:3, 'risk_level'].isna().all()
+    assert list(results['name']) == list(students['name'])
+
+    # Valid rows are scored exactly as the model scores them
+    valid = students.loc[[0, 4], FEATURES].to_numpy(dtype=float)
+    np.testing.assert_allclose(results.loc[[0, 4], 'probability'], forest_data[0].predict_proba(valid)[:, 1])
+
+
+def test_batch_records_keep_only_valid_rows(model_file):
+    students = pd.DataFrame({
+        'student_name': ['Amina', 'Omar', None],
+        'math_score': [55, 120, 90], 'reading_score': [60, 70, 85], 'writing_score': [58, 70, 88],
+        'attendance': [80, 90, 97], 'behavior': [3, 4, 5], 'literacy': [5, 6, 9]
+    })
+    records = model_utils.prediction_records(model_utils.make_predictions(students), timestamp='2024-03-01T09:00:00')
+
+    assert [record['student_name'] for record in records] == ['Amina', None]
+    assert records[0]['timestamp'] == '2024-03-01T09:00:00'
+    assert records[0]['math_score'] == 55 and records[0]['risk_level'] in ('Low Risk', 'Medium Risk', 'High Risk')
+    # Plain Python values, so the journal stores numbers rather than their repr
+    assert all(type(record['prediction']) is int and type(record['probability']) is float for record in records)
+
+
+def test_batch_input_must_have_every_feature(model_file):
+    with pytest.raises(ValueError, match="literacy"):
+        model_utils.make_predictions(pd.DataFrame({column: [1] for column in FEATURES[:-1]}))
+    with pytest.raises(ValueError):
+        model_utils.make_predictions(np.ones((2, 5)))
+    results = model_utils.make_predictions(np.array([[50, 50, 50, 90, 3, 5]]))
+    assert results.loc[0, 'risk_level'] in ('Low Risk', 'Medium Risk', 'High Risk')
+
+
+@pytest.fixture
+def no_model(tmp_path, monkeypatch, forest_data):
+    """No model file at all; the fallback model trains quickly into tmp_path"""
+    sample_path = tmp_path / 'sample_model.pkl'
+    monkeypatch.setattr(model_utils, 'get_model_path', lambda *args, **kwargs: str(tmp_path / 'missing.pkl'))
+    monkeypatch.setattr(model_utils, 'get_sample_model_path', lambda: str(sample_path))
+    monkeypatch.setattr(model_utils, 'create_sample_model', lambda *args, **kwargs: forest_data[0])
+    monkeypatch.setattr(model_utils, '_warmup_thread', None)
+    monkeypatch.setattr(model_utils, '_warmup_status', dict.fromkeys(model_utils._warmup_status, False))
+    model_utils.clear_model_cache()
+    model_utils.clear_prediction_cache()
+    yield sample_path
+    # The warmup thread must not outlive the patched paths
+    if model_utils._warmup_thread is not None:
+        model_utils._warmup_thread.join()
+    model_utils.clear_model_cache()
+    model_utils.clear_prediction_cache()
+
+
+def test_requests_never_train_the_fallback_model(no_model):
+    with pytest.raises(model_utils.ModelNotReadyError):
+        model_utils.load_model()
+    # The request started the warmup instead of training itself
+    model_utils.warm_up_model(wait=True)
+    assert no_model.exists()
+    assert model_utils.is_model_ready()
+    assert model_utils.load_model()['metadata']['version'] == 'sample'
+
+
+
+def test_failed_warmup_is_retried_after_its_backoff(no_model, monkeypatch, forest_data):
+    monkeypatch.setattr(model_utils, 'WARMUP_RETRY_BASE', 0.3)
+    attempts = []
+
+    def flaky_training(*args, **kwargs):
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise MemoryError("out of memory")
+        return forest_data[0]
+
+    monkeypatch.setattr(model_utils, 'create_sample_model', flaky_training)
+    failed = model_utils.warm_up_model(wait=True)
+    assert model_utils._warmup_status['failures'] == 1 and not model_utils.is_model_ready()
+    # Within the backoff the failed warmup is not started again
+    assert model_utils.warm_up_model() is failed
+
+    time.sleep(0.35)
+    retried = model_utils.warm_up_model(wait=True)
+    assert retried is not failed and len(attempts) == 2
+    assert model_utils.is_model_ready() and model_utils._warmup_status['failures'] == 0
+
+def test_requests_wait_for_a_warmup_that_only_loads(model_file, monkeypatch):
+    monkeypatch.setattr(model_utils, '_warmup_thread', None)
+    monkeypatch.setattr(model_utils, '_warmup_status', dict.fromkeys(model_utils._warmup_status, False))
+    loading, release = threading.Event(), threading.Event()
+    load_from_disk = model_utils._load_model_from_disk
+
+    def slow_load(model_path):
+        loading.set()
+        release.wait(10)
+        return load_from_disk(model_path)
+
+    monkeypatch.setattr(model_utils, '_load_model_from_disk', slow_load)
+    warmup = model_utils.warm_up_model()
+    assert loading.wait(10)
+
+    results = []
+    request = threading.Thread(target=lambda: results.append(model_utils.make_prediction(_student(55))))
+    request.start()
+    release.set()
+    request.join()
+    warmup.join()
+    # The request was answered by the model (and cached), not by the rule-based fallback
+    stats = model_utils.get_prediction_cache_stats()
+    assert len(results) == 1 and (stats['misses'], stats['size']) == (1, 1)
@@ -0,0 +1,82 @@
+from datetime import date
+
+import pytest
+
+from utils import data_utils
+from utils.observation_index import ObservationIndex, make_key, split_key, to_ordinal, UNKNOWN_ORDINAL
+
+
+def _observation(child, day, n):
+    return {'child_name': child, 'date': day, 'n': n}
+
+
+@pytest.fixture
+def index():
+    return ObservationIndex([
+        _observation('Amina', '2024-03-01', 0),
+        _observation('Amina', '2024-03-05', 1),
+        _observation('Hassan', '2024-03-02', 2),
+        # Back-dated entries land after the earlier saves of the same day
+        _observation('Amina', '2024-03-01', 3),
+        _observation('Amina', '2024-03-03', 4),
+        _observation('Amina', 'not a date', 5),
+    ])
+
+
+@pytest.mark.parametrize('sequence', [0, 7, -1, -5, (1 << 31) - 1, -(1 << 31)])
+def test_keys_round_trip_and_sort_by_date_first(sequence):
+    ordinal = date(2024, 3, 1).toordinal()
+    assert split_key(make_key(ordinal, sequence)) == (ordinal, sequence)
+    assert make_key(ordinal - 1, (1 << 31) - 1) < make_key(ordinal, sequence) < make_key(ordinal + 1, -(1 << 31))
+
+
+def test_to_ordinal_parses_dates_and_strings():
+    assert to_ordinal('2024-03-01') == to_ordinal(date(2024, 3, 1)) == to_ordinal('2024-03-01T18:00:00')
+    assert to_ordinal(None) == to_ordinal('soon') == UNKNOWN_ORDINAL
+
+
+def test_back_dated_records_are_ordered_by_date_then_save_order(index):
+    assert [record['n'] for record in index.query('Amina')] == [5, 0, 3, 4, 1]
+    assert [record['n'] for record in index.query('Amina', descending=True)] == [1, 4, 3, 0, 5]
+    assert index.count('Amina') == 5
+    assert sorted(index.children()) == ['Amina', 'Hassan']
+
+
+def test_date_range_is_inclusive_and_skips_unknown_dates(index):
+    assert [record['n'] for record in index.query('Amina', '2024-03-01', '2024-03-03')] == [0, 3, 4]
+    assert [record['n'] for record in index.query('Amina', end_date='2024-03-02')] == [5, 0, 3]
+    assert index.query('Amina', '2024-03-06') == []
+    assert index.query('Nobody') == []
+
+
+def test_limit_keeps_the_first_rows_in_the_requested_order(index):
+    assert [record['n'] for record in index.query('Amina', '2024-03-01', limit=2)] == [0, 3]
+    assert [record['n'] for record in index.query('Amina', '2024-03-01', descending=True, limit=2)] == [1, 4]
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_cursor_paging_visits_every_record_once(index, descending):
+    seen, after = [], None
+    while True:
+        page = index.query_keyed('Amina', '2024-03-01', descending=descending, limit=2, after=after)
+        if not page:
+            break
+        seen.extend(record['n'] for _, record in page)
+        after = page[-1][0]
+    assert seen == ([1, 4, 3, 0] if descending else [0, 3, 4, 1])
+
+
+def test_cursor_keeps_its_place_when_records_are_added(index):
+    page = index.query_keyed('Amina', '2024-03-01', limit=2)
+    index.add(_observation('Amina', '2024-03-04', 6))
+    rest = index.query_keyed('Amina', '2024-03-01', after=page[-1][0])
+    assert [record['n'] for _, record in rest] == [4, 6, 1]
+
+
+def test_queries_see_records_saved_after_the_index_was_built(data_dir):
+    data_utils.save_parent_observation(_observation('Amina', '2024-03-05', 0))
+    assert len(data_utils.query_parent_observations('Amina')) == 1
+    data_utils.save_parent_observation(_observation('Amina', '2024-03-01', 1))
+    data_utils.save_parent_observation(_observation('Omar', '2024-03-02', 2))
+    assert [record['n'] for record in data_utils.query_parent_observations('Amina')] == [1, 0]
+    assert [record['n'] for record in data_utils.query_parent_observations('Amina', end_date=date(2024, 3, 4))] == [1]
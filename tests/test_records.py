@@ -0,0 +1,77 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from utils.records import (PredictionRecord, decode_prediction, decode_observation,
+                           records_to_columns, records_to_frame)
+
+
+STORED_PREDICTION = {
+    'timestamp': '2024-03-01T09:30:00', 'student_name': 'Amina', 'assessment_date': '2024-02-28',
+    'math_score': 72, 'reading_score': '65.5', 'prediction': '1', 'probability': 0.81,
+    'risk_level': 'High Risk', 'reviewed_by': 'Teacher Ali'
+}
+
+
+def test_decoder_parses_field_types():
+    record = decode_prediction(STORED_PREDICTION)
+    assert isinstance(record, PredictionRecord)
+    assert record.timestamp == datetime(2024, 3, 1, 9, 30)
+    assert record.assessment_date == date(2024, 2, 28)
+    assert record.math_score == 72.0 and isinstance(record.math_score, float)
+    assert record.reading_score == 65.5
+    assert record.prediction == 1
+    assert record.writing_score is None
+
+
+def test_unparseable_values_become_missing():
+    record = decode_observation({'child_name': 'Amina', 'date': 'yesterday', 'reading_time': 'a lot',
+                                 'subjects_struggled': 'Math', 'medication_taken': 0})
+    assert record.date is None
+    assert record.reading_time is None
+    assert record.subjects_struggled == []
+    assert record.medication_taken is False
+
+
+def test_dict_style_access_and_extra_keys():
+    record = decode_prediction(STORED_PREDICTION)
+    assert record['student_name'] == 'Amina'
+    assert record['reviewed_by'] == 'Teacher Ali'
+    assert record.get('notes', 'none') == 'none'
+    assert record.get('missing') is None
+    assert 'reviewed_by' in record and 'notes' not in record
+    with pytest.raises(KeyError):
+        record['missing']
+    assert decode_prediction({'student_name': 'Hassan'}).extra is None
+
+
+def test_to_dict_round_trips():
+    record = decode_prediction(STORED_PREDICTION)
+    stored = record.to_dict()
+    assert stored['timestamp'] == '2024-03-01T09:30:00'
+    assert stored['assessment_date'] == '2024-02-28'
+    assert stored['reviewed_by'] == 'Teacher Ali'
+    assert decode_prediction(stored) == record
+
+
+def test_columns_are_typed_with_nan_and_nat_for_missing_values():
+    records = [
+        decode_observation({'child_name': 'Amina', 'date': '2024-03-01', 'timestamp': '2024-03-01T18:00:00',
+                            'reading_time': 20, 'medication_taken': True}),
+        decode_observation({'child_name': 'Hassan', 'reading_time': None}),
+    ]
+    columns = records_to_columns(records)
+    assert columns['date'].dtype == np.dtype('datetime64[D]')
+    assert columns['date'][0] == np.datetime64('2024-03-01')
+    assert np.isnat(columns['date'][1])
+    assert columns['timestamp'].dtype == np.dtype('datetime64[us]')
+    assert np.isnat(columns['timestamp'][1])
+    assert columns['reading_time'].dtype == np.float64
+    assert columns['reading_time'][0] == 20.0 and np.isnan(columns['reading_time'][1])
+    assert list(columns['medication_taken'][:1]) == [1.0]
+    assert list(columns['child_name']) == ['Amina', 'Hassan']
+
+    frame = records_to_frame(records, ['child_name', 'reading_time'])
+    assert list(frame.columns) == ['child_name', 'reading_time']
+    assert records_to_columns([]) == {}
@@ -0,0 +1,137 @@
+from datetime import date
+
+import pytest
+
+from utils import data_utils, sqlite_store
+from utils.retention import roll_over, needs_roll_over, get_hot_from, archived_count, iter_archive
+
+
+def _observation(day, note, child_name='Amina'):
+    return {'child_name': child_name, 'date': day, 'timestamp': f"{day}T09:00:00", 'learning_wins': note}
+
+
+@pytest.fixture
+def archived_observations(data_dir, monkeypatch):
+    """Observations rolled over at 2024-05-01, then a hot record back-dated before that"""
+    monkeypatch.setattr(data_utils, 'RETENTION_ENABLED', False)
+    for day in ['2024-01-05', '2024-01-10', '2024-02-01', '2024-03-01', '2024-06-01']:
+        data_utils.save_parent_observation(_observation(day, day))
+    data_utils.save_parent_observation(_observation('2024-01-20', 'other child', child_name='Omar'))
+    journal = data_utils._get_journal(data_utils.PARENT_OBSERVATIONS_JOURNAL, data_utils.PARENT_OBSERVATIONS_FILE)
+    assert roll_over('observations', journal, 'date', cutoff=date(2024, 5, 1)) == 5
+    data_utils.save_parent_observation(_observation('2024-02-15', 'back-dated'))
+    data_utils.save_parent_observation(_observation('2024-06-10', '2024-06-10'))
+
+
+def test_roll_over_moves_old_records_to_archive(archived_observations):
+    assert get_hot_from('observations') == '2024-05-01'
+    assert archived_count('observations') == 5
+    # Whole segments are skipped when they end before start_day
+    assert len(list(iter_archive('observations', start_day='2024-01-15'))) == 5
+    assert list(iter_archive('observations', start_day='2024-04-01')) == []
+    # Loads are hot-only unless the archive is asked for
+    assert len(data_utils.load_parent_observations()) == 3
+    assert len(data_utils.load_parent_observations(include_archive=True)) == 8
+
+
+def _page_through(page_size, descending, child_name):
+    notes, cursor = [], None
+    for _ in range(50):
+        page, cursor = data_utils.page_parent_observations(
+            page_size, cursor, child_name=child_name, descending=descending)
+        notes.extend(record['learning_wins'] for record in page)
+        if cursor is None:
+            return notes
+    pytest.fail("paging did not terminate")
+
+
+@pytest.mark.parametrize('page_size', [1, 2, 3, 20])
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('child_name', ['Amina', None])
+def test_paging_crosses_archive_boundary(archived_observations, page_size, descending, child_name):
+    expected = ['2024-01-05', '2024-01-10', 'other child', '2024-02-01', 'back-dated',
+                '2024-03-01', '2024-06-01', '2024-06-10']
+    if child_name:
+        expected.remove('other child')
+    if descending:
+        expected.reverse()
+    assert _page_through(page_size, descending, child_name) == expected
+
+
+@pytest.fixture
+def term(data_dir, monkeypatch):
+    """Retention on, with the current term start under the test's control"""
+    current = {'start': date(2024, 5, 1)}
+    monkeypatch.setattr(data_utils, 'RETENTION_ENABLED', True)
+    monkeypatch.setattr(data_utils, 'get_term_start', lambda: current['start'])
+    monkeypatch.setattr('utils.retention.get_term_start', lambda day=None: current['start'])
+    return current
+
+
+def test_old_record_after_a_current_one_is_rolled_over(term, monkeypatch):
+    monkeypatch.setattr(data_utils, 'RETENTION_ENABLED', False)
+    data_utils.save_parent_observation(_observation('2024-06-01', 'current'))
+    data_utils.save_parent_observation(_observation('2024-02-15', 'back-dated'))
+    assert needs_roll_over(data_utils.PARENT_OBSERVATIONS_JOURNAL, 'date')
+
+    # A new process opens the journal
+    monkeypatch.setattr(data_utils, 'RETENTION_ENABLED', True)
+    monkeypatch.setattr(data_utils, '_journals', {})
+    assert [obs['learning_wins'] for obs in data_utils.load_parent_observations()] == ['current']
+    assert archived_count('observations') == 1
+    assert not needs_roll_over(data_utils.PARENT_OBSERVATIONS_JOURNAL, 'date')
+
+
+def test_running_process_rolls_over_when_the_term_changes(term):
+    for day in ['2024-05-10', '2024-06-01', '2024-08-20']:
+        data_utils.save_parent_observation(_observation(day, day))
+    assert archived_count('observations') == 0
+
+    term['start'] = date(2024, 9, 1)
+    data_utils.save_parent_observation(_observation('2024-09-02', '2024-09-02'))
+    assert archived_count('observations') == 3
+    assert get_hot_from('observations') == '2024-09-01'
+    assert [obs['date'] for obs in data_utils.load_parent_observations()] == ['2024-09-02']
+    assert [obs['date'] for obs in data_utils.query_parent_observations('Amina', start_date='2024-06-01')] == \
+        ['2024-06-01', '2024-08-20', '2024-09-02']
+
+
+@pytest.fixture
+def sqlite_term(term, data_dir, monkeypatch):
+    monkeypatch.setenv('EDUSCAN_SQLITE_PATH', str(data_dir / 'data' / 'eduscan.db'))
+    monkeypatch.setattr(data_utils, 'STORAGE_BACKEND', 'sqlite')
+    yield term
+    sqlite_store.close_connections()
+
+
+def test_sqlite_rows_are_rolled_over_when_the_term_changes(sqlite_term, monkeypatch):
+    for day in ['2024-05-10', '2024-08-20', '2024-06-01']:
+        data_utils.save_parent_observation(_observation(day, day))
+
+    sqlite_term['start'] = date(2024, 9, 1)
+    data_utils.save_parent_observation(_observation('2024-09-02', '2024-09-02'))
+    assert archived_count('observations') == 3
+    assert sqlite_store.count_rows('parent_observations') == 1
+    assert [obs['date'] for obs in data_utils.load_parent_observations()] == ['2024-09-02']
+    assert len(data_utils.load_parent_observations(include_archive=True)) == 4
+
+    # Historical ranges and paging still see the archived rows, in date order
+    assert [obs['date'] for obs in data_utils.query_parent_observations(start_date='2024-06-01')] == \
+        ['2024-06-01', '2024-08-20', '2024-09-02']
+    expected = ['2024-05-10', '2024-06-01', '2024-08-20', '2024-09-02']
+    for descending in (False, True):
+        assert _page_through(1, descending, 'Amina') == (expected[::-1] if descending else expected)
+
+
+def test_table_emptied_by_a_rollover_is_not_imported_again(sqlite_term, monkeypatch):
+    data_utils.save_parent_observation(_observation('2024-06-01', 'saved'))
+    sqlite_term['start'] = date(2024, 9, 1)
+    data_utils.load_parent_observations()
+    assert sqlite_store.count_rows('parent_observations') == 0
+
+    # The journal still holds records from before the database was selected
+    data_utils._append_record(data_utils.PARENT_OBSERVATIONS_JOURNAL, data_utils.PARENT_OBSERVATIONS_FILE,
+                              _observation('2024-03-01', 'journal'))
+    monkeypatch.setattr(data_utils, '_sqlite_ready', False)
+    assert data_utils.load_parent_observations() == []
+    assert [obs['learning_wins'] for obs in data_utils.load_parent_observations(include_archive=True)] == ['saved']
@@ -0,0 +1,91 @@
+import pytest
+
+from utils import data_utils, sqlite_store
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'eduscan.db')
+    yield path
+    sqlite_store.close_connections()
+
+
+def _observation(child, day, reading_time=10):
+    return {'child_name': child, 'date': day, 'timestamp': f"{day}T18:00:00", 'reading_time': reading_time}
+
+
+def test_predictions_by_student_and_time_range(db_path):
+    sqlite_store.insert_predictions([
+        {'student_name': 'Amina', 'timestamp': '2024-03-01T09:00:00', 'risk_level': 'Low Risk'},
+        {'student_name': 'Hassan', 'timestamp': '2024-03-02T09:00:00', 'risk_level': 'High Risk'},
+        {'student_name': 'Amina', 'timestamp': '2024-03-05T09:00:00', 'risk_level': 'High Risk'},
+    ], db_path=db_path)
+
+    amina = [record['timestamp'] for _, record in sqlite_store.query_predictions('Amina', db_path=db_path)]
+    assert amina == ['2024-03-01T09:00:00', '2024-03-05T09:00:00']
+
+    # The end bound is exclusive
+    in_range = sqlite_store.query_predictions(start='2024-03-02', end='2024-03-05T09:00:00', db_path=db_path)
+    assert [record['student_name'] for _, record in in_range] == ['Hassan']
+
+    high = sqlite_store.query_predictions(risk_level='High Risk', descending=True, db_path=db_path)
+    assert [record['student_name'] for _, record in high] == ['Amina', 'Hassan']
+
+
+def test_observations_by_child_and_date_range(db_path):
+    sqlite_store.insert_observations([
+        _observation('Amina', '2024-03-01'),
+        _observation('Amina', '2024-03-03'),
+        _observation('Hassan', '2024-03-02'),
+        _observation('Amina', '2024-03-07'),
+    ], db_path=db_path)
+
+    rows = sqlite_store.query_observations('Amina', start_date='2024-03-01', end_date='2024-03-03', db_path=db_path)
+    assert [record['date'] for _, record in rows] == ['2024-03-01', '2024-03-03']
+    latest = sqlite_store.query_observations('Amina', descending=True, limit=1, db_path=db_path)
+    assert [record['date'] for _, record in latest] == ['2024-03-07']
+    assert sqlite_store.count_rows('parent_observations', db_path=db_path) == 4
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_keyset_paging_visits_every_row_once(db_path, descending):
+    # Several records on one day: the id breaks the tie between them
+    days = ['2024-03-01', '2024-03-02', '2024-03-02', '2024-03-02', '2024-03-04']
+    sqlite_store.insert_observations([_observation('Amina', day, n) for n, day in enumerate(days)], db_path=db_path)
+
+    pages, after = [], None
+    while True:
+        page = list(sqlite_store.query_observations('Amina', descending=descending, limit=2, after=after, db_path=db_path))
+        if not page:
+            break
+        pages.append([record['reading_time'] for _, record in page])
+        after = page[-1][0]
+
+    expected = [4, 3, 2, 1, 0] if descending else [0, 1, 2, 3, 4]
+    assert [n for page in pages for n in page] == expected
+    assert [len(page) for page in pages] == [2, 2, 1]
+
+
+def test_backend_is_seeded_from_the_journals(data_dir, monkeypatch):
+    data_utils.save_parent_observation(_observation('Amina', '2024-03-01', 1))
+    monkeypatch.setenv('EDUSCAN_SQLITE_PATH', str(data_dir / 'data' / 'eduscan.db'))
+    monkeypatch.setattr(data_utils, 'STORAGE_BACKEND', 'sqlite')
+    try:
+        data_utils.save_parent_observation(_observation('Amina', '2024-03-02', 2))
+        assert [record['reading_time'] for record in data_utils.load_parent_observations()] == [1, 2]
+    finally:
+        sqlite_store.close_connections()
+
+
+def test_iter_rows_from_picks_up_after_a_watermark(db_path):
+    sqlite_store.insert_observations([_observation('Amina', '2024-03-01', 1)], db_path=db_path)
+    first = list(sqlite_store.iter_rows_from('parent_observations', db_path=db_path))
+    assert [record['reading_time'] for _, record in first] == [1]
+
+    sqlite_store.insert_observations([_observation('Amina', '2024-03-02', 2), _observation('Amina', '2024-03-03', 3)], db_path=db_path)
+    watermark = first[-1][0] + 1
+    rest = list(sqlite_store.iter_rows_from('parent_observations', watermark, db_path=db_path))
+    assert [record['reading_time'] for _, record in rest] == [2, 3]
+
+    with pytest.raises(ValueError):
+        list(sqlite_store.iter_rows_from('students', db_path=db_path))
@@ -0,0 +1,143 @@
+import json
+from contextlib import contextmanager
+
+import psycopg2
+import pytest
+
+from utils import sync_utils
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = None
+
+    def execute(self, sql, params=None):
+        if 'to_regclass' in sql:
+            self.result = ('schema_migrations' if self.conn.schema_version else None,)
+        elif 'schema_migrations' in sql:
+            self.result = (self.conn.schema_version,)
+
+    def fetchone(self):
+        return self.result
+
+
+class FakeConnection:
+    """Answers the schema check; the writers are replaced in the tests"""
+
+    def __init__(self, schema_version):
+        self.schema_version = schema_version
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def outbox(data_dir, monkeypatch):
+    conn = FakeConnection(schema_version=sync_utils.REQUIRED_SCHEMA_VERSION)
+    written = []
+
+    @contextmanager
+    def fake_db_connection():
+        yield conn
+
+    def writer(cur, records, uids):
+        for record, uid in zip(records, uids):
+            if record.get('notes') == 'bad':
+                raise psycopg2.DataError("invalid input syntax")
+            if uid not in {written_uid for written_uid, _ in written}:
+                written.append((uid, record))
+        return len(records)
+
+    monkeypatch.setattr(sync_utils, '_outbox', None)
+    monkeypatch.setattr(sync_utils, '_schema_ready', False)
+    monkeypatch.setattr(sync_utils, 'start_sync_worker', lambda: True)
+    monkeypatch.setattr(sync_utils, 'db_connection', fake_db_connection)
+    monkeypatch.setattr(sync_utils, 'invalidate_database_stats', lambda: None)
+    monkeypatch.setitem(sync_utils._WRITERS, 'prediction', writer)
+    monkeypatch.setitem(sync_utils._WRITERS, 'observation', writer)
+    return conn, written
+
+
+def _prediction(name, notes=''):
+    return {'student_name': name, 'timestamp': '2024-03-01T10:00:00', 'notes': notes}
+
+
+def test_queued_records_are_synced_once(outbox):
+    _, written = outbox
+    uids = [sync_utils.enqueue('prediction', _prediction(name)) for name in ('Amina', 'Omar')]
+    sync_utils.enqueue('observation', {'child_name': 'Amina', 'date': '2024-03-01'})
+
+    assert sync_utils.sync_now() == 3
+    assert [uid for uid, _ in written][:2] == uids
+    assert sync_utils.get_sync_status()['pending'] == 0
+    # Nothing new: a second pass sends nothing again
+    assert sync_utils.sync_now() == 0
+    assert len(written) == 3
+
+
+def test_batch_is_queued_with_one_outbox_write(outbox):
+    _, written = outbox
+    uids = sync_utils.enqueue_many('prediction', [_prediction(name) for name in ('Amina', 'Omar', 'Hodan')])
+
+    assert sync_utils._get_outbox().stats['appends'] == 3
+    assert sync_utils.sync_now() == 3
+    assert [uid for uid, _ in written] == uids
+
+
+def test_outdated_schema_is_reported_and_nothing_is_sent(outbox):
+    conn, written = outbox
+    conn.schema_version = 2
+    sync_utils.enqueue('prediction', _prediction('Amina'))
+
+    assert sync_utils.sync_now(force=True) is None
+    status = sync_utils.get_sync_status()
+    assert 'needs version 3' in status['last_error'] and 'utils.db_migrations' in status['last_error']
+    assert status['pending'] == 1 and written == []
+
+    conn.schema_version = 3
+    assert sync_utils.sync_now(force=True) == 1
+    assert sync_utils.get_sync_status()['last_error'] is None
+
+
+def test_schema_errors_during_writes_are_reported(outbox, monkeypatch):
+    def missing_column(cur, records, uids):
+        raise psycopg2.ProgrammingError('column "record_uid" does not exist')
+
+    monkeypatch.setitem(sync_utils._WRITERS, 'prediction', missing_column)
+    sync_utils.enqueue('prediction', _prediction('Amina'))
+
+    assert sync_utils.sync_now(force=True) is None
+    assert 'utils.db_migrations' in sync_utils.get_sync_status()['last_error']
+    assert sync_utils.get_sync_status()['pending'] == 1
+
+
+def test_rejected_records_do_not_block_the_queue(outbox):
+    _, written = outbox
+    for name, notes in (('Amina', ''), ('Omar', 'bad'), ('Hodan', '')):
+        sync_utils.enqueue('prediction', _prediction(name, notes))
+
+    assert sync_utils.sync_now() == 2
+    assert [record['student_name'] for _, record in written] == ['Amina', 'Hodan']
+    with open(sync_utils.REJECTED_FILE) as f:
+        rejected = [json.loads(line) for line in f]
+    assert [entry['record']['student_name'] for entry in rejected] == ['Omar']
+    assert sync_utils.get_sync_status()['pending'] == 0
+
+
+def test_offline_mode_holds_the_queue(outbox):
+    with open('data/app_settings.json', 'w') as f:
+        json.dump({'offline_mode': True}, f)
+    sync_utils.enqueue('prediction', _prediction('Amina'))
+
+    assert sync_utils.is_offline()
+    assert sync_utils.sync_now() is None
+    assert sync_utils.get_sync_status()['pending'] == 1
+    assert sync_utils.sync_now(force=True) == 1
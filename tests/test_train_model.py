@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import train_model
+from utils.model_registry import discover_bundle, load_bundle, load_test_split, register_bundle
+from utils.train_model import cached_grid_search, expand_grid
+
+
+def test_expand_grid_covers_every_combination():
+    combinations = expand_grid({'n_estimators': [10, 20], 'max_depth': [None, 5, 10]})
+    assert len(combinations) == 6
+    assert {'max_depth': 5, 'n_estimators': 20} in combinations
+
+
+@pytest.fixture
+def counted_cells(monkeypatch):
+    """Fold scores computed by cached_grid_search, as (params, fold) pairs"""
+    computed = []
+    score_cell = train_model._score_cell
+
+    def counting_score_cell(*args):
+        computed.append(args[1])
+        return score_cell(*args)
+
+    monkeypatch.setattr(train_model, '_score_cell', counting_score_cell)
+    return computed
+
+
+@pytest.fixture
+def grid_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(120, 6))
+    return X, (X[:, 0] + X[:, 1] > 0).astype(int)
+
+
+def test_extended_grid_only_computes_new_cells(tmp_path, grid_data, counted_cells):
+    X, y = grid_data
+    best, results = cached_grid_search(X, y, {'n_estimators': [5, 10]}, str(tmp_path), n_jobs=1)
+    assert len(counted_cells) == 2 * train_model.CV_FOLDS
+    assert best in [{'n_estimators': 5}, {'n_estimators': 10}]
+
+    counted_cells.clear()
+    _, again = cached_grid_search(X, y, {'n_estimators': [5, 10]}, str(tmp_path), n_jobs=1)
+    assert counted_cells == []
+    assert [result['mean_score'] for result in again] == [result['mean_score'] for result in results]
+
+    _, extended = cached_grid_search(X, y, {'n_estimators': [5, 10, 20]}, str(tmp_path), n_jobs=1)
+    assert len(counted_cells) == train_model.CV_FOLDS
+    assert len(extended) == 3
+
+
+def test_default_valued_parameters_reuse_cached_cells(tmp_path, grid_data, counted_cells):
+    X, y = grid_data
+    cached_grid_search(X, y, {'n_estimators': [5]}, str(tmp_path), n_jobs=1)
+    counted_cells.clear()
+
+    # gini and max_depth=None are the defaults: only max_depth=3 is new
+    cached_grid_search(X, y, {'n_estimators': [5], 'criterion': ['gini']}, str(tmp_path), n_jobs=1)
+    assert counted_cells == []
+    cached_grid_search(X, y, {'n_estimators': [5], 'max_depth': [None, 3]}, str(tmp_path), n_jobs=1)
+    assert len(counted_cells) == train_model.CV_FOLDS
+    assert all(params['max_depth'] == 3 for params in counted_cells)
+
+
+def test_trained_bundle_keeps_its_test_split_for_importances(tmp_path, grid_data):
+    X, y = grid_data
+    data = pd.DataFrame(X * 10 + 50, columns=train_model.SELECTED_COLUMNS).assign(**{train_model.TARGET_COLUMN: y})
+    data.to_csv(tmp_path / 'students.csv', index=False)
+    output_dir = tmp_path / 'bundle'
+    metadata = train_model.train(str(tmp_path / 'students.csv'), str(output_dir), {'n_estimators': [5]}, n_jobs=1)
+    assert metadata['permutation_importance_source'] == 'test_split'
+
+    model_path = str(output_dir / 'learning_difficulty_detector.pkl')
+    package = load_bundle(discover_bundle(model_path))
+    assert package['metadata']['verified'] is True
+    X_test, y_test, source = load_test_split(package)
+    assert source == 'test_split'
+    assert len(X_test) == len(y_test) == round(len(X) * train_model.TEST_SIZE)
+
+    # Re-registering without a holdout CSV scores the same stored rows again
+    with open(register_bundle(model_path, str(output_dir / 'scaler.pkl'))) as f:
+        manifest = json.load(f)
+    assert manifest['test_split_file'] == 'test_split.npz'
+    assert manifest['metadata']['permutation_importance_source'] == 'test_split'
+    assert manifest['metadata']['permutation_importance'] == metadata['permutation_importance']
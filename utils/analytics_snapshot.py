@@ -0,0 +1,359 @@
+"""
+Columnar analytics snapshot of the prediction and observation records.
+
+Historical Analysis used to build a DataFrame from the full list of record
+dicts and re-parse every timestamp on each rerun. Instead, the records are
+mirrored into typed Parquet part files under data/snapshots/<dataset>/:
+
+- refresh_snapshot() converts only the records added since the last refresh
+  into a new part file, and compacts the parts once there are too many;
+- load_prediction_frame() / load_observation_frame() read just the requested
+  columns, with their final dtypes, straight into pandas.
+
+The part files listed in the snapshot's state.json always cover the first
+``source_rows`` records of the store, so a reader never sees a half-written
+snapshot. pyarrow is optional: without it the frames are built from the
+records with the same dtypes.
+
+The store is the archive segments (utils/retention.py) followed by the
+journal. Archived records are only read while the snapshot has not caught
+up with them, so a term rollover does not force a rebuild. With the SQLite
+backend the snapshot instead remembers the row id it has read up to and
+only fetches the rows after it; there a term rollover deletes rows from the
+table, so the snapshot is rebuilt (archive first) once the archive grows.
+"""
+
+import os
+import json
+import hashlib
+import threading
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from utils.data_utils import STORAGE_BACKEND, load_student_data, load_parent_observations, iter_stored_records_from
+from utils.retention import archived_count, iter_archive
+
+SNAPSHOT_DIR = "data/snapshots"
+STATE_FILE = "state.json"
+# Parts are merged into one file once there are more than this many
+MAX_PARTS = 16
+
+# Analytics columns and their types: timestamp, date, float, int, string or list
+PREDICTION_COLUMNS = {
+    'timestamp': 'timestamp',
+    'student_name': 'string',
+    'grade_level': 'string',
+    'teacher_name': 'string',
+    'assessment_date': 'date',
+    'math_score': 'float',
+    'reading_score': 'float',
+    'writing_score': 'float',
+    'attendance': 'float',
+    'behavior': 'float',
+    'literacy': 'float',
+    'prediction': 'int',
+    'probability': 'float',
+    'risk_level': 'string'
+}
+
+OBSERVATION_COLUMNS = {
+    'child_name': 'string',
+    'date': 'date',
+    'timestamp': 'timestamp',
+    'homework_completion': 'float',
+    'reading_time': 'float',
+    'focus_level': 'string',
+    'subjects_struggled': 'list',
+    'behavior_rating': 'float',
+    'mood_rating': 'float',
+    'sleep_hours': 'float',
+    'energy_level': 'string',
+    'screen_time': 'float',
+    'physical_activity': 'float',
+    'medication_taken': 'float'
+}
+
+DATASETS = {
+    'predictions': (PREDICTION_COLUMNS, load_student_data),
+    'observations': (OBSERVATION_COLUMNS, load_parent_observations)
+}
+
+_snapshot_lock = threading.Lock()
+# (dataset, parts, columns) -> DataFrame, so reruns skip even the Parquet read
+_frame_cache = {}
+_frame_cache_lock = threading.Lock()
+
+
+def _arrow_type(kind):
+    return {
+        'timestamp': pa.timestamp('us'),
+        'date': pa.timestamp('us'),
+        'float': pa.float64(),
+        'int': pa.int64(),
+        'string': pa.string(),
+        'list': pa.list_(pa.string())
+    }[kind]
+
+
+def records_to_frame(records, column_types):
+    """Convert record dicts into a DataFrame with one typed column per entry of column_types"""
+    frame = pd.DataFrame.from_records(records, columns=list(column_types)) if records else pd.DataFrame(columns=list(column_types))
+    for column, kind in column_types.items():
+        values = frame[column]
+        if kind in ('timestamp', 'date'):
+            frame[column] = pd.to_datetime(values, errors='coerce', format='ISO8601')
+            if kind == 'date':
+                frame[column] = frame[column].dt.normalize()
+        elif kind == 'float':
+            frame[column] = pd.to_numeric(values, errors='coerce').astype('float64')
+        elif kind == 'int':
+            frame[column] = pd.to_numeric(values, errors='coerce').astype('Int64')
+        elif kind == 'string':
+            frame[column] = values.where(values.isna(), values.astype(str)).astype(object)
+        elif kind == 'list':
+            frame[column] = values.map(lambda value: [str(item) for item in value] if isinstance(value, list) else [])
+    return frame
+
+
+def _record_fingerprint(record):
+    return hashlib.sha1(json.dumps(record, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _dataset_dir(dataset):
+    return os.path.join(SNAPSHOT_DIR, dataset)
+
+
+def _read_state(dataset):
+    try:
+        with open(os.path.join(_dataset_dir(dataset), STATE_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return _empty_state()
+
+
+def _empty_state():
+    return {'backend': STORAGE_BACKEND, 'source_rows': 0, 'last_fingerprint': None, 'last_id': None,
+            'archived': 0, 'parts': []}
+
+
+def _write_state(dataset, state):
+    state_path = os.path.join(_dataset_dir(dataset), STATE_FILE)
+    tmp_path = f"{state_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def _write_part(dataset, frame, column_types, first_row, last_row):
+    """Write one part file named after the record range it covers. Same range, same content."""
+    schema = pa.schema([(column, _arrow_type(kind)) for column, kind in column_types.items()])
+    table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+    file_name = f"part-{first_row:09d}-{last_row:09d}.parquet"
+    file_path = os.path.join(_dataset_dir(dataset), file_name)
+    tmp_path = f"{file_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, file_path)
+    return file_name
+
+
+def _journal_tail(dataset, state, load_records):
+    """
+    Records of the archive + journal store from the last one already in the
+    snapshot onwards, and the store's size. Resets state if the store no
+    longer starts with the snapshot's records.
+    """
+    # Loading first lets a pending term rollover finish before the archive is counted
+    records = load_records(include_archive=False)
+    archived = archived_count(dataset)
+    total = archived + len(records)
+    source_rows = state['source_rows']
+
+    first = max(source_rows - 1, 0)
+    tail = [record for _, record in iter_archive(dataset, skip=first)] if first < archived else []
+    tail.extend(records[max(first - archived, 0):])
+
+    still_prefix = (source_rows <= total and
+                    (source_rows == 0 or (tail and _record_fingerprint(tail[0]) == state['last_fingerprint'])))
+    if not still_prefix:
+        print(f"Rebuilding {dataset} snapshot: the store no longer matches it")
+        state.update(_empty_state())
+        tail = [record for _, record in iter_archive(dataset)] + records
+    return (tail[1:] if state['source_rows'] else tail), total, None, archived
+
+
+def _sqlite_tail(dataset, state):
+    """
+    Like _journal_tail for the SQLite store: only rows from the snapshot's
+    last row id on are read. A snapshot built from scratch starts with the
+    archived records, and is rebuilt when a rollover has archived more.
+    """
+    # Opening the store finishes a due rollover before the archive is counted
+    rows = iter_stored_records_from(dataset, state.get('last_id') or 0)
+    archived = archived_count(dataset)
+    pairs = list(rows)
+    last_id = state.get('last_id')
+    still_prefix = (state['source_rows'] == 0 or
+                    (state.get('archived', 0) == archived and
+                     (last_id is None or (pairs and pairs[0][0] == last_id and
+                                          _record_fingerprint(pairs[0][1]) == state['last_fingerprint']))))
+    if not still_prefix:
+        print(f"Rebuilding {dataset} snapshot: the store no longer matches it")
+        state.update(_empty_state())
+        pairs = list(iter_stored_records_from(dataset))
+        last_id = None
+    new_pairs = pairs[1:] if last_id is not None else pairs
+    new_records = [record for _, record in new_pairs]
+    if state['source_rows'] == 0:
+        new_records = [record for _, record in iter_archive(dataset)] + new_records
+    last_row_id = new_pairs[-1][0] if new_pairs else last_id
+    return new_records, state['source_rows'] + len(new_records), last_row_id, archived
+
+
+def refresh_snapshot(dataset='predictions'):
+    """
+    Bring the snapshot of a dataset up to date with the store.
+
+    Only records added since the last refresh are converted. If the store no
+    longer starts with the records already in the snapshot (e.g. it was
+    rewritten), or a part file the state lists is gone, the snapshot is
+    rebuilt from scratch.
+
+    Returns the snapshot state, or None if pyarrow is not installed.
+    """
+    if not PYARROW_AVAILABLE:
+        return None
+    column_types, load_records = DATASETS[dataset]
+
+    with _snapshot_lock:
+        os.makedirs(_dataset_dir(dataset), exist_ok=True)
+        state = _read_state(dataset)
+        if state.get('backend', 'journal') != STORAGE_BACKEND:
+            # Row counts and ids of the other backend mean nothing here
+            state = _empty_state()
+        missing = [part for part in state['parts'] if not os.path.exists(os.path.join(_dataset_dir(dataset), part))]
+        if missing:
+            # Another process compacted concurrently and its state write lost
+            # the race; the listed parts are gone for good
+            print(f"Rebuilding {dataset} snapshot: {missing[0]} is missing")
+            state = _empty_state()
+        rebuilt = bool(missing)
+
+        if STORAGE_BACKEND == 'sqlite':
+            new_records, total, last_id, archived = _sqlite_tail(dataset, state)
+        else:
+            new_records, total, last_id, archived = _journal_tail(dataset, state, load_records)
+        source_rows = state['source_rows']
+
+        if not new_records:
+            if rebuilt:
+                _write_state(dataset, state)
+            return state
+
+        frame = records_to_frame(new_records, column_types)
+        parts = list(state['parts'])
+        parts.append(_write_part(dataset, frame, column_types, source_rows, total))
+
+        if len(parts) > MAX_PARTS:
+            tables = [pq.read_table(os.path.join(_dataset_dir(dataset), part)) for part in parts]
+            merged = pa.concat_tables(tables).to_pandas()
+            parts = [_write_part(dataset, merged, column_types, 0, total)]
+
+        state = {
+            'backend': STORAGE_BACKEND,
+            'source_rows': total,
+            'last_fingerprint': _record_fingerprint(new_records[-1]),
+            'last_id': last_id,
+            'archived': archived,
+            'parts': parts
+        }
+        _write_state(dataset, state)
+        _remove_unlisted_parts(dataset, parts)
+        return state
+
+
+def _remove_unlisted_parts(dataset, parts):
+    keep = set(parts)
+    for file_name in os.listdir(_dataset_dir(dataset)):
+        if file_name.startswith('part-') and file_name.endswith('.parquet') and file_name not in keep:
+            try:
+                os.remove(os.path.join(_dataset_dir(dataset), file_name))
+            except OSError:
+                pass
+
+
+def load_frame(dataset, columns=None):
+    """
+    Load a dataset as a typed DataFrame, refreshing the snapshot first.
+    The frame may be shared with other sessions; treat it as read-only.
+
+    Args:
+        dataset (str): 'predictions' or 'observations'
+        columns (list): Columns to read; defaults to all analytics columns
+    """
+    column_types, load_records = DATASETS[dataset]
+    columns = list(columns or column_types)
+    unknown = [column for column in columns if column not in column_types]
+    if unknown:
+        raise ValueError(f"Unknown {dataset} columns: {', '.join(unknown)}")
+
+    try:
+        state = refresh_snapshot(dataset)
+    except Exception as e:
+        print(f"Error refreshing {dataset} snapshot: {e}")
+        state = None
+
+    if state is None:
+        return records_to_frame(load_records(), {column: column_types[column] for column in columns})
+
+    parts = tuple(state['parts'])
+    cache_key = (dataset, parts, tuple(columns))
+    with _frame_cache_lock:
+        frame = _frame_cache.get(cache_key)
+    if frame is not None:
+        return frame
+
+    try:
+        paths = [os.path.join(_dataset_dir(dataset), part) for part in parts]
+        table = pa.concat_tables([pq.read_table(path, columns=columns) for path in paths]) if paths else None
+    except Exception as e:
+        # e.g. a part compacted away by another process since the state was read
+        print(f"Error reading {dataset} snapshot: {e}")
+        return records_to_frame(load_records(), {column: column_types[column] for column in columns})
+
+    if table is not None:
+        # split_blocks lets numeric columns become pandas blocks without consolidation copies
+        frame = table.to_pandas(split_blocks=True)
+    else:
+        frame = records_to_frame([], {column: column_types[column] for column in columns})
+
+    with _frame_cache_lock:
+        # Frames of older snapshot versions are never asked for again
+        for key in [key for key in _frame_cache if key[0] == dataset and key[1] != parts]:
+            del _frame_cache[key]
+        _frame_cache[cache_key] = frame
+    return frame
+
+
+def load_prediction_frame(columns=None):
+    """Typed DataFrame of the prediction history (see PREDICTION_COLUMNS)"""
+    return load_frame('predictions', columns)
+
+
+def load_observation_frame(columns=None):
+    """Typed DataFrame of the parent observations (see OBSERVATION_COLUMNS)"""
+    return load_frame('observations', columns)
+
+
+if __name__ == "__main__":
+    for name in DATASETS:
+        result = refresh_snapshot(name)
+        if result is None:
+            print("pyarrow is not installed; snapshots are disabled")
+            break
+        print(f"{name}: {result['source_rows']} records in {len(result['parts'])} part(s)")
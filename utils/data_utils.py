@@ -1,12 +1,83 @@
 import json
 import os
-from datetime import datetime
+import heapq
+import threading
+from datetime import datetime, date, timedelta
+
+from utils.journal import Journal, iter_journal, read_journal_from, migrate_json_to_journal
+from utils.observation_index import ObservationIndex, to_ordinal
+from utils.records import decode_prediction, decode_observation
+from utils.retention import (read_manifest, needs_roll_over, roll_over, roll_over_table, get_term_start, get_hot_from,
+                             archived_count, iter_archive)
 
 # Define file paths
 STUDENT_DATA_FILE = "data/student_data.json"
 PARENT_OBSERVATIONS_FILE = "data/parent_observations.json"
 APP_SETTINGS_FILE = "data/app_settings.json" # Already in use
 
+# Append-only journals that replace the JSON files above for records.
+# The JSON files are migrated once, on first access, and then left alone.
+STUDENT_DATA_JOURNAL = "data/student_data.jsonl"
+PARENT_OBSERVATIONS_JOURNAL = "data/parent_observations.jsonl"
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+# Records from before the current term are moved out of the journals (or
+# the SQLite tables) into compressed archive segments (utils/retention.py):
+# on the first load or save of a process, and again on the first one after a
+# new term starts. Set EDUSCAN_RETENTION=0 to keep everything hot.
+RETENTION_ENABLED = os.environ.get('EDUSCAN_RETENTION', '1') != '0'
+
+# Archive dataset -> start of the term it was last checked against
+_retention_terms = {}
+_retention_lock = threading.Lock()
+
+# Parent observations arrive in bursts (end of day), so their saves return
+# once written and are fsynced in batches by the journal's background thread
+# (utils/journal.py). Only the fsync is deferred: each save still writes its
+# line before returning. This covers the journal backend only; SQLite saves
+# commit as usual. Set EDUSCAN_WRITE_BEHIND=0 to fsync every save.
+WRITE_BEHIND_ENABLED = os.environ.get('EDUSCAN_WRITE_BEHIND', '1') != '0'
+WRITE_BEHIND_JOURNALS = {PARENT_OBSERVATIONS_JOURNAL}
+
+# With a PostgreSQL database configured, saved records are also queued in the
+# offline outbox (utils/sync_utils.py), which a background thread replays to
+# the database whenever offline mode is off. EDUSCAN_SYNC=0 turns this off.
+SYNC_ENABLED = bool(os.environ.get('DATABASE_URL')) and os.environ.get('EDUSCAN_SYNC', '1') != '0'
+
+# Archive dataset name -> (journal, legacy JSON file, date field the term cutoff applies to)
+RETENTION_DATASETS = {
+    'predictions': (STUDENT_DATA_JOURNAL, STUDENT_DATA_FILE, 'timestamp'),
+    'observations': (PARENT_OBSERVATIONS_JOURNAL, PARENT_OBSERVATIONS_FILE, 'date')
+}
+
+# 'journal' (default) keeps records in the JSONL files; 'sqlite' uses the
+# indexed WAL database in utils/sqlite_store.py
+STORAGE_BACKEND = os.environ.get('EDUSCAN_STORAGE_BACKEND', 'journal').lower()
+
+# Archive dataset name -> SQLite table
+SQLITE_TABLES = {'predictions': 'predictions', 'observations': 'parent_observations'}
+
+_sqlite_ready = False
+_sqlite_lock = threading.Lock()
+
+# Process-wide cache of parsed journal records, keyed by file path and
+# validated by the file's (inode, size, mtime) on every load
+_record_cache = {}
+_record_cache_lock = threading.Lock()
+_record_cache_stats = {'hits': 0, 'misses': 0, 'tail_reads': 0, 'in_place_updates': 0}
+
+# Typed records (utils/records.py) decoded from the cached journal records:
+# journal path -> (cached record list they were decoded from, typed list)
+_typed_cache = {}
+_typed_cache_lock = threading.Lock()
+
+# Per-child date index over the cached observation records, plus the list it was built from
+_observation_index = None
+_observation_index_source = None
+_observation_index_lock = threading.Lock()
+
 def _ensure_data_directory_exists():
     """Ensures that the 'data' directory exists."""
     os.makedirs("data", exist_ok=True)
@@ -40,33 +111,576 @@ def _save_json_data(file_path, data):
         print(f"Error saving to {file_path}: {e}")
         return False
 
+def _get_journal(journal_path, legacy_json_path):
+    """Returns the shared journal for a path, migrating the legacy JSON file on first use."""
+    with _journals_lock:
+        journal = _journals.get(journal_path)
+        if journal is None:
+            _ensure_data_directory_exists()
+            migrate_json_to_journal(legacy_json_path, journal_path)
+            journal = Journal(journal_path)
+            if WRITE_BEHIND_ENABLED and journal_path in WRITE_BEHIND_JOURNALS:
+                journal.enable_write_behind()
+            if SYNC_ENABLED and not _journals:
+                # Records queued before a restart are synced without waiting for a new save
+                _start_sync_worker()
+            _journals[journal_path] = journal
+    if not _use_sqlite():
+        for dataset, (path, _, _) in RETENTION_DATASETS.items():
+            if path == journal_path:
+                _check_retention(dataset, journal)
+    return journal
+
+def _check_retention(dataset, journal=None):
+    """
+    Archives the dataset's records from before the current term, once per
+    term and process. Called on every load and save, so a long-running
+    process rolls over on its first use after a term starts. journal is the
+    dataset's journal, or None for the SQLite table.
+    """
+    if not RETENTION_ENABLED:
+        return
+    term_start = get_term_start()
+    if _retention_terms.get(dataset) == term_start:
+        return
+    with _retention_lock:
+        # Callers wait here until the rollover is done, so none reads the old records
+        if _retention_terms.get(dataset) != term_start:
+            _apply_retention(dataset, journal)
+            _retention_terms[dataset] = term_start
+
+def _apply_retention(dataset, journal):
+    """Archives the records from before the current term, finishing an interrupted rollover first."""
+    journal_path, _, date_key = RETENTION_DATASETS[dataset]
+    try:
+        if journal is None:
+            roll_over_table(dataset, SQLITE_TABLES[dataset], date_key)
+        elif read_manifest(dataset).get('pending_journal') or needs_roll_over(journal_path, date_key):
+            roll_over(dataset, journal, date_key)
+    except Exception as e:
+        print(f"Error archiving old {dataset} records: {e}")
+
+def _start_sync_worker():
+    try:
+        from utils import sync_utils
+        sync_utils.start_sync_worker()
+    except Exception as e:
+        print(f"Error starting database sync: {e}")
+
+def _queue_for_sync(kind, records):
+    """Queues saved records for PostgreSQL when a database is configured. Never blocks on the network."""
+    if not SYNC_ENABLED:
+        return
+    try:
+        # Imported here so psycopg2 is only loaded when a database is configured
+        from utils import sync_utils
+        sync_utils.enqueue_many(kind, records)
+    except Exception as e:
+        print(f"Error queueing record for database sync: {e}")
+
+def _iter_all_records(dataset, journal_path, legacy_json_path):
+    """Archived records followed by the journal's, oldest first."""
+    _get_journal(journal_path, legacy_json_path)
+    try:
+        for _, record in iter_archive(dataset):
+            yield record
+    except Exception as e:
+        print(f"Error reading archived {dataset}: {e}")
+    yield from _iter_records(journal_path, legacy_json_path)
+
+def _iter_records(journal_path, legacy_json_path):
+    _get_journal(journal_path, legacy_json_path)
+    try:
+        yield from iter_journal(journal_path)
+    except Exception as e:
+        print(f"Error loading {journal_path}: {e}")
+
+def _append_record(journal_path, legacy_json_path, record):
+    return _append_records(journal_path, legacy_json_path, [record])
+
+def _append_records(journal_path, legacy_json_path, records):
+    """Appends records to a journal with one write and at most one fsync."""
+    if not records:
+        return True
+    try:
+        journal = _get_journal(journal_path, legacy_json_path)
+        # Write-behind journals fsync in the background; the records are readable right away
+        write_behind = WRITE_BEHIND_ENABLED and journal_path in WRITE_BEHIND_JOURNALS
+        start, end = journal.append_many(records, sync=not write_behind)
+    except Exception as e:
+        print(f"Error saving to {journal_path}: {e}")
+        return False
+    _update_cached_records(journal_path, records, start, end)
+    return True
+
+def _file_signature(file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def _cached_records(journal_path, legacy_json_path):
+    """
+    Returns the parsed records of a journal, re-reading only what changed.
+
+    An unchanged file is a cache hit. Since journals are append-only, a file
+    that only grew (e.g. saves from another process) is extended by parsing
+    just the new tail; anything else is a full reload. The returned list is
+    shared, so callers must copy it before modifying it.
+    """
+    _get_journal(journal_path, legacy_json_path)
+    with _record_cache_lock:
+        signature = _file_signature(journal_path)
+        entry = _record_cache.get(journal_path)
+        if entry is not None and signature is not None and entry['signature'] == signature:
+            _record_cache_stats['hits'] += 1
+            return entry['records']
+
+        if (entry is not None and signature is not None and entry['signature'] is not None
+                and entry['signature'][0] == signature[0] and signature[1] >= entry['offset']):
+            new_records, offset = read_journal_from(journal_path, entry['offset'])
+            entry['records'].extend(new_records)
+            _record_cache_stats['tail_reads'] += 1
+        else:
+            records, offset = read_journal_from(journal_path)
+            entry = _record_cache[journal_path] = {'records': records}
+            _record_cache_stats['misses'] += 1
+        entry['offset'] = offset
+        # Only trust the signature if everything up to the end of file was parsed
+        entry['signature'] = signature if signature is not None and offset == signature[1] else None
+        return entry['records']
+
+def _update_cached_records(journal_path, records, start, end):
+    """Extends a cached journal in place after this process appended to it."""
+    with _record_cache_lock:
+        entry = _record_cache.get(journal_path)
+        if entry is None:
+            return
+        if entry['offset'] != start:
+            # Someone else wrote in between; the next load reads the tail from the file
+            entry['signature'] = None
+            return
+        entry['records'].extend(records)
+        entry['offset'] = end
+        signature = _file_signature(journal_path)
+        entry['signature'] = signature if signature is not None and signature[1] == end else None
+        _record_cache_stats['in_place_updates'] += 1
+
+def flush_pending_saves():
+    """Makes saves still waiting for a write-behind fsync durable now (also done at exit)."""
+    with _journals_lock:
+        journals = list(_journals.values())
+    for journal in journals:
+        try:
+            journal.flush()
+        except Exception as e:
+            print(f"Error flushing {journal.file_path}: {e}")
+
+def get_data_cache_stats():
+    """Returns hit/miss counters for the record cache used by the load functions."""
+    with _record_cache_lock:
+        lookups = _record_cache_stats['hits'] + _record_cache_stats['misses'] + _record_cache_stats['tail_reads']
+        return {
+            **_record_cache_stats,
+            'cached_files': len(_record_cache),
+            'cached_records': sum(len(entry['records']) for entry in _record_cache.values()),
+            'hit_rate': _record_cache_stats['hits'] / lookups if lookups else 0.0
+        }
+
+def clear_data_cache():
+    """Drops the cached records and resets the counters."""
+    with _record_cache_lock:
+        _record_cache.clear()
+        for key in _record_cache_stats:
+            _record_cache_stats[key] = 0
+
+def _get_sqlite_store():
+    """
+    Returns utils.sqlite_store, importing the journals into an empty database
+    on first use. Archived records stay in the archive, where the queries
+    read them (see _with_archive()).
+    """
+    global _sqlite_ready
+    from utils import sqlite_store
+    if not _sqlite_ready:
+        with _sqlite_lock:
+            if not _sqlite_ready:
+                if _needs_import(sqlite_store, 'predictions'):
+                    sqlite_store.insert_predictions(_iter_records(STUDENT_DATA_JOURNAL, STUDENT_DATA_FILE))
+                if _needs_import(sqlite_store, 'observations'):
+                    sqlite_store.insert_observations(_iter_records(PARENT_OBSERVATIONS_JOURNAL, PARENT_OBSERVATIONS_FILE))
+                _sqlite_ready = True
+    for dataset in SQLITE_TABLES:
+        _check_retention(dataset)
+    return sqlite_store
+
+def _needs_import(sqlite_store, dataset):
+    """An empty table is imported, unless a rollover of the table itself emptied it"""
+    table = SQLITE_TABLES[dataset]
+    if sqlite_store.count_rows(table) > 0:
+        return False
+    return not any(entry.get('table') == table for entry in read_manifest(dataset)['segments'])
+
+def _use_sqlite():
+    return STORAGE_BACKEND == 'sqlite'
+
+def _date_text(value):
+    """Accepts a date/datetime or ISO string and returns the ISO date string."""
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    return str(value)[:10]
+
+def iter_stored_records_from(dataset, first_id=0):
+    """
+    SQLite backend only: yields (row id, record) for the stored 'predictions'
+    or 'observations' with row id >= first_id, in insertion order.
+    """
+    return _get_sqlite_store().iter_rows_from(SQLITE_TABLES[dataset], first_id)
+
+def migrate_legacy_data():
+    """Converts the JSON data files into journals (and the database, if selected). No-op once done."""
+    _get_journal(STUDENT_DATA_JOURNAL, STUDENT_DATA_FILE)
+    _get_journal(PARENT_OBSERVATIONS_JOURNAL, PARENT_OBSERVATIONS_FILE)
+    if _use_sqlite():
+        _get_sqlite_store()
+
+def _project(record, columns):
+    """Keeps only the requested keys of a record (all of them if columns is None)."""
+    if columns is None:
+        return record
+    return {column: record.get(column) for column in columns}
+
+def _scan_journal(numbered, matches, sort_key, descending, limit, after):
+    """
+    Filters (position, record) pairs and orders them by (sort_key, position).
+    Returns (cursor, record) pairs; with a limit only that many are kept while scanning.
+    """
+    def candidates():
+        for sequence, record in numbered:
+            if matches(record):
+                key = (sort_key(record), sequence)
+                if after is None or (key < after if descending else key > after):
+                    yield key, record
+    if limit is not None:
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return select(limit, candidates(), key=lambda pair: pair[0])
+    return sorted(candidates(), key=lambda pair: pair[0], reverse=descending)
+
+def _with_archive(dataset, hot_pairs, matches, sort_key, boundary, start_date, end_date, descending, limit, after):
+    """
+    Adds matching archived records to the results of a journal query whose
+    range reaches back before the hot data. Archived records get negative
+    positions, so their cursors sort before the journal's.
+
+    boundary turns the first hot day into a sort key: a newest-first page
+    already full of records from that day on never opens the archive.
+    """
+    hot_from = get_hot_from(dataset)
+    if hot_from is None or (start_date is not None and _date_text(start_date) >= hot_from):
+        return hot_pairs
+    hot_pairs = list(hot_pairs)
+    if descending and limit is not None and len(hot_pairs) >= limit and hot_pairs[-1][0][0] >= boundary(hot_from):
+        return hot_pairs
+    offset = archived_count(dataset)
+    numbered = ((position - offset, record)
+                for position, record in iter_archive(dataset, _date_text(start_date), _date_text(end_date)))
+    archived = _scan_journal(numbered, matches, sort_key, descending, limit, after)
+    merged = list(heapq.merge(archived, hot_pairs, key=lambda pair: pair[0], reverse=descending))
+    return merged[:limit] if limit is not None else merged
+
+def _keyed_predictions(student_name, start_date, end_date, risk_level, descending, limit, after, records=None):
+    """(cursor, record) pairs of the matching predictions; records is the journal snapshot to scan (default: the cached one)"""
+    start = _date_text(start_date)
+    # Timestamps carry a time of day, so the end bound is the start of the next day
+    end = (date.fromisoformat(_date_text(end_date)) + timedelta(days=1)).isoformat() if end_date is not None else None
+    after = tuple(after) if after is not None else None
+    def matches(record):
+        timestamp = str(record.get('timestamp', ''))
+        return ((student_name is None or record.get('student_name') == student_name)
+                and (risk_level is None or record.get('risk_level') == risk_level)
+                and (start is None or timestamp >= start)
+                and (end is None or timestamp < end))
+    sort_key = lambda record: str(record.get('timestamp', ''))
+    if _use_sqlite():
+        pairs = _get_sqlite_store().query_predictions(student_name, start, end, risk_level,
+                                                      descending=descending, limit=limit, after=after)
+    else:
+        if records is None:
+            records = _cached_records(STUDENT_DATA_JOURNAL, STUDENT_DATA_FILE)
+        pairs = _scan_journal(enumerate(records), matches, sort_key, descending, limit, after)
+    return _with_archive('predictions', pairs, matches, sort_key, lambda day: day,
+                         start_date, end_date, descending, limit, after)
+
+def _keyed_observations(child_name, start_date, end_date, descending, limit, after, records=None):
+    """Like _keyed_predictions() for parent observations; one child's are looked up in the observation index"""
+    after = tuple(after) if after is not None else None
+    start = to_ordinal(start_date) if start_date is not None else None
+    end = to_ordinal(end_date) if end_date is not None else None
+    def matches(obs):
+        ordinal = to_ordinal(obs.get('date'))
+        return ((child_name is None or obs.get('child_name') == child_name)
+                and (start is None or ordinal >= start) and (end is None or ordinal <= end))
+    if _use_sqlite():
+        # The database orders by the stored date text, so archived records are keyed the same way
+        pairs = _get_sqlite_store().query_observations(child_name, _date_text(start_date), _date_text(end_date),
+                                                       descending=descending, limit=limit, after=after)
+        return _with_archive('observations', pairs, matches, lambda obs: str(obs.get('date') or ''), lambda day: day,
+                             start_date, end_date, descending, limit, after)
+    sort_key = lambda obs: to_ordinal(obs.get('date'))
+    if records is None:
+        records = _cached_records(PARENT_OBSERVATIONS_JOURNAL, PARENT_OBSERVATIONS_FILE)
+    if child_name is not None:
+        pairs = _observation_index_for(records).query_keyed(child_name, start_date, end_date, descending, limit, after)
+    else:
+        pairs = _scan_journal(enumerate(records), matches, sort_key, descending, limit, after)
+    return _with_archive('observations', pairs, matches, sort_key, to_ordinal,
+                         start_date, end_date, descending, limit, after)
+
+def _iter_page(keyed, columns, description):
+    try:
+        for _, record in keyed():
+            yield _project(record, columns)
+    except Exception as e:
+        print(f"Error reading {description}: {e}")
+
+def _get_page(keyed, page_size, columns, description):
+    """Fetches one page plus one extra row to know whether another page follows."""
+    try:
+        pairs = list(keyed(page_size + 1))
+    except Exception as e:
+        print(f"Error reading {description}: {e}")
+        return [], None
+    next_cursor = pairs[page_size - 1][0] if len(pairs) > page_size else None
+    return [_project(record, columns) for _, record in pairs[:page_size]], next_cursor
+
+def _typed_records(journal_path, records, decode):
+    """
+    Typed versions of a snapshot of the cached journal records (a list
+    returned by _cached_records()); each record is decoded once per process.
+    """
+    with _typed_cache_lock:
+        source, typed = _typed_cache.get(journal_path, (None, None))
+        if source is not records or len(typed) > len(records):
+            typed = []
+            _typed_cache[journal_path] = (records, typed)
+        if len(typed) < len(records):
+            typed.extend(decode(record) for record in records[len(typed):])
+        return typed
+
+def _load_typed(keyed, dataset, journal_path, legacy_json_path, decode, unfiltered, description):
+    """keyed(records) runs the query against the given journal snapshot (ignored by SQLite)"""
+    try:
+        if _use_sqlite():
+            return [decode(record) for _, record in keyed(None)]
+        # The query and the typed list are built from one snapshot, so positions
+        # never index a list that was reloaded in between
+        records = _cached_records(journal_path, legacy_json_path)
+        if unfiltered:
+            return [decode(record) for _, record in iter_archive(dataset)] + _typed_records(journal_path, records, decode)
+        pairs = keyed(records)
+        # Journal cursors end with the record's position, which indexes the typed list too;
+        # archived records (negative positions) are decoded as they come. The typed
+        # list is extended after the query, so it covers every position it returned.
+        typed = _typed_records(journal_path, records, decode)
+        return [typed[cursor[-1]] if cursor[-1] >= 0 else decode(record) for cursor, record in pairs]
+    except Exception as e:
+        print(f"Error loading {description}: {e}")
+        return []
+
 # --- Public API for Student Prediction Data ---
 
-def load_student_data():
-    """Loads all student prediction records."""
-    return _load_json_data(STUDENT_DATA_FILE)
+def iter_student_data(student_name=None, start_date=None, end_date=None, risk_level=None,
+                      descending=False, limit=None, cursor=None, columns=None):
+    """
+    Streams student prediction records, oldest first (newest first if descending).
+    start_date and end_date are inclusive dates or ISO strings; cursor comes from
+    page_student_data(); columns keeps only those keys of each record.
+    """
+    if not _use_sqlite() and student_name is None and start_date is None and end_date is None \
+            and risk_level is None and not descending and limit is None and cursor is None:
+        # Nothing to filter or order: stream the archive and journal without loading them
+        return (_project(record, columns) for record in _iter_all_records('predictions', STUDENT_DATA_JOURNAL, STUDENT_DATA_FILE))
+    keyed = lambda: _keyed_predictions(student_name, start_date, end_date, risk_level, descending, limit, cursor)
+    return _iter_page(keyed, columns, "student data")
+
+def page_student_data(page_size=20, cursor=None, student_name=None, start_date=None, end_date=None,
+                      risk_level=None, descending=False, columns=None):
+    """
+    Returns (records, next_cursor) for one page of prediction records.
+    Pass next_cursor back to get the following page; it is None after the last page.
+    """
+    keyed = lambda limit: _keyed_predictions(student_name, start_date, end_date, risk_level, descending, limit, cursor)
+    return _get_page(keyed, page_size, columns, "student data")
+
+def load_student_data(include_archive=False):
+    """
+    Loads the current term's student prediction records, or the full history
+    (archive first) with include_archive=True. Queries with a date range, like
+    query_student_data(), read the archive only when the range reaches back
+    before the current term.
+    """
+    try:
+        if _use_sqlite():
+            records = [record for _, record in _get_sqlite_store().query_predictions()]
+        else:
+            records = list(_cached_records(STUDENT_DATA_JOURNAL, STUDENT_DATA_FILE))
+        if include_archive:
+            return [record for _, record in iter_archive('predictions')] + records
+        return records
+    except Exception as e:
+        print(f"Error loading student data: {e}")
+        return []
+
+def query_student_data(student_name=None, start_date=None, end_date=None, risk_level=None):
+    """
+    Loads the prediction records matching the given filters, ordered by timestamp.
+    start_date and end_date are inclusive and may be dates or ISO strings.
+    """
+    return list(iter_student_data(student_name, start_date, end_date, risk_level))
+
+def load_prediction_records(student_name=None, start_date=None, end_date=None, risk_level=None,
+                            descending=False, limit=None):
+    """
+    Loads prediction records as typed PredictionRecord objects (utils/records.py),
+    with timestamps already parsed. Filters work as in iter_student_data().
+    """
+    unfiltered = student_name is None and start_date is None and end_date is None \
+        and risk_level is None and not descending and limit is None
+    keyed = lambda records: list(_keyed_predictions(student_name, start_date, end_date, risk_level, descending, limit,
+                                                    None, records))
+    return _load_typed(keyed, 'predictions', STUDENT_DATA_JOURNAL, STUDENT_DATA_FILE, decode_prediction, unfiltered, "prediction records")
 
 def save_prediction_data(new_record):
-    """Appends a new student prediction record to the data file."""
-    records = load_student_data()
-    records.append(new_record)
-    return _save_json_data(STUDENT_DATA_FILE, records)
+    """Appends a new student prediction record to the data store."""
+    if _use_sqlite():
+        try:
+            saved = _get_sqlite_store().insert_predictions([new_record])
+        except Exception as e:
+            print(f"Error saving prediction record: {e}")
+            return False
+    else:
+        saved = _append_record(STUDENT_DATA_JOURNAL, STUDENT_DATA_FILE, new_record)
+    if saved:
+        _queue_for_sync('prediction', [new_record])
+    return saved
+
+def save_prediction_records(records):
+    """
+    Saves many prediction records at once (e.g. a Batch Upload): one journal
+    write or one SQLite transaction, and one outbox write for the database
+    sync. Nothing is saved if the write fails.
+    """
+    records = list(records)
+    if _use_sqlite():
+        try:
+            saved = _get_sqlite_store().insert_predictions(records)
+        except Exception as e:
+            print(f"Error saving prediction records: {e}")
+            return False
+    else:
+        saved = _append_records(STUDENT_DATA_JOURNAL, STUDENT_DATA_FILE, records)
+    if saved and records:
+        _queue_for_sync('prediction', records)
+    return saved
 
 # --- Public API for Parent Observation Data ---
 
-def load_parent_observations():
-    """Loads all parent observation records."""
-    return _load_json_data(PARENT_OBSERVATIONS_FILE)
+def iter_parent_observations(child_name=None, start_date=None, end_date=None,
+                             descending=False, limit=None, cursor=None, columns=None):
+    """
+    Streams parent observation records, oldest first (newest first if descending).
+    start_date and end_date are inclusive dates or ISO strings; cursor comes from
+    page_parent_observations(); columns keeps only those keys of each record.
+    """
+    if not _use_sqlite() and child_name is None and start_date is None and end_date is None \
+            and not descending and limit is None and cursor is None:
+        return (_project(obs, columns) for obs in _iter_all_records('observations', PARENT_OBSERVATIONS_JOURNAL, PARENT_OBSERVATIONS_FILE))
+    keyed = lambda: _keyed_observations(child_name, start_date, end_date, descending, limit, cursor)
+    return _iter_page(keyed, columns, "parent observations")
+
+def page_parent_observations(page_size=20, cursor=None, child_name=None, start_date=None, end_date=None,
+                             descending=False, columns=None):
+    """
+    Returns (observations, next_cursor) for one page of parent observations.
+    Pass next_cursor back to get the following page; it is None after the last page.
+    """
+    keyed = lambda limit: _keyed_observations(child_name, start_date, end_date, descending, limit, cursor)
+    return _get_page(keyed, page_size, columns, "parent observations")
+
+def load_parent_observations(include_archive=False):
+    """Loads the current term's parent observation records (the full history with include_archive=True, see load_student_data)."""
+    try:
+        if _use_sqlite():
+            records = [obs for _, obs in _get_sqlite_store().query_observations()]
+        else:
+            records = list(_cached_records(PARENT_OBSERVATIONS_JOURNAL, PARENT_OBSERVATIONS_FILE))
+        if include_archive:
+            return [obs for _, obs in iter_archive('observations')] + records
+        return records
+    except Exception as e:
+        print(f"Error loading parent observations: {e}")
+        return []
+
+def get_observation_index():
+    """
+    Returns the per-child observation index (utils/observation_index.py),
+    extended with any records saved since it was last used. It covers the
+    journal only, not archived observations.
+    """
+    return _observation_index_for(_cached_records(PARENT_OBSERVATIONS_JOURNAL, PARENT_OBSERVATIONS_FILE))
+
+def _observation_index_for(records):
+    """The observation index over one snapshot of the cached observation records"""
+    global _observation_index, _observation_index_source
+    with _observation_index_lock:
+        index = _observation_index
+        if index is None or _observation_index_source is not records or index.size > len(records):
+            # The cache reloaded the file from scratch, so the index is rebuilt too
+            index = ObservationIndex(records)
+            _observation_index, _observation_index_source = index, records
+        elif index.size < len(records):
+            index.add_many(records[index.size:])
+        return index
+
+def query_parent_observations(child_name=None, start_date=None, end_date=None, descending=False, limit=None):
+    """
+    Loads one child's observations (or everyone's) within an inclusive date range, ordered by date.
+    Dates may be date objects or ISO strings; limit keeps only the first rows in the requested order.
+    """
+    return list(iter_parent_observations(child_name, start_date, end_date, descending, limit))
+
+def load_observation_records(child_name=None, start_date=None, end_date=None, descending=False, limit=None):
+    """
+    Loads parent observations as typed ObservationRecord objects (utils/records.py),
+    with dates already parsed. Filters work as in iter_parent_observations().
+    """
+    unfiltered = child_name is None and start_date is None and end_date is None and not descending and limit is None
+    keyed = lambda records: list(_keyed_observations(child_name, start_date, end_date, descending, limit, None, records))
+    return _load_typed(keyed, 'observations', PARENT_OBSERVATIONS_JOURNAL, PARENT_OBSERVATIONS_FILE, decode_observation, unfiltered, "observation records")
 
 def save_parent_observation(new_observation):
-    """Appends a new parent observation record to the data file."""
-    observations = load_parent_observations()
-    observations.append(new_observation)
-    return _save_json_data(PARENT_OBSERVATIONS_FILE, observations)
+    """Appends a new parent observation record to the data store."""
+    if _use_sqlite():
+        try:
+            saved = _get_sqlite_store().insert_observations([new_observation])
+        except Exception as e:
+            print(f"Error saving parent observation: {e}")
+            return False
+    else:
+        saved = _append_record(PARENT_OBSERVATIONS_JOURNAL, PARENT_OBSERVATIONS_FILE, new_observation)
+    if saved:
+        _queue_for_sync('observation', [new_observation])
+    return saved
 
 # --- Public API for App Settings (Already in utils/language_utils, confirming consistency) ---
 # Note: These are defined in language_utils.py, but shown here for context of data files.
 # def load_app_settings():
 #     return _load_json_data(APP_SETTINGS_FILE) # This would typically return a dict, not a list
 # def save_app_settings(settings):
-#     return _save_json_data(APP_SETTINGS_FILE, settings)
\ No newline at end of file
+#     return _save_json_data(APP_SETTINGS_FILE, settings)
+
+if __name__ == "__main__":
+    migrate_legacy_data()
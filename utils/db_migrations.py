@@ -0,0 +1,318 @@
+"""
+Versioned schema migrations for the PostgreSQL tables used by utils/db_utils.py.
+
+Each migration runs once, in its own transaction, and is recorded in the
+schema_migrations table; migrate() applies the ones not recorded yet, so it
+is safe to run on every start. An advisory lock keeps two processes from
+migrating at the same time. A migration step is either an SQL statement or
+a function called with the cursor.
+
+predictions and parent_observations are partitioned by month (on timestamp
+and date). ensure_month_partitions() creates the partitions around the
+current month and is run by migrate(); rows outside them land in the
+DEFAULT partition.
+
+Usage:
+    python -m utils.db_migrations            # apply pending migrations
+    python -m utils.db_migrations --status   # list applied migrations
+"""
+
+import os
+import logging
+from datetime import date
+
+from utils.db_utils import db_connection
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_advisory_xact_lock, shared by every migrating process
+MIGRATION_LOCK_KEY = 4_712_003
+
+# Month partitions kept ahead of and behind the current month
+PARTITION_MONTHS_AHEAD = int(os.environ.get('EDUSCAN_DB_PARTITION_MONTHS_AHEAD', '3'))
+PARTITION_MONTHS_BACK = int(os.environ.get('EDUSCAN_DB_PARTITION_MONTHS_BACK', '12'))
+
+# Partitioned table -> partition key column
+PARTITIONED_TABLES = {
+    'predictions': 'timestamp',
+    'parent_observations': 'date'
+}
+
+
+class MigrationError(RuntimeError):
+    """Raised when existing data keeps a migration from being applied"""
+
+
+def _default_partition_sql(table):
+    """DEFAULT partition of a table, skipped if the table was created earlier without partitioning"""
+    return f"""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = '{table}'::regclass) THEN
+                CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT;
+            END IF;
+        END $$
+    """
+
+
+def _merge_duplicate_students(cur):
+    """
+    Merge students sharing a name into the oldest of them, so the unique
+    index on students.name can be created on databases that allowed them.
+    Their predictions and observations are moved to the kept row.
+    """
+    cur.execute("""
+        CREATE TEMP TABLE duplicate_students ON COMMIT DROP AS
+        SELECT id, keep_id FROM (
+            SELECT id, MIN(id) OVER (PARTITION BY name) AS keep_id FROM students
+        ) ranked
+        WHERE id <> keep_id
+    """)
+    cur.execute("SELECT COUNT(*) FROM duplicate_students")
+    duplicates = cur.fetchone()[0]
+    if not duplicates:
+        return
+    for table in ('predictions', 'parent_observations'):
+        cur.execute(f"UPDATE {table} t SET student_id = d.keep_id FROM duplicate_students d WHERE t.student_id = d.id")
+    cur.execute("DELETE FROM students s USING duplicate_students d WHERE s.id = d.id")
+    logger.warning(f"Merged {duplicates} duplicate student row(s) into the oldest row with the same name")
+
+
+def _check_unique_usernames(cur):
+    """Accounts cannot be merged automatically, so duplicate usernames stop the migration"""
+    cur.execute("SELECT username FROM users GROUP BY username HAVING COUNT(*) > 1 ORDER BY username")
+    duplicates = [row[0] for row in cur.fetchall()]
+    if duplicates:
+        raise MigrationError(
+            f"Cannot add the unique index on users.username: {len(duplicates)} username(s) are used by "
+            f"more than one account ({', '.join(duplicates[:10])}). Rename or remove the extra accounts "
+            f"and run python -m utils.db_migrations again."
+        )
+
+
+MIGRATIONS = [
+    (1, "create core tables", [
+        """
+        CREATE TABLE IF NOT EXISTS students (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            grade_level TEXT,
+            created_date TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL,
+            user_type TEXT,
+            full_name TEXT,
+            email TEXT,
+            created_date TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """,
+        # The partition key has to be part of the primary key
+        """
+        CREATE TABLE IF NOT EXISTS predictions (
+            id BIGSERIAL,
+            student_id INTEGER NOT NULL REFERENCES students (id),
+            math_score DOUBLE PRECISION,
+            reading_score DOUBLE PRECISION,
+            writing_score DOUBLE PRECISION,
+            attendance DOUBLE PRECISION,
+            behavior DOUBLE PRECISION,
+            literacy DOUBLE PRECISION,
+            prediction INTEGER,
+            probability DOUBLE PRECISION,
+            risk_level TEXT,
+            notes TEXT,
+            timestamp TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """,
+        _default_partition_sql('predictions'),
+        """
+        CREATE TABLE IF NOT EXISTS parent_observations (
+            id BIGSERIAL,
+            student_id INTEGER NOT NULL REFERENCES students (id),
+            child_name TEXT,
+            date DATE NOT NULL,
+            homework_completion DOUBLE PRECISION,
+            reading_time DOUBLE PRECISION,
+            focus_level TEXT,
+            subjects_struggled TEXT,
+            behavior_rating DOUBLE PRECISION,
+            mood_rating DOUBLE PRECISION,
+            sleep_hours DOUBLE PRECISION,
+            energy_level TEXT,
+            social_interactions TEXT,
+            learning_wins TEXT,
+            challenges_faced TEXT,
+            strategies_used TEXT,
+            screen_time DOUBLE PRECISION,
+            physical_activity DOUBLE PRECISION,
+            medication_taken BOOLEAN,
+            special_events TEXT,
+            timestamp TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+        """,
+        _default_partition_sql('parent_observations')
+    ]),
+    (2, "indexes for the db_utils lookups", [
+        # students.name also backs the ON CONFLICT (name) upsert
+        _merge_duplicate_students,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_students_name ON students (name)",
+        _check_unique_usernames,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username)",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_student_timestamp ON predictions (student_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_timestamp ON predictions (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_observations_student_date ON parent_observations (student_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_observations_date ON parent_observations (date)"
+    ]),
+    (3, "record uids for idempotent offline sync", [
+        # Unique indexes on partitioned tables must include the partition key
+        "ALTER TABLE predictions ADD COLUMN IF NOT EXISTS record_uid TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_predictions_record_uid ON predictions (record_uid, timestamp)",
+        "ALTER TABLE parent_observations ADD COLUMN IF NOT EXISTS record_uid TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_observations_record_uid ON parent_observations (record_uid, date)"
+    ])
+]
+
+SCHEMA_MIGRATIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+"""
+
+
+def _applied_versions(cur):
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def migrate(target=None):
+    """
+    Apply the migrations not applied yet, up to target (default: all), then
+    make sure the month partitions exist.
+
+    Returns:
+        list: Versions applied by this call, or None if the database is unavailable
+    """
+    applied = []
+    with db_connection() as conn:
+        if not conn:
+            return None
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+        cur.execute(SCHEMA_MIGRATIONS_SQL)
+        conn.commit()
+
+        for version, name, statements in MIGRATIONS:
+            if target is not None and version > target:
+                break
+            try:
+                # Held until commit; whoever waits re-checks what is applied afterwards
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+                if version in _applied_versions(cur):
+                    conn.commit()
+                    continue
+                for statement in statements:
+                    if callable(statement):
+                        statement(cur)
+                    else:
+                        cur.execute(statement)
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Migration {version} ({name}) failed: {e}")
+                raise
+            logger.info(f"Applied migration {version}: {name}")
+            applied.append(version)
+
+    ensure_month_partitions()
+    return applied
+
+
+def _add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def ensure_month_partitions(months_back=PARTITION_MONTHS_BACK, months_ahead=PARTITION_MONTHS_AHEAD, today=None):
+    """
+    Create the monthly partitions of predictions and parent_observations from
+    months_back months before the current month to months_ahead after it.
+    Existing partitions are left alone, as are tables that were created
+    without partitioning. Returns the names of the partitions created.
+    """
+    current = (today or date.today()).replace(day=1)
+    created = []
+    with db_connection() as conn:
+        if not conn:
+            return created
+        cur = conn.cursor()
+        for table, key_column in PARTITIONED_TABLES.items():
+            cur.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", (table,))
+            if cur.fetchone() is None:
+                continue
+            for offset in range(-months_back, months_ahead + 1):
+                start = _add_months(current, offset)
+                end = _add_months(start, 1)
+                partition = f"{table}_{start.year:04d}_{start.month:02d}"
+                cur.execute("SELECT to_regclass(%s)", (partition,))
+                if cur.fetchone()[0] is not None:
+                    continue
+                try:
+                    cur.execute(
+                        f"CREATE TABLE {partition} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                    )
+                    conn.commit()
+                    created.append(partition)
+                except Exception as e:
+                    # e.g. the default partition already holds rows for that month
+                    conn.rollback()
+                    logger.warning(f"Could not create partition {partition}: {e}")
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+
+def get_migration_status():
+    """List of (version, name, applied_at) for the applied migrations"""
+    with db_connection() as conn:
+        if not conn:
+            return []
+        cur = conn.cursor()
+        cur.execute("SELECT to_regclass('schema_migrations')")
+        if cur.fetchone()[0] is None:
+            return []
+        cur.execute("SELECT version, name, applied_at FROM schema_migrations ORDER BY version")
+        return cur.fetchall()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Create or upgrade the EduScan PostgreSQL schema")
+    parser.add_argument('--status', action='store_true', help="List applied migrations and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        applied_versions = {version for version, _, _ in get_migration_status()}
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:>3}  {'applied' if version in applied_versions else 'pending':8} {name}")
+    else:
+        try:
+            result = migrate()
+        except MigrationError as e:
+            raise SystemExit(str(e))
+        if result is None:
+            print("Database unavailable; check DATABASE_URL")
+        else:
+            print(f"Applied {len(result)} migration(s)")
@@ -4,15 +4,48 @@ Direct database operations without SQLAlchemy complexity
 """
 
 import os
+import time
+import uuid
+import threading
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import execute_values
 import json
-from datetime import datetime, date
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Connection pool settings
+DB_POOL_MIN = int(os.environ.get('EDUSCAN_DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.environ.get('EDUSCAN_DB_POOL_MAX', '10'))
+# Seconds a checkout waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.environ.get('EDUSCAN_DB_POOL_TIMEOUT', '10'))
+# Connections idle for longer than this are checked with SELECT 1 before reuse
+DB_HEALTH_CHECK_AFTER = float(os.environ.get('EDUSCAN_DB_HEALTH_CHECK_AFTER', '30'))
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+# id(connection) -> time it was last returned to the pool
+_last_used = {}
+_pool_stats = {
+    'checkouts': 0,
+    'in_use': 0,
+    'max_in_use': 0,
+    'total_wait_ms': 0.0,
+    'max_wait_ms': 0.0,
+    'timeouts': 0,
+    'health_check_failures': 0,
+    'connect_errors': 0
+}
+_pool_stats_lock = threading.Lock()
+
 def get_db_connection():
-    """Get PostgreSQL database connection"""
+    """Get a new, unpooled PostgreSQL connection; the caller closes it. Prefer db_connection()."""
     try:
         conn = psycopg2.connect(os.environ['DATABASE_URL'])
         return conn
@@ -20,326 +53,671 @@ def get_db_connection():
         logger.error(f"Database connection error: {e}")
         return None
 
-def save_prediction_to_db(prediction_data):
-    """Save prediction data to PostgreSQL database"""
-    conn = get_db_connection()
-    if not conn:
+def _get_pool():
+    """Create the process-wide pool on first use. Returns (pool, slots)."""
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is None:
+            _pool = pg_pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, os.environ['DATABASE_URL'])
+            # ThreadedConnectionPool raises when exhausted; the semaphore makes checkouts wait instead
+            _pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+        return _pool, _pool_slots
+
+def _is_healthy(conn):
+    if conn.closed:
         return False
-    
-    try:
-        cur = conn.cursor()
-        
-        # Get or create student
-        student_name = prediction_data.get('student_name', 'Unknown Student')
-        grade_level = prediction_data.get('grade_level', 'Unknown')
-        
-        cur.execute(
-            "SELECT id FROM students WHERE name = %s",
-            (student_name,)
-        )
-        student_record = cur.fetchone()
-        
-        if student_record:
-            student_id = student_record[0]
-        else:
-            cur.execute(
-                "INSERT INTO students (name, grade_level) VALUES (%s, %s) RETURNING id",
-                (student_name, grade_level)
-            )
-            student_id = cur.fetchone()[0]
-        
-        # Insert prediction
-        cur.execute("""
-            INSERT INTO predictions (
-                student_id, math_score, reading_score, writing_score, 
-                attendance, behavior, literacy, prediction, probability, 
-                risk_level, notes, timestamp
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            student_id,
-            prediction_data.get('math_score'),
-            prediction_data.get('reading_score'),
-            prediction_data.get('writing_score'),
-            prediction_data.get('attendance'),
-            prediction_data.get('behavior'),
-            prediction_data.get('literacy'),
-            prediction_data.get('prediction'),
-            prediction_data.get('probability'),
-            prediction_data.get('risk_level'),
-            prediction_data.get('notes', ''),
-            datetime.fromisoformat(prediction_data.get('timestamp', datetime.now().isoformat()))
-        ))
-        
-        conn.commit()
-        logger.info(f"Prediction saved for student: {student_name}")
+    last_used = _last_used.get(id(conn))
+    if last_used is None or time.monotonic() - last_used < DB_HEALTH_CHECK_AFTER:
+        # Fresh or recently used connections are trusted without a round trip
         return True
-        
-    except Exception as e:
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
         conn.rollback()
-        logger.error(f"Error saving prediction: {e}")
+        return True
+    except Exception:
         return False
-    finally:
-        conn.close()
 
-def save_parent_observation_to_db(observation_data):
-    """Save parent observation to PostgreSQL database"""
-    conn = get_db_connection()
-    if not conn:
-        return False
-    
+def _checkout():
+    """
+    Returns (connection, pool, slots), or None if no connection could be had.
+    The pool and semaphore are kept with the connection so it is returned to
+    the pool it came from, even if close_db_pool() replaced that pool meanwhile.
+    """
     try:
-        cur = conn.cursor()
-        
-        # Get or create student
-        child_name = observation_data.get('child_name', 'Unknown Child')
-        
-        cur.execute(
-            "SELECT id FROM students WHERE name = %s",
-            (child_name,)
-        )
-        student_record = cur.fetchone()
-        
-        if student_record:
-            student_id = student_record[0]
-        else:
-            cur.execute(
-                "INSERT INTO students (name, grade_level) VALUES (%s, %s) RETURNING id",
-                (child_name, 'Unknown')
-            )
-            student_id = cur.fetchone()[0]
-        
-        # Convert subjects_struggled list to JSON string
-        subjects_struggled = observation_data.get('subjects_struggled', [])
-        if isinstance(subjects_struggled, list):
-            subjects_struggled = json.dumps(subjects_struggled)
-        
-        # Insert observation
-        cur.execute("""
-            INSERT INTO parent_observations (
-                student_id, child_name, date, homework_completion, reading_time,
-                focus_level, subjects_struggled, behavior_rating, mood_rating,
-                sleep_hours, energy_level, social_interactions, learning_wins,
-                challenges_faced, strategies_used, screen_time, physical_activity,
-                medication_taken, special_events, timestamp
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            student_id,
-            child_name,
-            datetime.fromisoformat(observation_data.get('date', date.today().isoformat())),
-            observation_data.get('homework_completion'),
-            observation_data.get('reading_time'),
-            observation_data.get('focus_level'),
-            subjects_struggled,
-            observation_data.get('behavior_rating'),
-            observation_data.get('mood_rating'),
-            observation_data.get('sleep_hours'),
-            observation_data.get('energy_level'),
-            observation_data.get('social_interactions', ''),
-            observation_data.get('learning_wins', ''),
-            observation_data.get('challenges_faced', ''),
-            observation_data.get('strategies_used', ''),
-            observation_data.get('screen_time'),
-            observation_data.get('physical_activity'),
-            observation_data.get('medication_taken', False),
-            observation_data.get('special_events', ''),
-            datetime.fromisoformat(observation_data.get('timestamp', datetime.now().isoformat()))
-        ))
-        
-        conn.commit()
-        logger.info(f"Parent observation saved for: {child_name}")
-        return True
-        
+        pool, slots = _get_pool()
     except Exception as e:
-        conn.rollback()
-        logger.error(f"Error saving parent observation: {e}")
-        return False
-    finally:
-        conn.close()
-
-def load_student_predictions():
-    """Load all student prediction data from database"""
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
+        with _pool_stats_lock:
+            _pool_stats['connect_errors'] += 1
+        logger.error(f"Database connection error: {e}")
+        return None
+
+    started = time.monotonic()
+    if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+        with _pool_stats_lock:
+            _pool_stats['timeouts'] += 1
+        logger.error(f"Timed out after {DB_POOL_TIMEOUT}s waiting for a database connection")
+        return None
+    wait_ms = (time.monotonic() - started) * 1000
+
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT p.*, s.name, s.grade_level 
-            FROM predictions p 
-            JOIN students s ON p.student_id = s.id 
-            ORDER BY p.timestamp DESC
-        """)
-        
-        predictions = []
-        for row in cur.fetchall():
-            prediction_dict = {
-                'id': row[0],
-                'math_score': row[2],
-                'reading_score': row[3],
-                'writing_score': row[4],
-                'attendance': row[5],
-                'behavior': row[6],
-                'literacy': row[7],
-                'prediction': row[8],
-                'probability': row[9],
-                'risk_level': row[10],
-                'notes': row[11],
-                'timestamp': row[12].isoformat(),
-                'student_name': row[13],
-                'grade_level': row[14]
-            }
-            predictions.append(prediction_dict)
-        
-        return predictions
-        
+        conn = pool.getconn()
+        if not _is_healthy(conn):
+            # Drop the broken connection; the pool opens a new one in its place
+            with _pool_stats_lock:
+                _pool_stats['health_check_failures'] += 1
+            _last_used.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
     except Exception as e:
-        logger.error(f"Error loading predictions: {e}")
-        return []
+        slots.release()
+        with _pool_stats_lock:
+            _pool_stats['connect_errors'] += 1
+        logger.error(f"Database connection error: {e}")
+        return None
+
+    with _pool_stats_lock:
+        _pool_stats['checkouts'] += 1
+        _pool_stats['in_use'] += 1
+        _pool_stats['max_in_use'] = max(_pool_stats['max_in_use'], _pool_stats['in_use'])
+        _pool_stats['total_wait_ms'] += wait_ms
+        _pool_stats['max_wait_ms'] = max(_pool_stats['max_wait_ms'], wait_ms)
+    return conn, pool, slots
+
+def _checkin(conn, pool, slots):
+    try:
+        if pool.closed:
+            # close_db_pool() ran while this connection was checked out
+            _last_used.pop(id(conn), None)
+            conn.close()
+            return
+        if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            # Never hand a half-finished transaction to the next user
+            conn.rollback()
+        broken = bool(conn.closed)
+        if broken:
+            _last_used.pop(id(conn), None)
+        else:
+            _last_used[id(conn)] = time.monotonic()
+        pool.putconn(conn, close=broken)
+    except Exception as e:
+        logger.error(f"Error returning database connection to the pool: {e}")
     finally:
-        conn.close()
-
-def load_parent_observations():
-    """Load all parent observation data from database"""
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
+        slots.release()
+        with _pool_stats_lock:
+            _pool_stats['in_use'] -= 1
+
+@contextmanager
+def db_connection():
+    """
+    Check a connection out of the process-wide pool for the duration of a
+    with block. Yields None if the database cannot be reached. Uncommitted
+    work is rolled back when the connection goes back to the pool.
+
+    Example:
+        with db_connection() as conn:
+            if conn:
+                ...
+    """
+    checkout = _checkout()
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT po.*, s.name 
-            FROM parent_observations po 
-            JOIN students s ON po.student_id = s.id 
-            ORDER BY po.timestamp DESC
-        """)
-        
-        observations = []
-        for row in cur.fetchall():
+        yield checkout[0] if checkout else None
+    finally:
+        if checkout is not None:
+            _checkin(*checkout)
+
+def get_pool_stats():
+    """Pool metrics: checkouts, connections in use, wait times, timeouts and failed health checks"""
+    with _pool_stats_lock:
+        stats = dict(_pool_stats)
+    stats['avg_wait_ms'] = stats['total_wait_ms'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    stats['min_size'] = DB_POOL_MIN
+    stats['max_size'] = DB_POOL_MAX
+    return stats
+
+def close_db_pool():
+    """Close every pooled connection; the next checkout creates a new pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _last_used.clear()
+
+UPSERT_STUDENTS_SQL = """
+    INSERT INTO students (name, grade_level) VALUES %s
+    ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+    RETURNING id, name
+"""
+
+PREDICTION_COLUMNS = (
+    "student_id, math_score, reading_score, writing_score, attendance, behavior, "
+    "literacy, prediction, probability, risk_level, notes, timestamp"
+)
+
+OBSERVATION_COLUMNS = (
+    "student_id, child_name, date, homework_completion, reading_time, focus_level, "
+    "subjects_struggled, behavior_rating, mood_rating, sleep_hours, energy_level, "
+    "social_interactions, learning_wins, challenges_faced, strategies_used, screen_time, "
+    "physical_activity, medication_taken, special_events, timestamp"
+)
+
+# Rows per INSERT statement in the bulk saves
+BULK_PAGE_SIZE = 1000
+
+# Whether students.name has the unique index ON CONFLICT (name) needs
+# (migration 2 in utils/db_migrations.py); None until the first upsert finds out
+_students_name_unique = None
+
+def _upsert_students(cur, students):
+    """
+    Get or create students in one statement and return {name: id}.
+
+    students maps each name to the grade level used if it has to be created.
+    Relies on the unique index on students.name, so concurrent sessions
+    saving the same new student end up with the same row. Databases without
+    that index fall back to _get_or_create_students().
+    """
+    global _students_name_unique
+    if not students:
+        return {}
+    if _students_name_unique is not False:
+        # The savepoint keeps a failed upsert from aborting the caller's transaction
+        cur.execute("SAVEPOINT upsert_students")
+        try:
+            rows = execute_values(cur, UPSERT_STUDENTS_SQL, list(students.items()), page_size=BULK_PAGE_SIZE, fetch=True)
+            cur.execute("RELEASE SAVEPOINT upsert_students")
+            _students_name_unique = True
+            return {name: student_id for student_id, name in rows}
+        except psycopg2.errors.InvalidColumnReference:
+            cur.execute("ROLLBACK TO SAVEPOINT upsert_students")
+            _students_name_unique = False
+            logger.warning("students.name has no unique index; run python -m utils.db_migrations. "
+                           "Looking students up before inserting them until then.")
+    return _get_or_create_students(cur, students)
+
+def _get_or_create_students(cur, students):
+    """Select-then-insert version of _upsert_students() for a students table without the unique index"""
+    cur.execute("SELECT name, MIN(id) FROM students WHERE name = ANY(%s) GROUP BY name", (list(students),))
+    student_ids = dict(cur.fetchall())
+    missing = [(name, grade_level) for name, grade_level in students.items() if name not in student_ids]
+    if missing:
+        rows = execute_values(cur, "INSERT INTO students (name, grade_level) VALUES %s RETURNING id, name",
+                              missing, page_size=BULK_PAGE_SIZE, fetch=True)
+        student_ids.update({name: student_id for student_id, name in rows})
+    return student_ids
+
+def _prediction_row(student_id, prediction_data):
+    return (
+        student_id,
+        prediction_data.get('math_score'),
+        prediction_data.get('reading_score'),
+        prediction_data.get('writing_score'),
+        prediction_data.get('attendance'),
+        prediction_data.get('behavior'),
+        prediction_data.get('literacy'),
+        prediction_data.get('prediction'),
+        prediction_data.get('probability'),
+        prediction_data.get('risk_level'),
+        prediction_data.get('notes', ''),
+        datetime.fromisoformat(prediction_data.get('timestamp', datetime.now().isoformat()))
+    )
+
+def _observation_row(student_id, observation_data):
+    # Convert subjects_struggled list to JSON string
+    subjects_struggled = observation_data.get('subjects_struggled', [])
+    if isinstance(subjects_struggled, list):
+        subjects_struggled = json.dumps(subjects_struggled)
+    return (
+        student_id,
+        observation_data.get('child_name', 'Unknown Child'),
+        datetime.fromisoformat(observation_data.get('date', date.today().isoformat())),
+        observation_data.get('homework_completion'),
+        observation_data.get('reading_time'),
+        observation_data.get('focus_level'),
+        subjects_struggled,
+        observation_data.get('behavior_rating'),
+        observation_data.get('mood_rating'),
+        observation_data.get('sleep_hours'),
+        observation_data.get('energy_level'),
+        observation_data.get('social_interactions', ''),
+        observation_data.get('learning_wins', ''),
+        observation_data.get('challenges_faced', ''),
+        observation_data.get('strategies_used', ''),
+        observation_data.get('screen_time'),
+        observation_data.get('physical_activity'),
+        observation_data.get('medication_taken', False),
+        observation_data.get('special_events', ''),
+        datetime.fromisoformat(observation_data.get('timestamp', datetime.now().isoformat()))
+    )
+
+def write_predictions(cur, predictions, record_uids=None):
+    """
+    Insert predictions with an open cursor, without committing: one
+    statement upserts their students, then multi-row INSERTs of
+    BULK_PAGE_SIZE rows add the predictions.
+
+    With record_uids (one per prediction), a prediction whose uid is already
+    stored is skipped, so a batch can safely be written again (see
+    utils/sync_utils.py). Returns the number of predictions inserted.
+    """
+    students = {}
+    for prediction_data in predictions:
+        students.setdefault(prediction_data.get('student_name', 'Unknown Student'),
+                            prediction_data.get('grade_level', 'Unknown'))
+    student_ids = _upsert_students(cur, students)
+
+    rows = [_prediction_row(student_ids[prediction_data.get('student_name', 'Unknown Student')], prediction_data)
+            for prediction_data in predictions]
+    if record_uids is None:
+        execute_values(cur, f"INSERT INTO predictions ({PREDICTION_COLUMNS}) VALUES %s", rows, page_size=BULK_PAGE_SIZE)
+        return len(rows)
+    inserted = execute_values(
+        cur,
+        f"INSERT INTO predictions ({PREDICTION_COLUMNS}, record_uid) VALUES %s "
+        "ON CONFLICT (record_uid, timestamp) DO NOTHING RETURNING id",
+        [row + (uid,) for row, uid in zip(rows, record_uids)], page_size=BULK_PAGE_SIZE, fetch=True
+    )
+    return len(inserted)
+
+def write_parent_observations(cur, observations, record_uids=None):
+    """Insert parent observations with an open cursor, as write_predictions() does"""
+    students = {observation_data.get('child_name', 'Unknown Child'): 'Unknown' for observation_data in observations}
+    student_ids = _upsert_students(cur, students)
+
+    rows = [_observation_row(student_ids[observation_data.get('child_name', 'Unknown Child')], observation_data)
+            for observation_data in observations]
+    if record_uids is None:
+        execute_values(cur, f"INSERT INTO parent_observations ({OBSERVATION_COLUMNS}) VALUES %s", rows, page_size=BULK_PAGE_SIZE)
+        return len(rows)
+    inserted = execute_values(
+        cur,
+        f"INSERT INTO parent_observations ({OBSERVATION_COLUMNS}, record_uid) VALUES %s "
+        "ON CONFLICT (record_uid, date) DO NOTHING RETURNING id",
+        [row + (uid,) for row, uid in zip(rows, record_uids)], page_size=BULK_PAGE_SIZE, fetch=True
+    )
+    return len(inserted)
+
+def save_prediction_to_db(prediction_data):
+    """Save prediction data to PostgreSQL database"""
+    return save_predictions_to_db([prediction_data])
+
+def save_predictions_to_db(predictions):
+    """
+    Save many predictions (e.g. a Batch Upload) in one transaction with
+    write_predictions(). Nothing is saved if any fails.
+    """
+    if not predictions:
+        return True
+    with db_connection() as conn:
+        if not conn:
+            return False
+
+        try:
+            cur = conn.cursor()
+            saved = write_predictions(cur, predictions)
+            conn.commit()
+            invalidate_database_stats()
+            logger.info(f"Saved {saved} prediction(s)")
+            return True
+
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error saving prediction: {e}")
+            return False
+
+def save_parent_observation_to_db(observation_data):
+    """Save parent observation to PostgreSQL database"""
+    return save_parent_observations_to_db([observation_data])
+
+def save_parent_observations_to_db(observations):
+    """Save many parent observations in one transaction (see save_predictions_to_db)"""
+    if not observations:
+        return True
+    with db_connection() as conn:
+        if not conn:
+            return False
+
+        try:
+            cur = conn.cursor()
+            saved = write_parent_observations(cur, observations)
+            conn.commit()
+            invalidate_database_stats()
+            logger.info(f"Saved {saved} parent observation(s)")
+            return True
+
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error saving parent observation: {e}")
+            return False
+
+# Record key -> SQL expression. Prediction student fields come from the joined
+# students row; the join is only added when one of them is requested.
+PREDICTION_FIELDS = {
+    'id': 'p.id',
+    'math_score': 'p.math_score',
+    'reading_score': 'p.reading_score',
+    'writing_score': 'p.writing_score',
+    'attendance': 'p.attendance',
+    'behavior': 'p.behavior',
+    'literacy': 'p.literacy',
+    'prediction': 'p.prediction',
+    'probability': 'p.probability',
+    'risk_level': 'p.risk_level',
+    'notes': 'p.notes',
+    'timestamp': 'p.timestamp',
+    'student_name': 's.name',
+    'grade_level': 's.grade_level'
+}
+
+OBSERVATION_FIELDS = {
+    'id': 'po.id',
+    'child_name': 'po.child_name',
+    'date': 'po.date',
+    'homework_completion': 'po.homework_completion',
+    'reading_time': 'po.reading_time',
+    'focus_level': 'po.focus_level',
+    'subjects_struggled': 'po.subjects_struggled',
+    'behavior_rating': 'po.behavior_rating',
+    'mood_rating': 'po.mood_rating',
+    'sleep_hours': 'po.sleep_hours',
+    'energy_level': 'po.energy_level',
+    'social_interactions': 'po.social_interactions',
+    'learning_wins': 'po.learning_wins',
+    'challenges_faced': 'po.challenges_faced',
+    'strategies_used': 'po.strategies_used',
+    'screen_time': 'po.screen_time',
+    'physical_activity': 'po.physical_activity',
+    'medication_taken': 'po.medication_taken',
+    'special_events': 'po.special_events',
+    'timestamp': 'po.timestamp'
+}
+
+# Rows fetched per round trip when streaming through a server-side cursor
+DB_FETCH_SIZE = int(os.environ.get('EDUSCAN_DB_FETCH_SIZE', '500'))
+
+def _as_date(value):
+    """Accepts a date, datetime or ISO string and returns a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def _prediction_query(student_name, start_date, end_date, risk_level, columns):
+    columns = list(columns or PREDICTION_FIELDS)
+    unknown = [column for column in columns if column not in PREDICTION_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown prediction columns: {', '.join(unknown)}")
+    conditions, params = [], []
+    if student_name is not None:
+        conditions.append("p.student_id IN (SELECT id FROM students WHERE name = %s)")
+        params.append(student_name)
+    if start_date is not None:
+        conditions.append("p.timestamp >= %s")
+        params.append(_as_date(start_date))
+    if end_date is not None:
+        # Timestamps carry a time of day, so the end bound is the start of the next day
+        conditions.append("p.timestamp < %s")
+        params.append(_as_date(end_date) + timedelta(days=1))
+    if risk_level is not None:
+        conditions.append("p.risk_level = %s")
+        params.append(risk_level)
+    source = "predictions p"
+    if any(PREDICTION_FIELDS[column].startswith('s.') for column in columns):
+        source += " JOIN students s ON p.student_id = s.id"
+    return {'fields': PREDICTION_FIELDS, 'columns': columns, 'source': source, 'conditions': conditions,
+            'params': params, 'order': ('p.timestamp', 'p.id')}
+
+def _observation_query(child_name, start_date, end_date, columns):
+    columns = list(columns or OBSERVATION_FIELDS)
+    unknown = [column for column in columns if column not in OBSERVATION_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown observation columns: {', '.join(unknown)}")
+    conditions, params = [], []
+    if child_name is not None:
+        conditions.append("po.student_id IN (SELECT id FROM students WHERE name = %s)")
+        params.append(child_name)
+    if start_date is not None:
+        conditions.append("po.date >= %s")
+        params.append(_as_date(start_date))
+    if end_date is not None:
+        conditions.append("po.date <= %s")
+        params.append(_as_date(end_date))
+    return {'fields': OBSERVATION_FIELDS, 'columns': columns, 'source': "parent_observations po",
+            'conditions': conditions, 'params': params, 'order': ('po.date', 'po.id')}
+
+def _select_sql(query, descending, after, limit):
+    """
+    SELECT for a query built above. The ordering columns are appended to
+    every row, so the last row of a page yields the cursor for the next one.
+    """
+    order_column, id_column = query['order']
+    conditions, params = list(query['conditions']), list(query['params'])
+    if after is not None:
+        conditions.append(f"({order_column}, {id_column}) {'<' if descending else '>'} (%s, %s)")
+        params.extend(after)
+    selected = [query['fields'][column] for column in query['columns']] + [order_column, id_column]
+    sql = f"SELECT {', '.join(selected)} FROM {query['source']}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    direction = "DESC" if descending else "ASC"
+    sql += f" ORDER BY {order_column} {direction}, {id_column} {direction}"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(int(limit))
+    return sql, params
+
+def _row_to_record(columns, row):
+    record = {}
+    for column, value in zip(columns, row):
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif column == 'subjects_struggled':
             # Parse subjects_struggled back to list
-            subjects_struggled = row[8] or '[]'
             try:
-                subjects_struggled = json.loads(subjects_struggled)
-            except json.JSONDecodeError:
-                subjects_struggled = []
-            
-            observation_dict = {
-                'id': row[0],
-                'child_name': row[2],
-                'date': row[3].isoformat(),
-                'homework_completion': row[4],
-                'reading_time': row[5],
-                'focus_level': row[6],
-                'subjects_struggled': subjects_struggled,
-                'behavior_rating': row[9],
-                'mood_rating': row[10],
-                'sleep_hours': row[11],
-                'energy_level': row[12],
-                'social_interactions': row[13],
-                'learning_wins': row[14],
-                'challenges_faced': row[15],
-                'strategies_used': row[16],
-                'screen_time': row[17],
-                'physical_activity': row[18],
-                'medication_taken': row[19],
-                'special_events': row[20],
-                'timestamp': row[21].isoformat()
-            }
-            observations.append(observation_dict)
-        
-        return observations
-        
-    except Exception as e:
-        logger.error(f"Error loading observations: {e}")
-        return []
-    finally:
-        conn.close()
+                value = json.loads(value or '[]')
+            except (TypeError, json.JSONDecodeError):
+                value = []
+        record[column] = value
+    return record
+
+def _stream(query, descending, limit, chunk_size, description):
+    """
+    Yield records from a named (server-side) cursor, chunk_size rows per
+    round trip. The pooled connection is held until the generator is
+    exhausted or closed.
+    """
+    with db_connection() as conn:
+        if not conn:
+            return
+        cur = None
+        try:
+            sql, params = _select_sql(query, descending, None, limit)
+            cur = conn.cursor(name=f"eduscan_{uuid.uuid4().hex}")
+            cur.itersize = chunk_size
+            cur.execute(sql, params)
+            for row in cur:
+                yield _row_to_record(query['columns'], row)
+        except Exception as e:
+            logger.error(f"Error loading {description}: {e}")
+        finally:
+            if cur is not None and not conn.closed:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+
+def _page(query, page_size, cursor, descending, description):
+    """One page plus one extra row, to know whether another page follows"""
+    with db_connection() as conn:
+        if not conn:
+            return [], None
+        try:
+            sql, params = _select_sql(query, descending, cursor, page_size + 1)
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        except Exception as e:
+            logger.error(f"Error loading {description}: {e}")
+            return [], None
+    next_cursor = tuple(rows[page_size - 1][-2:]) if len(rows) > page_size else None
+    return [_row_to_record(query['columns'], row) for row in rows[:page_size]], next_cursor
+
+def iter_student_predictions(student_name=None, start_date=None, end_date=None, risk_level=None,
+                             descending=True, limit=None, columns=None, chunk_size=DB_FETCH_SIZE):
+    """
+    Stream prediction records from the database, newest first unless descending=False.
+
+    Filters and the column list are applied in SQL: start_date and end_date
+    are inclusive dates or ISO strings, columns are keys of PREDICTION_FIELDS.
+    Rows arrive chunk_size at a time; consume or close the generator to
+    release its connection.
+    """
+    query = _prediction_query(student_name, start_date, end_date, risk_level, columns)
+    return _stream(query, descending, limit, chunk_size, "predictions")
+
+def page_student_predictions(page_size=20, cursor=None, student_name=None, start_date=None, end_date=None,
+                             risk_level=None, descending=True, columns=None):
+    """
+    Returns (records, next_cursor) for one page of predictions, filtered as in
+    iter_student_predictions(). Pass next_cursor back for the following page;
+    it is None after the last page.
+    """
+    query = _prediction_query(student_name, start_date, end_date, risk_level, columns)
+    return _page(query, page_size, cursor, descending, "predictions")
+
+def load_student_predictions(student_name=None, start_date=None, end_date=None, risk_level=None, columns=None):
+    """Load student prediction data from database, newest first, optionally filtered"""
+    return list(iter_student_predictions(student_name, start_date, end_date, risk_level, columns=columns))
+
+def iter_parent_observations(child_name=None, start_date=None, end_date=None,
+                             descending=True, limit=None, columns=None, chunk_size=DB_FETCH_SIZE):
+    """
+    Stream parent observations from the database ordered by date, newest
+    first unless descending=False. Works like iter_student_predictions();
+    columns are keys of OBSERVATION_FIELDS.
+    """
+    query = _observation_query(child_name, start_date, end_date, columns)
+    return _stream(query, descending, limit, chunk_size, "observations")
+
+def page_parent_observations(page_size=20, cursor=None, child_name=None, start_date=None, end_date=None,
+                             descending=True, columns=None):
+    """Returns (observations, next_cursor) for one page, as page_student_predictions() does"""
+    query = _observation_query(child_name, start_date, end_date, columns)
+    return _page(query, page_size, cursor, descending, "observations")
+
+def load_parent_observations(child_name=None, start_date=None, end_date=None, columns=None):
+    """Load parent observation data from database, newest first, optionally filtered"""
+    return list(iter_parent_observations(child_name, start_date, end_date, columns=columns))
 
 def authenticate_user_db(username, password):
     """Authenticate user against database"""
-    conn = get_db_connection()
-    if not conn:
-        return None
-    
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT id, username, user_type, full_name, email, created_date FROM users WHERE username = %s AND password = %s",
-            (username, password)
-        )
-        user_record = cur.fetchone()
-        
-        if user_record:
-            return {
-                'id': user_record[0],
-                'username': user_record[1],
-                'user_type': user_record[2],
-                'full_name': user_record[3],
-                'email': user_record[4],
-                'created_date': user_record[5].isoformat()
+    with db_connection() as conn:
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT id, username, user_type, full_name, email, created_date FROM users WHERE username = %s AND password = %s",
+                (username, password)
+            )
+            user_record = cur.fetchone()
+
+            if user_record:
+                return {
+                    'id': user_record[0],
+                    'username': user_record[1],
+                    'user_type': user_record[2],
+                    'full_name': user_record[3],
+                    'email': user_record[4],
+                    'created_date': user_record[5].isoformat()
+                }
+            return None
+
+        except Exception as e:
+            logger.error(f"Error authenticating user: {e}")
+            return None
+
+# get_database_stats() results are reused for this many seconds
+DB_STATS_TTL = float(os.environ.get('EDUSCAN_DB_STATS_TTL', '30'))
+# Tables whose planner estimate exceeds this are not counted exactly
+DB_EXACT_COUNT_LIMIT = int(os.environ.get('EDUSCAN_DB_EXACT_COUNT_LIMIT', '100000'))
+
+_stats_cache = {'expires': 0.0, 'stats': None}
+_stats_cache_lock = threading.Lock()
+
+def _count_expression(table):
+    """
+    Row count of a table: the planner's estimate (pg_class.reltuples, summed
+    over partitions) when it is above DB_EXACT_COUNT_LIMIT, else COUNT(*).
+    CASE only evaluates the branch it needs, so big tables are never scanned.
+    """
+    estimate = f"""(SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint FROM pg_class c
+        WHERE c.oid = '{table}'::regclass
+           OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = '{table}'::regclass))"""
+    return f"CASE WHEN {estimate} > %(exact_limit)s THEN {estimate} ELSE (SELECT COUNT(*) FROM {table}) END"
+
+DATABASE_STATS_SQL = f"""
+    SELECT
+        {_count_expression('students')},
+        {_count_expression('predictions')},
+        {_count_expression('parent_observations')},
+        {_count_expression('users')},
+        (SELECT MAX(timestamp) FROM predictions),
+        (SELECT MAX(timestamp) FROM parent_observations)
+"""
+
+def _empty_stats():
+    return {
+        'total_students': 0,
+        'total_predictions': 0,
+        'total_observations': 0,
+        'total_users': 0,
+        'last_prediction_date': None,
+        'last_observation_date': None
+    }
+
+def invalidate_database_stats():
+    """Make the next get_database_stats() call query the database"""
+    with _stats_cache_lock:
+        _stats_cache['expires'] = 0.0
+
+def get_database_stats(refresh=False):
+    """
+    Get database statistics in one round trip. Results are cached for
+    DB_STATS_TTL seconds (refresh=True bypasses the cache), and counts of
+    very large tables are estimates.
+    """
+    with _stats_cache_lock:
+        if not refresh and _stats_cache['stats'] is not None and time.monotonic() < _stats_cache['expires']:
+            return dict(_stats_cache['stats'])
+
+    with db_connection() as conn:
+        if not conn:
+            return _empty_stats()
+
+        try:
+            cur = conn.cursor()
+            cur.execute(DATABASE_STATS_SQL, {'exact_limit': DB_EXACT_COUNT_LIMIT})
+            total_students, total_predictions, total_observations, total_users, \
+                latest_prediction, latest_observation = cur.fetchone()
+
+            stats = {
+                'total_students': total_students,
+                'total_predictions': total_predictions,
+                'total_observations': total_observations,
+                'total_users': total_users,
+                'last_prediction_date': latest_prediction.isoformat() if latest_prediction else None,
+                'last_observation_date': latest_observation.isoformat() if latest_observation else None
             }
-        return None
-        
-    except Exception as e:
-        logger.error(f"Error authenticating user: {e}")
-        return None
-    finally:
-        conn.close()
-
-def get_database_stats():
-    """Get database statistics"""
-    conn = get_db_connection()
-    if not conn:
-        return {
-            'total_students': 0,
-            'total_predictions': 0,
-            'total_observations': 0,
-            'total_users': 0,
-            'last_prediction_date': None,
-            'last_observation_date': None
-        }
-    
-    try:
-        cur = conn.cursor()
-        
-        # Get counts
-        cur.execute("SELECT COUNT(*) FROM students")
-        total_students = cur.fetchone()[0]
-        
-        cur.execute("SELECT COUNT(*) FROM predictions")
-        total_predictions = cur.fetchone()[0]
-        
-        cur.execute("SELECT COUNT(*) FROM parent_observations")
-        total_observations = cur.fetchone()[0]
-        
-        cur.execute("SELECT COUNT(*) FROM users")
-        total_users = cur.fetchone()[0]
-        
-        # Get latest dates
-        cur.execute("SELECT MAX(timestamp) FROM predictions")
-        latest_prediction = cur.fetchone()[0]
-        
-        cur.execute("SELECT MAX(timestamp) FROM parent_observations")
-        latest_observation = cur.fetchone()[0]
-        
-        return {
-            'total_students': total_students,
-            'total_predictions': total_predictions,
-            'total_observations': total_observations,
-            'total_users': total_users,
-            'last_prediction_date': latest_prediction.isoformat() if latest_prediction else None,
-            'last_observation_date': latest_observation.isoformat() if latest_observation else None
-        }
-        
-    except Exception as e:
-        logger.error(f"Error getting database stats: {e}")
-        return {
-            'total_students': 0,
-            'total_predictions': 0,
-            'total_observations': 0,
-            'total_users': 0,
-            'last_prediction_date': None,
-            'last_observation_date': None
-        }
-    finally:
-        conn.close()
\ No newline at end of file
+
+        except Exception as e:
+            logger.error(f"Error getting database stats: {e}")
+            return _empty_stats()
+
+    with _stats_cache_lock:
+        _stats_cache['stats'] = stats
+        _stats_cache['expires'] = time.monotonic() + DB_STATS_TTL
+    return dict(stats)
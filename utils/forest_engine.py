@@ -0,0 +1,247 @@
+"""
+Compiled flat-array evaluator for fitted RandomForest classifiers.
+
+The trees of a fitted forest are concatenated into contiguous NumPy node
+arrays (feature, threshold, left, right, value). Evaluation walks all trees
+for all rows at once, one tree level per step, without sklearn's per-call
+input validation and thread dispatch. For a single student or a small batch
+this is far faster than calling predict_proba on the forest; for thousands
+of rows sklearn's compiled tree traversal wins again.
+
+Run ``python -m utils.forest_engine`` to benchmark against the sklearn path.
+"""
+
+import time
+import numpy as np
+
+# Rows evaluated together; bounds memory at ROWS_PER_CHUNK x n_trees walkers
+ROWS_PER_CHUNK = 2048
+
+
+class CompiledForest:
+    """A forest compiled into flat node arrays, evaluated with NumPy"""
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth,
+                 classes, n_features, feature_importances=None, is_leaf=None):
+        self.feature = feature
+        self.threshold = threshold
+        # children[node] = (left, right), used to pick the next node without branching
+        self.children = children
+        self.value = value
+        self.roots = roots
+        if is_leaf is None:
+            is_leaf = children[:, 0] == np.arange(len(children))
+        self.is_leaf = is_leaf
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        if feature_importances is not None:
+            self.feature_importances_ = np.asarray(feature_importances)
+
+    @property
+    def left(self):
+        return self.children[:, 0]
+
+    @property
+    def right(self):
+        return self.children[:, 1]
+
+    def arrays(self):
+        """Return the node arrays by name, e.g. for writing them to disk"""
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children': self.children,
+            'value': self.value,
+            'roots': self.roots,
+            'is_leaf': self.is_leaf,
+            'classes': self.classes_
+        }
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_rows, n_trees)"""
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        # so samples sitting exactly on a split go the same way
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        # One (row, tree) walker per entry; row_base locates the row inside flat_X
+        nodes = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows) * n_features, len(self.roots))
+
+        # Advance one level per step, dropping walkers as soon as they reach a leaf
+        active = np.arange(nodes.size)
+        while active.size:
+            current = nodes[active]
+            go_right = flat_X[row_base[active] + self.feature[current]] > self.threshold[current]
+            current = self.children[current, go_right.astype(np.intp)]
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+        return nodes.reshape(n_rows, len(self.roots))
+
+    def predict_proba(self, X):
+        """Class probabilities averaged over all trees, like RandomForestClassifier.predict_proba"""
+        X = np.atleast_2d(X)
+        # Bound the (rows x trees) walker arrays for large batches
+        return np.concatenate([
+            self.value[self.apply(X[start:start + ROWS_PER_CHUNK])].mean(axis=1)
+            for start in range(0, max(len(X), 1), ROWS_PER_CHUNK)
+        ])
+
+    def explain(self, X, class_index=1):
+        """
+        Per-feature tree path contributions (Saabas method) for one class.
+
+        Walking each tree from the root, the change in the node's class
+        fraction at every split is credited to the split feature. Averaged
+        over the forest, bias + contributions.sum(axis=1) equals
+        predict_proba(X)[:, class_index].
+
+        Returns:
+            tuple: (bias, contributions) with shapes (n_rows,) and (n_rows, n_features)
+        """
+        X = np.atleast_2d(X)
+        class_values = np.ascontiguousarray(self.value[:, class_index])
+        bias = np.full(len(X), class_values[self.roots].mean())
+        contributions = np.concatenate([
+            self._explain_chunk(X[start:start + ROWS_PER_CHUNK], class_values)
+            for start in range(0, max(len(X), 1), ROWS_PER_CHUNK)
+        ])
+        return bias, contributions
+
+    def _explain_chunk(self, X, class_values):
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        nodes = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows) * n_features, len(self.roots))
+
+        totals = np.zeros(n_rows * n_features)
+        active = np.arange(nodes.size)
+        while active.size:
+            current = nodes[active]
+            split_feature = self.feature[current]
+            go_right = flat_X[row_base[active] + split_feature] > self.threshold[current]
+            child = self.children[current, go_right.astype(np.intp)]
+            # Credit the change in class fraction to (row, split feature)
+            totals += np.bincount(row_base[active] + split_feature, weights=class_values[child] - class_values[current], minlength=totals.size)
+            nodes[active] = child
+            active = active[~self.is_leaf[child]]
+        return totals.reshape(n_rows, n_features) / len(self.roots)
+
+    def predict(self, X):
+        """Predicted class labels"""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def compile_forest(model):
+    """
+    Compile a fitted sklearn forest classifier into a CompiledForest.
+
+    Returns None if the model is not a fitted single-output forest of
+    decision trees, so callers can fall back to the model itself.
+    """
+    estimators = getattr(model, 'estimators_', None)
+    if not estimators or getattr(model, 'n_outputs_', 1) != 1:
+        return None
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for estimator in estimators:
+        tree = getattr(estimator, 'tree_', None)
+        if tree is None:
+            return None
+
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        # Leaves point back to themselves and compare feature 0 against +inf
+        feature = np.where(is_leaf, 0, tree.feature)
+        threshold = np.where(is_leaf, np.inf, tree.threshold)
+        left = np.where(is_leaf, node_ids, tree.children_left) + offset
+        right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+        # Normalize leaf values to class fractions (older sklearn stores counts)
+        value = tree.value[:, 0, :].astype(np.float64)
+        totals = value.sum(axis=1, keepdims=True)
+        value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left)
+        rights.append(right)
+        values.append(value)
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    return CompiledForest(
+        feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+        threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+        children=np.ascontiguousarray(np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1), dtype=np.intp),
+        value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+        roots=np.asarray(roots, dtype=np.intp),
+        max_depth=max_depth,
+        classes=model.classes_,
+        n_features=model.n_features_in_,
+        feature_importances=getattr(model, 'feature_importances_', None)
+    )
+
+
+def benchmark(model, compiled=None, batch_size=1000, repeats=200, seed=0):
+    """
+    Compare sklearn and compiled-forest inference on random inputs.
+
+    Returns a dict with per-call timings in milliseconds and the largest
+    absolute probability difference between the two paths. model must be
+    the sklearn forest itself, not an already compiled one.
+    """
+    if getattr(model, 'estimators_', None) is None:
+        raise ValueError("Benchmark needs the fitted sklearn forest, not a compiled model")
+    if compiled is None:
+        compiled = compile_forest(model)
+    if compiled is None:
+        raise ValueError("Model cannot be compiled into a flat forest")
+
+    rng = np.random.default_rng(seed)
+    single_row = rng.normal(size=(1, compiled.n_features_in_))
+    batch = rng.normal(size=(batch_size, compiled.n_features_in_))
+
+    def _time(func, X, n):
+        start = time.perf_counter()
+        for _ in range(n):
+            func(X)
+        return (time.perf_counter() - start) / n * 1000
+
+    batch_repeats = max(1, repeats // 20)
+    max_diff = float(np.abs(model.predict_proba(batch) - compiled.predict_proba(batch)).max())
+
+    return {
+        'single_row_sklearn_ms': _time(model.predict_proba, single_row, repeats),
+        'single_row_compiled_ms': _time(compiled.predict_proba, single_row, repeats),
+        'batch_sklearn_ms': _time(model.predict_proba, batch, batch_repeats),
+        'batch_compiled_ms': _time(compiled.predict_proba, batch, batch_repeats),
+        'batch_size': batch_size,
+        'max_probability_difference': max_diff
+    }
+
+
+if __name__ == "__main__":
+    from utils.model_utils import get_model_path
+    from utils.model_registry import discover_bundle, load_bundle
+
+    # Always load the pickled sklearn forest; load_model() may serve a compiled artifact
+    results = benchmark(load_bundle(discover_bundle(get_model_path(include_artifact=False)))['model'])
+    print(f"Single row  - sklearn: {results['single_row_sklearn_ms']:.3f} ms, compiled: {results['single_row_compiled_ms']:.3f} ms")
+    print(f"Batch of {results['batch_size']} - sklearn: {results['batch_sklearn_ms']:.3f} ms, compiled: {results['batch_compiled_ms']:.3f} ms")
+    print(f"Max probability difference: {results['max_probability_difference']:.2e}")
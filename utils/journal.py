@@ -0,0 +1,316 @@
+"""
+Append-only, line-delimited JSON journal used by utils/data_utils.py.
+
+Each record is one JSON line appended with a single O_APPEND write, so a
+save costs one short write instead of rewriting the whole history, and
+concurrent sessions (threads or processes) never overwrite each other.
+
+Durability uses group commit: a writer returns only after its line has been
+fsynced, but writers that arrive within the same short window share a single
+fsync. A line cut short by a crash is skipped by the reader.
+
+A journal can also defer its fsyncs (enable_write_behind()). This is not a
+queue: an append made with sync=False still writes its line on the calling
+thread, so it survives an application crash and readers see it at once.
+Only the fsync is deferred: a background thread runs it for a batch of
+such appends after a short interval, or once enough are pending.
+"""
+
+import os
+import json
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# How long the syncing writer waits for others to join its fsync
+GROUP_COMMIT_WINDOW = float(os.environ.get('EDUSCAN_GROUP_COMMIT_MS', '2')) / 1000.0
+
+# Write-behind defaults: the longest an acknowledged save waits for its fsync,
+# and how many unsynced appends trigger one early
+WRITE_BEHIND_INTERVAL = float(os.environ.get('EDUSCAN_WRITE_BEHIND_MS', '200')) / 1000.0
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get('EDUSCAN_WRITE_BEHIND_MAX_PENDING', '64'))
+
+
+@contextmanager
+def _file_lock(file_path, exclusive):
+    """
+    Advisory lock shared by every process using a journal. Appends hold it
+    shared; rewrites (see utils/retention.py) hold it exclusively. Without
+    fcntl (Windows) only threads of one process are coordinated.
+    """
+    if not FCNTL_AVAILABLE:
+        yield
+        return
+    lock_fd = os.open(f"{file_path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        os.close(lock_fd)
+
+
+class Journal:
+    """A single append-only JSONL file with group-committed fsync"""
+
+    def __init__(self, file_path, group_commit_window=GROUP_COMMIT_WINDOW):
+        self.file_path = file_path
+        self.group_commit_window = group_commit_window
+        self._fd = None
+        self._write_lock = threading.Lock()
+        self._sync_cond = threading.Condition()
+        self._written = 0
+        self._synced = 0
+        self._syncing = False
+        self.stats = {'appends': 0, 'fsyncs': 0, 'deferred_appends': 0}
+        # Set by enable_write_behind()
+        self._flusher = None
+        self._dirty = threading.Event()
+        self._full = threading.Event()
+        self.flush_interval = None
+        self.max_pending = None
+
+    def _open(self):
+        if self._fd is not None and self._replaced():
+            # Another process rewrote the journal; append to the new file
+            os.close(self._fd)
+            self._fd = None
+        if self._fd is None:
+            directory = os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            # Terminate a line left half-written by a crash so the next record starts clean
+            size = os.fstat(self._fd).st_size
+            if size:
+                with open(self.file_path, 'rb') as f:
+                    f.seek(size - 1)
+                    if f.read(1) != b'\n':
+                        os.write(self._fd, b'\n')
+        return self._fd
+
+    def _replaced(self):
+        try:
+            return os.stat(self.file_path).st_ino != os.fstat(self._fd).st_ino
+        except OSError:
+            return True
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Block all appends, from this and other processes, e.g. while the file
+        is rewritten. The journal reopens the file on the next append.
+        """
+        with self._write_lock:
+            with _file_lock(self.file_path, exclusive=True):
+                yield
+                if self._fd is not None:
+                    # Everything written so far is flushed before the file may be replaced
+                    os.fsync(self._fd)
+                    os.close(self._fd)
+                    self._fd = None
+                    with self._sync_cond:
+                        self._synced = self._written
+                        self._sync_cond.notify_all()
+
+    def append(self, record, sync=True):
+        """Append one record. Returns once it is durable (or written, if sync=False)."""
+        return self.append_many([record], sync=sync)
+
+    def append_many(self, records, sync=True):
+        """
+        Append several records with one write and at most one fsync.
+
+        The write always happens before this returns. sync=False skips only
+        the wait for the fsync, which the enable_write_behind() thread runs
+        later (or the next synced append, or flush()).
+
+        Returns the (start, end) byte offsets of the written lines, which lets
+        readers that track their position extend a cached copy in place.
+        """
+        data = ''.join(json.dumps(record, default=str) + '\n' for record in records).encode('utf-8')
+        if not data:
+            return None
+        with self._write_lock:
+            with _file_lock(self.file_path, exclusive=False):
+                fd = self._open()
+                os.write(fd, data)
+                # With O_APPEND the write lands at the end of file, leaving the position right after it
+                end = os.lseek(fd, 0, os.SEEK_CUR)
+            self._written += 1
+            sequence = self._written
+            self.stats['appends'] += len(records)
+        if sync:
+            self._wait_for_sync(sequence)
+        elif self._flusher is not None:
+            self.stats['deferred_appends'] += len(records)
+            self._dirty.set()
+            if sequence - self._synced >= self.max_pending:
+                self._full.set()
+        return (end - len(data), end)
+
+    def enable_write_behind(self, interval=WRITE_BEHIND_INTERVAL, max_pending=WRITE_BEHIND_MAX_PENDING):
+        """
+        Start a background thread that fsyncs sync=False appends, at most
+        interval seconds after the first unsynced one, or as soon as
+        max_pending are waiting. Pending appends are also flushed at exit.
+        The appends themselves are still written by their callers; only their
+        fsyncs are batched here.
+        """
+        with self._write_lock:
+            self.flush_interval = interval
+            self.max_pending = max(1, max_pending)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name=f"journal-flush:{self.file_path}", daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            self._dirty.wait()
+            # Let a batch gather, unless enough appends are already waiting
+            self._full.wait(self.flush_interval)
+            self._dirty.clear()
+            self._full.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing {self.file_path}: {e}")
+
+    def flush(self):
+        """Make every append written so far durable"""
+        self._wait_for_sync(self._written)
+
+    @property
+    def pending(self):
+        """Appends written but not yet fsynced"""
+        return self._written - self._synced
+
+    def _wait_for_sync(self, sequence):
+        with self._sync_cond:
+            while self._synced < sequence:
+                if self._syncing:
+                    # Another writer is fsyncing; it may cover this write too
+                    self._sync_cond.wait()
+                    continue
+                self._syncing = True
+                self._sync_cond.release()
+                try:
+                    if self.group_commit_window:
+                        time.sleep(self.group_commit_window)
+                    with self._write_lock:
+                        target = self._written
+                        # A private duplicate stays valid even if the journal is reopened meanwhile
+                        fd = os.dup(self._fd) if self._fd is not None else None
+                    if fd is not None:
+                        try:
+                            os.fsync(fd)
+                        finally:
+                            os.close(fd)
+                finally:
+                    self._sync_cond.acquire()
+                    self._syncing = False
+                    self._sync_cond.notify_all()
+                self._synced = max(self._synced, target)
+                self.stats['fsyncs'] += 1
+
+    def close(self):
+        self.flush()
+        with self._write_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def __iter__(self):
+        return iter_journal(self.file_path)
+
+
+def _decode_line(line, file_path, position):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        print(f"Warning: skipping unreadable line at {position} in {file_path}")
+        return None
+
+
+def iter_journal(file_path):
+    """Stream the records of a journal file one at a time"""
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            record = _decode_line(line, file_path, f"line {line_number}")
+            if record is not None:
+                yield record
+
+
+def read_journal_from(file_path, offset=0):
+    """
+    Read the complete lines of a journal starting at a byte offset.
+
+    A trailing line without its newline may still be in the middle of being
+    written, so it is left for the next read.
+
+    Returns:
+        tuple: (records, offset just past the last complete line)
+    """
+    if not os.path.exists(file_path):
+        return [], 0
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    complete = data.rfind(b'\n') + 1
+    records = []
+    for line in data[:complete].decode('utf-8').splitlines():
+        record = _decode_line(line, file_path, f"offset {offset}")
+        if record is not None:
+            records.append(record)
+    return records, offset + complete
+
+
+def migrate_json_to_journal(json_path, journal_path):
+    """
+    One-shot conversion of a JSON array file into a journal.
+
+    The journal is written to a temporary file and renamed into place, so an
+    interrupted migration is simply redone. The JSON file is left untouched.
+    Returns the number of migrated records, or None if nothing was migrated.
+    """
+    if os.path.exists(journal_path) or not os.path.exists(json_path) or os.stat(json_path).st_size == 0:
+        return None
+    try:
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"Error migrating {json_path}: {e}")
+        return None
+    if not isinstance(data, list):
+        data = [data] if data else []
+
+    tmp_path = f"{journal_path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in data:
+            f.write(json.dumps(record, default=str) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        # Fails instead of overwriting if another process migrated first
+        os.link(tmp_path, journal_path)
+    except FileExistsError:
+        return None
+    except OSError:
+        os.replace(tmp_path, journal_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"Migrated {len(data)} records from {json_path} to {journal_path}")
+    return len(data)
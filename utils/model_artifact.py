@@ -0,0 +1,219 @@
+"""
+Versioned, memory-mappable on-disk format for the prediction model.
+
+An artifact is a directory holding one raw ``.npy`` file per array (the
+compiled forest nodes from utils/forest_engine.py, the scaler parameters and
+the feature importances) plus a ``manifest.json`` describing the format
+version, feature order and per-file checksums. Arrays are opened with
+``np.load(mmap_mode='r')``, so loading is near-instant and every Streamlit
+worker process shares the same pages through the OS cache instead of holding
+its own unpickled copy.
+
+Convert the existing pickle with ``python -m utils.model_artifact``.
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+from datetime import datetime
+import numpy as np
+
+from utils.forest_engine import CompiledForest, compile_forest
+from utils.model_registry import FEATURE_ORDER, normalize_feature_order, discover_bundle, load_bundle
+
+ARTIFACT_FORMAT = 'eduscan-forest'
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+
+class ArrayScaler:
+    """Minimal StandardScaler replacement backed by plain mean/scale arrays"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def get_artifact_dir():
+    """Get the default artifact directory (data/model_artifact)"""
+    if getattr(sys, 'frozen', False):
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, 'data', 'model_artifact')
+
+
+def _sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_model_artifact(model_package, artifact_dir=None, source=None):
+    """
+    Write a model package as an artifact directory.
+
+    The artifact is built in a temporary sibling directory and then renamed
+    into place, so readers never see a partially written artifact.
+
+    Returns the artifact directory path.
+    """
+    artifact_dir = artifact_dir or get_artifact_dir()
+
+    compiled = model_package.get('compiled_model') or compile_forest(model_package['model'])
+    if compiled is None:
+        raise ValueError("Only fitted RandomForest models can be stored as an artifact")
+
+    arrays = compiled.arrays()
+    for name in ('feature', 'children', 'roots'):
+        arrays[name] = arrays[name].astype(np.int64)
+
+    scaler = model_package.get('scaler')
+    if scaler is not None:
+        arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+    if hasattr(compiled, 'feature_importances_'):
+        arrays['feature_importances'] = np.asarray(compiled.feature_importances_, dtype=np.float64)
+
+    parent_dir = os.path.dirname(os.path.abspath(artifact_dir))
+    os.makedirs(parent_dir, exist_ok=True)
+    tmp_dir = f"{artifact_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    files = {}
+    for name, array in arrays.items():
+        file_name = f"{name}.npy"
+        file_path = os.path.join(tmp_dir, file_name)
+        np.save(file_path, np.ascontiguousarray(array), allow_pickle=False)
+        files[name] = {'file': file_name, 'sha256': _sha256(file_path)}
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'created': datetime.now().isoformat(),
+        'source': source,
+        'model_type': type(model_package['model']).__name__,
+        'version': model_package.get('version'),
+        'feature_names': list(model_package.get('feature_names') or FEATURE_ORDER),
+        'feature_order': normalize_feature_order(model_package.get('feature_order')),
+        'n_features': compiled.n_features_in_,
+        'n_estimators': compiled.n_estimators,
+        'max_depth': compiled.max_depth,
+        'metadata': model_package.get('metadata') or {},
+        'files': files
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the new artifact in place of the old one
+    old_dir = f"{artifact_dir}.old-{os.getpid()}"
+    if os.path.exists(artifact_dir):
+        os.rename(artifact_dir, old_dir)
+    os.rename(tmp_dir, artifact_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return artifact_dir
+
+
+def read_manifest(artifact_dir=None):
+    """Read and check an artifact manifest. Raises ValueError on unknown formats."""
+    artifact_dir = artifact_dir or get_artifact_dir()
+    with open(os.path.join(artifact_dir, MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"Not a model artifact: {artifact_dir}")
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {manifest.get('format_version')}")
+    return manifest
+
+
+def load_model_artifact(artifact_dir=None, mmap_mode='r', verify=True):
+    """
+    Load an artifact directory as a model package.
+
+    Args:
+        artifact_dir (str): Artifact directory, defaults to data/model_artifact
+        mmap_mode (str): Passed to np.load; 'r' shares pages between processes,
+            None reads the arrays into private memory
+        verify (bool): Check every array file against its manifest checksum;
+            only skip this for an artifact that was just verified
+
+    Returns:
+        dict: A model package in the same shape load_model() returns, with a
+            CompiledForest as both 'model' and 'compiled_model'.
+    """
+    artifact_dir = artifact_dir or get_artifact_dir()
+    manifest = read_manifest(artifact_dir)
+
+    arrays = {}
+    for name, entry in manifest['files'].items():
+        file_path = os.path.join(artifact_dir, entry['file'])
+        if verify and _sha256(file_path) != entry['sha256']:
+            raise ValueError(f"Checksum mismatch for {entry['file']} in {artifact_dir}")
+        arrays[name] = np.load(file_path, mmap_mode=mmap_mode, allow_pickle=False)
+
+    compiled = CompiledForest(
+        feature=arrays['feature'],
+        threshold=arrays['threshold'],
+        children=arrays['children'],
+        value=arrays['value'],
+        roots=arrays['roots'],
+        max_depth=manifest['max_depth'],
+        classes=arrays['classes'],
+        n_features=manifest['n_features'],
+        feature_importances=arrays.get('feature_importances'),
+        is_leaf=arrays['is_leaf']
+    )
+
+    scaler = None
+    if 'scaler_mean' in arrays:
+        scaler = ArrayScaler(arrays['scaler_mean'], arrays['scaler_scale'])
+
+    return {
+        'model': compiled,
+        'compiled_model': compiled,
+        'scaler': scaler,
+        'feature_names': manifest['feature_names'],
+        'feature_order': normalize_feature_order(manifest['feature_order']),
+        'model_type': manifest.get('model_type'),
+        'version': manifest.get('version'),
+        'metadata': dict(manifest.get('metadata') or {}, version=manifest.get('version')),
+        'artifact_manifest': manifest
+    }
+
+
+def convert_pickle_to_artifact(model_path, artifact_dir=None, scaler_path=None):
+    """
+    Convert a pickled model bundle into an artifact.
+
+    The bundle is assembled by utils/model_registry.py, so checksums are
+    verified and the scaler is chosen the same way load_model() chooses it.
+    scaler_path overrides the scaler of a bare estimator.
+    """
+    bundle = discover_bundle(model_path)
+    if scaler_path and os.path.exists(scaler_path) and not bundle['manifest_path']:
+        bundle['scaler_path'] = scaler_path
+    model_package = load_bundle(bundle)
+
+    return save_model_artifact(model_package, artifact_dir, source=os.path.basename(model_path))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Convert a pickled model into a memory-mappable artifact")
+    parser.add_argument('--model', default=os.path.join(base_path, 'data', 'learning_difficulty_detector.pkl'))
+    parser.add_argument('--scaler', default=None, help="Scaler pickle for a bare estimator without a bundle manifest")
+    parser.add_argument('--output', default=get_artifact_dir())
+    args = parser.parse_args()
+
+    output_dir = convert_pickle_to_artifact(args.model, args.output, args.scaler)
+    print(f"Model artifact written to {output_dir}")
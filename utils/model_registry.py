@@ -0,0 +1,412 @@
+"""
+Model bundle registry.
+
+A bundle is the model pickle, its StandardScaler pickle, the held-out test
+split the model was evaluated on (test_split.npz, written by
+utils/train_model.py) and a small JSON manifest (data/model_bundle.json)
+recording the bundle version, the feature order the model was trained with
+and a SHA-256 checksum for every file.
+The registry discovers the bundle next to a model file, verifies the
+checksums and assembles the model package used by utils/model_utils.py.
+
+Register the shipped files (or a newly trained model) with
+``python -m utils.model_registry``. The manifest is generated on each
+install and is not kept in version control; without it the bundle is
+inferred from the file names and loaded unverified.
+"""
+
+import os
+import json
+import time
+import pickle
+import hashlib
+from datetime import datetime
+import numpy as np
+
+BUNDLE_MANIFEST_FILE = 'model_bundle.json'
+USER_MODEL_FILE = 'learning_difficulty_detector.pkl'
+DEFAULT_SCALER_FILE = 'scaler.pkl'
+TEST_SPLIT_FILE = 'test_split.npz'
+
+# Canonical feature names used throughout the app, in default model order
+FEATURE_ORDER = ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy']
+
+# Inclusive valid range for every model input
+FEATURE_RANGES = {
+    'math_score': (0, 100),
+    'reading_score': (0, 100),
+    'writing_score': (0, 100),
+    'attendance': (0, 100),
+    'behavior': (1, 5),
+    'literacy': (1, 10)
+}
+
+# Column names used by the training notebook, mapped to the app's names
+FEATURE_ALIASES = {
+    'math_score': 'math_score',
+    'reading_score': 'reading_score',
+    'writing_score': 'writing_score',
+    'attendance': 'attendance',
+    'attendance_rate': 'attendance',
+    'behavior': 'behavior',
+    'behavior_score': 'behavior',
+    'literacy': 'literacy',
+    'literacy_level': 'literacy'
+}
+
+
+class BundleChecksumError(ValueError):
+    """Raised when a bundle file does not match the checksum in its manifest"""
+
+
+def _sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_feature_order(feature_order):
+    """Map notebook column names (e.g. 'Attendance_Rate') to the app's feature names"""
+    if not feature_order:
+        return list(FEATURE_ORDER)
+    normalized = []
+    for name in feature_order:
+        key = str(name).strip().lower().replace(' ', '_')
+        if key not in FEATURE_ALIASES:
+            raise ValueError(f"Unknown model feature: {name}")
+        normalized.append(FEATURE_ALIASES[key])
+    return normalized
+
+
+def discover_bundle(model_path):
+    """
+    Describe the bundle a model file belongs to.
+
+    If a manifest next to the model lists this model file, its scaler,
+    version, feature order and checksums are used. Otherwise the bundle is
+    inferred from the conventional file names and is left unverified; only
+    the user's trained model is paired with the conventional scaler.pkl.
+
+    Returns:
+        dict: model_path, scaler_path, test_split_path, manifest_path, version,
+            feature_order, checksums
+    """
+    data_dir = os.path.dirname(model_path)
+    manifest_path = os.path.join(data_dir, BUNDLE_MANIFEST_FILE)
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('model_file') == os.path.basename(model_path):
+            scaler_file = manifest.get('scaler_file')
+            test_split_file = manifest.get('test_split_file')
+            return {
+                'model_path': model_path,
+                'scaler_path': os.path.join(data_dir, scaler_file) if scaler_file else None,
+                'test_split_path': os.path.join(data_dir, test_split_file) if test_split_file else None,
+                'manifest_path': manifest_path,
+                'version': manifest.get('version'),
+                'feature_order': manifest.get('feature_order'),
+                'checksums': manifest.get('checksums', {}),
+                'metadata': manifest.get('metadata', {})
+            }
+
+    scaler_path = os.path.join(data_dir, DEFAULT_SCALER_FILE)
+    test_split_path = os.path.join(data_dir, TEST_SPLIT_FILE)
+    is_user_model = os.path.basename(model_path) == USER_MODEL_FILE
+    return {
+        'model_path': model_path,
+        'scaler_path': scaler_path if is_user_model and os.path.exists(scaler_path) else None,
+        'test_split_path': test_split_path if is_user_model and os.path.exists(test_split_path) else None,
+        'manifest_path': None,
+        'version': None,
+        'feature_order': None,
+        'checksums': {},
+        'metadata': {}
+    }
+
+
+def get_bundle_files(bundle):
+    """List every file whose change should cause the bundle to be reloaded"""
+    return [path for path in (bundle['model_path'], bundle['scaler_path'], bundle.get('test_split_path'),
+                              bundle['manifest_path']) if path]
+
+
+def verify_bundle(bundle):
+    """Check bundle files against the manifest checksums. Raises BundleChecksumError."""
+    for path in (bundle['model_path'], bundle['scaler_path'], bundle.get('test_split_path')):
+        if not path:
+            continue
+        expected = bundle['checksums'].get(os.path.basename(path))
+        if expected is None:
+            if bundle['manifest_path']:
+                raise BundleChecksumError(f"No checksum recorded for {os.path.basename(path)}")
+            continue
+        if _sha256(path) != expected:
+            raise BundleChecksumError(f"Checksum mismatch for {os.path.basename(path)}")
+
+
+def _scalers_match(scaler_a, scaler_b):
+    """True if two fitted scalers apply the same transform"""
+    try:
+        return (np.allclose(scaler_a.mean_, scaler_b.mean_) and
+                np.allclose(scaler_a.scale_, scaler_b.scale_))
+    except (AttributeError, ValueError, TypeError):
+        return False
+
+
+def load_bundle(bundle):
+    """
+    Verify and assemble a bundle into a model package.
+
+    A scaler embedded in the model pickle always wins, because it is the one
+    the model was fitted with; the standalone scaler is used for bare
+    estimators. A disagreeing standalone scaler is flagged in the metadata,
+    and reported if the manifest registered it.
+
+    Returns:
+        dict: model package with 'model', 'scaler', 'feature_names',
+            'feature_order' and a 'metadata' dict describing the bundle.
+    """
+    start_time = time.perf_counter()
+    verify_bundle(bundle)
+
+    with open(bundle['model_path'], 'rb') as f:
+        loaded = pickle.load(f)
+
+    if isinstance(loaded, dict) and 'model' in loaded:
+        model_package = dict(loaded)
+    else:
+        model_package = {'model': loaded, 'scaler': None}
+
+    standalone_scaler = None
+    if bundle['scaler_path'] and os.path.exists(bundle['scaler_path']):
+        with open(bundle['scaler_path'], 'rb') as f:
+            standalone_scaler = pickle.load(f)
+
+    model = model_package['model']
+    scaler_mismatch = False
+    if model_package.get('scaler') is not None:
+        scaler_source = 'embedded'
+        if standalone_scaler is not None and not _scalers_match(model_package['scaler'], standalone_scaler):
+            scaler_mismatch = True
+            # Only a manifest that registered both files is inconsistent; a
+            # conventional scaler.pkl next to an unregistered model is just unused
+            if bundle['manifest_path']:
+                print(f"Warning: {os.path.basename(bundle['scaler_path'])} does not match the scaler embedded "
+                      f"in {os.path.basename(bundle['model_path'])}; using the embedded scaler")
+    elif standalone_scaler is not None:
+        if getattr(standalone_scaler, 'n_features_in_', None) != getattr(model, 'n_features_in_', None):
+            raise ValueError(f"{os.path.basename(bundle['scaler_path'])} does not fit the model's feature count")
+        model_package['scaler'] = standalone_scaler
+        scaler_source = os.path.basename(bundle['scaler_path'])
+    else:
+        scaler_source = None
+
+    source_feature_order = bundle['feature_order'] or model_package.get('feature_order')
+    feature_order = normalize_feature_order(source_feature_order)
+    if len(feature_order) != getattr(model, 'n_features_in_', len(feature_order)):
+        raise ValueError("Bundle feature order does not match the model's feature count")
+
+    model_package['feature_order'] = feature_order
+    model_package['feature_names'] = list(source_feature_order or feature_order)
+    # Read by load_test_split() when permutation importance is computed later
+    model_package['test_split_path'] = bundle.get('test_split_path')
+    model_package['metadata'] = {
+        **bundle['metadata'],
+        'version': bundle['version'] or model_package.get('version'),
+        'model_file': os.path.basename(bundle['model_path']),
+        'scaler_source': scaler_source,
+        'scaler_mismatch': scaler_mismatch,
+        'verified': bool(bundle['manifest_path']),
+        'checksums': dict(bundle['checksums']),
+        'feature_order': feature_order,
+        'loaded_at': datetime.now().isoformat(),
+        'load_seconds': time.perf_counter() - start_time
+    }
+    return model_package
+
+
+def compute_feature_importances(model, feature_order):
+    """Impurity-based importances keyed by feature name, or None if the model has none"""
+    importances = getattr(model, 'feature_importances_', None)
+    if importances is None:
+        return None
+    return {feature: float(value) for feature, value in zip(feature_order, importances)}
+
+
+def compute_permutation_importance(model, X, y, feature_order, n_repeats=5, random_state=42):
+    """
+    Mean and std of the accuracy drop when each feature column is shuffled.
+
+    All shuffled copies are scored with a single predict() call, so this
+    works with any predictor (sklearn model or CompiledForest).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    rng = np.random.default_rng(random_state)
+
+    shuffled = []
+    for col in range(X.shape[1]):
+        for _ in range(n_repeats):
+            X_perm = X.copy()
+            X_perm[:, col] = rng.permutation(X_perm[:, col])
+            shuffled.append(X_perm)
+
+    baseline = np.mean(model.predict(X) == y)
+    predictions = np.asarray(model.predict(np.concatenate(shuffled))).reshape(X.shape[1], n_repeats, len(X))
+    drops = baseline - (predictions == y).mean(axis=2)
+
+    return {
+        feature: {'mean': float(drops[col].mean()), 'std': float(drops[col].std())}
+        for col, feature in enumerate(feature_order)
+    }
+
+
+def save_test_split(path, X, y):
+    """Write a held-out split (X as the model sees it, i.e. already scaled) for later importance runs"""
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, X=np.asarray(X, dtype=np.float64), y=np.asarray(y))
+    os.replace(tmp_path, path)
+
+
+def load_test_split(model_package, n_samples=500, random_state=42):
+    """
+    Held-out data for permutation importance.
+
+    Returns the bundle's stored test split when it has one. Otherwise falls
+    back to synthetic_holdout(), whose labels come from the model itself.
+
+    Returns:
+        tuple: (X, y, source) with source 'test_split' or 'synthetic'
+    """
+    test_split_path = model_package.get('test_split_path')
+    if test_split_path and os.path.exists(test_split_path):
+        with np.load(test_split_path) as split:
+            return split['X'], split['y'], 'test_split'
+    X, y = synthetic_holdout(model_package, n_samples, random_state)
+    return X, y, 'synthetic'
+
+
+def synthetic_holdout(model_package, n_samples=500, random_state=42):
+    """
+    Sample inputs uniformly over the valid feature ranges, labelled by the model.
+
+    Only a fallback for bundles without a stored test split: the permutation
+    importance then measures how much the model relies on each feature, not
+    how much each feature contributes to correct predictions.
+
+    Returns:
+        tuple: (X, y) with X already scaled for the model
+    """
+    rng = np.random.default_rng(random_state)
+    feature_order = model_package.get('feature_order') or FEATURE_ORDER
+    X = np.column_stack([rng.uniform(*FEATURE_RANGES[feature], size=n_samples) for feature in feature_order])
+    scaler = model_package.get('scaler')
+    if scaler is not None:
+        X = scaler.transform(X)
+    return X, np.asarray(model_package['model'].predict(X))
+
+
+def write_bundle_manifest(model_path, scaler_path=None, version=None, feature_order=None, metadata=None,
+                          test_split_path=None):
+    """
+    Register a model (and optional scaler and test split) as a bundle by writing its manifest.
+
+    Returns the manifest path.
+    """
+    data_dir = os.path.dirname(os.path.abspath(model_path))
+    checksums = {os.path.basename(model_path): _sha256(model_path)}
+    for path in (scaler_path, test_split_path):
+        if path:
+            checksums[os.path.basename(path)] = _sha256(path)
+
+    manifest = {
+        'version': version,
+        'created': datetime.now().isoformat(),
+        'model_file': os.path.basename(model_path),
+        'scaler_file': os.path.basename(scaler_path) if scaler_path else None,
+        'test_split_file': os.path.basename(test_split_path) if test_split_path else None,
+        'feature_order': normalize_feature_order(feature_order),
+        'checksums': checksums,
+        'metadata': metadata or {}
+    }
+
+    manifest_path = os.path.join(data_dir, BUNDLE_MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+
+def register_bundle(model_path, scaler_path=None, version=None, holdout_path=None, label_column='Risk_Label'):
+    """
+    Register a model as a bundle: load it, compute its importances and write the manifest.
+
+    The standalone scaler is registered only for bare estimators. A model
+    pickle that embeds its scaler is registered alone, so a stale scaler.pkl
+    next to it is never paired with the model. Permutation importance uses
+    the holdout CSV if given, else the test split stored by the training CLI,
+    and a synthetic model-labelled sample only when neither exists.
+
+    Returns:
+        str: The manifest path
+    """
+    if scaler_path and not os.path.exists(scaler_path):
+        scaler_path = None
+    bundle = discover_bundle(model_path)
+    bundle.update({'scaler_path': scaler_path, 'manifest_path': None, 'checksums': {}})
+    package = load_bundle(bundle)
+    if package['metadata']['scaler_source'] == 'embedded' and scaler_path:
+        print(f"{os.path.basename(model_path)} embeds its scaler; not registering {os.path.basename(scaler_path)}")
+        scaler_path = None
+
+    if holdout_path:
+        import pandas as pd
+        holdout = pd.read_csv(holdout_path)
+        X_holdout = holdout.drop(columns=[label_column]).to_numpy(dtype=float)
+        y_holdout = holdout[label_column].to_numpy()
+        holdout_source = os.path.basename(holdout_path)
+    else:
+        X_holdout, y_holdout, holdout_source = load_test_split(package)
+        if holdout_source == 'synthetic':
+            print("No test split stored with the model; permutation importance uses a synthetic, "
+                  "model-labelled sample")
+
+    metadata = {
+        'feature_importances': compute_feature_importances(package['model'], package['feature_order']),
+        'permutation_importance': compute_permutation_importance(
+            package['model'], X_holdout, y_holdout, package['feature_order']),
+        'permutation_importance_source': holdout_source
+    }
+
+    test_split_path = package['test_split_path']
+    if test_split_path and not os.path.exists(test_split_path):
+        test_split_path = None
+    return write_bundle_manifest(
+        model_path, scaler_path,
+        version=version or package['metadata']['version'],
+        feature_order=package['feature_order'],
+        metadata=metadata,
+        test_split_path=test_split_path
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Register a model and scaler as a checksummed bundle")
+    parser.add_argument('--model', default=os.path.join(base_path, 'data', USER_MODEL_FILE))
+    parser.add_argument('--scaler', default=os.path.join(base_path, 'data', DEFAULT_SCALER_FILE))
+    parser.add_argument('--version', default=None)
+    parser.add_argument('--holdout', default=None,
+                        help="Labelled CSV (scaled model inputs + label column) for permutation importance")
+    parser.add_argument('--label-column', default='Risk_Label')
+    args = parser.parse_args()
+
+    manifest_path = register_bundle(args.model, args.scaler, args.version, args.holdout, args.label_column)
+    print(f"Bundle manifest written to {manifest_path}")
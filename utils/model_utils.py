@@ -1,33 +1,65 @@
+import time
 import pickle
+import hashlib
+import threading
+from datetime import datetime
+from collections import OrderedDict
 import numpy as np
+import pandas as pd
 import os
 import sys
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
+from utils.forest_engine import compile_forest
+from utils.model_artifact import MANIFEST_FILE, load_model_artifact
+from utils.model_registry import (
+    BUNDLE_MANIFEST_FILE, DEFAULT_SCALER_FILE, FEATURE_ORDER, FEATURE_RANGES, discover_bundle, load_bundle,
+    compute_feature_importances, compute_permutation_importance, load_test_split
+)
 import warnings
 warnings.filterwarnings('ignore')
 
-def get_model_path():
-    """Get the correct path for the model file"""
+def _get_base_path():
+    """Get the application root directory"""
     if getattr(sys, 'frozen', False):
         # Running as compiled executable
-        base_path = sys._MEIPASS
-    else:
-        # Running as script
-        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return sys._MEIPASS
+    # Running as script
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def get_sample_model_path():
+    """Get the path where the fallback sample model is persisted"""
+    return os.path.join(_get_base_path(), 'data', 'sample_model.pkl')
+
+def get_model_path(include_artifact=True):
+    """
+    Get the correct path for the model file
+    
+    A memory-mappable artifact (data/model_artifact/manifest.json, see
+    utils/model_artifact.py) is preferred unless the user's pickle is newer.
+    """
+    base_path = _get_base_path()
     
     # Check for user's trained model first, then fall back to sample model
     user_model_path = os.path.join(base_path, 'data', 'learning_difficulty_detector.pkl')
-    sample_model_path = os.path.join(base_path, 'data', 'sample_model.pkl')
+    sample_model_path = get_sample_model_path()
+    
+    artifact_manifest_path = os.path.join(base_path, 'data', 'model_artifact', MANIFEST_FILE)
+    
+    if include_artifact and os.path.exists(artifact_manifest_path):
+        if not os.path.exists(user_model_path) or os.path.getmtime(user_model_path) <= os.path.getmtime(artifact_manifest_path):
+            return artifact_manifest_path
     
     if os.path.exists(user_model_path) and os.path.getsize(user_model_path) > 100:
         return user_model_path
     else:
         return sample_model_path
 
-def create_sample_model():
-    """Create a sample model for demonstration purposes"""
+def create_sample_model(n_jobs=-1):
+    """Create a sample model for demonstration purposes, training trees on n_jobs cores"""
+    # Imported here so serving a model artifact never pays for importing sklearn
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score
+    
     # Generate synthetic training data
     np.random.seed(42)
     n_samples = 1000
@@ -63,7 +95,7 @@ def create_sample_model():
     # Train the model
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
     model.fit(X_train, y_train)
     
     # Test accuracy
@@ -73,57 +105,388 @@ def create_sample_model():
     
     return model
 
+# Process-wide model cache shared by every Streamlit session.
+# The state tuple is (sources_signature, sources_hash, model_package) and is
+# replaced as a whole, so readers never observe a half-swapped model.
+_model_state = (None, None, None)
+_model_lock = threading.Lock()
+
+# Serve single students and small batches from the compiled flat-array forest
+# (see utils/forest_engine.py); above this size sklearn's own traversal is faster
+USE_COMPILED_FOREST = os.environ.get('EDUSCAN_COMPILED_FOREST', '1') != '0'
+COMPILED_FOREST_MAX_ROWS = 256
+
+# When no usable model file exists, a fallback sample model is trained once by
+# warm_up_model() in a background thread. Requests never train unless this flag
+# is set (useful for scripts); while it trains they get ModelNotReadyError and
+# make_prediction() answers with its rule-based estimate. A warmup that only
+# loads an existing model file is waited for instead.
+TRAIN_ON_REQUEST = os.environ.get('EDUSCAN_TRAIN_ON_REQUEST', '0') == '1'
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when no model can be served yet (fallback training still pending)"""
+
+# A failed warmup is retried by the next warm_up_model() call (load_model()
+# makes one whenever no model can be served), after a delay that doubles with
+# each consecutive failure
+WARMUP_RETRY_BASE = float(os.environ.get('EDUSCAN_WARMUP_RETRY_BASE', '5'))
+WARMUP_RETRY_MAX = float(os.environ.get('EDUSCAN_WARMUP_RETRY_MAX', '300'))
+
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+_warmup_status = {'succeeded': False, 'training': False, 'failures': 0, 'retry_at': 0.0}
+
+def _get_source_paths(model_path):
+    """Files whose changes require the model package to be reloaded"""
+    if os.path.basename(model_path) == MANIFEST_FILE:
+        return [model_path]
+    data_dir = os.path.dirname(model_path)
+    return [model_path, os.path.join(data_dir, BUNDLE_MANIFEST_FILE), os.path.join(data_dir, DEFAULT_SCALER_FILE)]
+
+def _get_file_signature(file_path):
+    """Return a cheap (path, mtime, size) signature for a file, or None if missing"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (file_path, stat.st_mtime_ns, stat.st_size)
+
+def _get_sources_signature(source_paths):
+    """Signature of all source files, or None if the model file itself is missing"""
+    signature = tuple(_get_file_signature(path) for path in source_paths)
+    return signature if signature[0] is not None else None
+
+def _hash_files(file_paths):
+    """Return one SHA-256 hex digest over the contents of all existing files"""
+    digest = hashlib.sha256()
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            continue
+        digest.update(os.path.basename(file_path).encode())
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
 def load_model():
-    """Load the learning difficulty prediction model"""
+    """
+    Load the learning difficulty prediction model.
+    
+    The package is loaded once per server process and shared by all sessions.
+    A changed mtime/size on any bundle file triggers a hash check, and the new
+    model is swapped in only when the file contents actually changed.
+    """
     model_path = get_model_path()
+    source_paths = _get_source_paths(model_path)
+    signature = _get_sources_signature(source_paths)
+    
+    cached_signature, cached_hash, cached_package = _model_state
+    if cached_package is not None and signature is not None and signature == cached_signature:
+        return cached_package
+    
+    if cached_package is None and _warmup_status['training']:
+        raise ModelNotReadyError("The fallback model is still being trained in the background")
+    
+    # Blocks while the warmup thread is loading, then returns what it loaded
+    with _model_lock:
+        try:
+            return _reload_model_locked(model_path, source_paths, signature)
+        except ModelNotReadyError:
+            if not TRAIN_ON_REQUEST:
+                warm_up_model()
+                raise
+    
+    # Only reached with TRAIN_ON_REQUEST: train synchronously, then load again
+    _train_fallback_model()
+    return load_model()
+
+def _reload_model_locked(model_path, source_paths, signature):
+    """Reload the model package into the cache. Caller must hold _model_lock."""
+    global _model_state
+    
+    # Another session may have reloaded while we waited for the lock
+    cached_signature, cached_hash, cached_package = _model_state
+    if cached_package is not None and signature is not None and signature == cached_signature:
+        return cached_package
+    
+    sources_hash = None
+    if signature is not None:
+        try:
+            sources_hash = _hash_files(source_paths)
+        except OSError:
+            sources_hash = None
+    
+    if cached_package is not None and sources_hash is not None and sources_hash == cached_hash:
+        # Files were touched but not modified; keep the loaded model
+        _model_state = (signature, cached_hash, cached_package)
+        return cached_package
     
+    model_package = _load_model_from_disk(model_path)
+    _attach_compiled_model(model_package)
+    _attach_importances(model_package)
+    
+    # Files may have changed while loading, so re-read their identity
+    new_signature = _get_sources_signature(source_paths)
+    if new_signature != signature:
+        try:
+            sources_hash = _hash_files(source_paths) if new_signature else None
+        except OSError:
+            sources_hash = None
+    # The package carries its own version, so results computed with it are
+    # never attributed to a model swapped in meanwhile
+    model_package['model_version'] = sources_hash[:12] if sources_hash else None
+    _model_state = (new_signature, sources_hash, model_package)
+    return model_package
+
+def _attach_compiled_model(model_package):
+    """Compile the package's forest for fast inference, if possible"""
+    if model_package.get('compiled_model') is not None:
+        # Artifacts are already stored in compiled form
+        return
+    model_package['compiled_model'] = None
+    if not USE_COMPILED_FOREST:
+        return
     try:
-        if os.path.exists(model_path):
-            with open(model_path, 'rb') as f:
-                model_package = pickle.load(f)
-            
-            # Handle both old format (just model) and new format (package with scaler)
-            if isinstance(model_package, dict) and 'model' in model_package:
-                print(f"User's trained model loaded from {model_path}")
-                return model_package
-            else:
-                # Legacy format - wrap in package format
-                return {
-                    'model': model_package,
-                    'scaler': None,
-                    'feature_names': ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy'],
-                    'feature_order': ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy']
-                }
-        else:
-            # Create and save sample model if none exists
-            print("No model found, creating sample model...")
-            model = create_sample_model()
-            
-            # Ensure data directory exists
-            os.makedirs(os.path.dirname(model_path), exist_ok=True)
-            
-            # Save the model
-            with open(model_path, 'wb') as f:
-                pickle.dump(model, f)
-            
-            return {
-                'model': model,
-                'scaler': None,
-                'feature_names': ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy'],
-                'feature_order': ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy']
-            }
+        model_package['compiled_model'] = compile_forest(model_package['model'])
+    except Exception as e:
+        print(f"Could not compile model, using sklearn inference: {e}")
+
+def _attach_importances(model_package):
+    """
+    Store feature importances in the package metadata at load time.
+    
+    Impurity importances are read once from the model. Permutation importance
+    comes from the bundle manifest when it was computed at registration;
+    otherwise it is computed in a background thread on the bundle's stored
+    test split (or, lacking one, a synthetic model-labelled sample, recorded
+    as permutation_importance_source 'synthetic') and appears in the
+    metadata when done.
+    """
+    metadata = model_package.setdefault('metadata', {})
+    feature_order = model_package.get('feature_order') or FEATURE_ORDER
+    if not metadata.get('feature_importances'):
+        metadata['feature_importances'] = compute_feature_importances(model_package['model'], feature_order)
+    
+    if metadata.get('permutation_importance'):
+        return
     
+    def _compute():
+        try:
+            predictor = model_package.get('compiled_model') or model_package['model']
+            X_holdout, y_holdout, source = load_test_split(model_package)
+            metadata['permutation_importance'] = compute_permutation_importance(predictor, X_holdout, y_holdout, feature_order)
+            metadata['permutation_importance_source'] = source
+        except Exception as e:
+            print(f"Error computing permutation importance: {e}")
+    
+    threading.Thread(target=_compute, name='permutation-importance', daemon=True).start()
+
+def _get_predictor(model_package, n_rows):
+    """Pick the compiled forest for small inputs, the sklearn model otherwise"""
+    compiled_model = model_package.get('compiled_model')
+    if compiled_model is not None and n_rows <= COMPILED_FOREST_MAX_ROWS:
+        return compiled_model
+    return model_package['model']
+
+def warm_up_model(wait=False):
+    """
+    Load the model once per process in a background thread.
+    
+    Call this at server start. If no usable model file exists, the fallback
+    sample model is trained (in parallel) and persisted here, so that no user
+    request ever blocks on training. A failed warmup is started again by a
+    later call once its backoff delay (WARMUP_RETRY_BASE seconds, doubling
+    per consecutive failure up to WARMUP_RETRY_MAX) has passed.
+    
+    Args:
+        wait (bool): Block until the warmup has finished
+    
+    Returns:
+        threading.Thread: The warmup thread
+    """
+    global _warmup_thread
+    with _warmup_lock:
+        # Run once per process; a finished successful warmup may run again if
+        # the model files disappeared afterwards, a failed one after its backoff
+        finished = _warmup_thread is not None and not _warmup_thread.is_alive()
+        restart = finished and (_warmup_status['succeeded'] or time.monotonic() >= _warmup_status['retry_at'])
+        if _warmup_thread is None or restart:
+            _warmup_status['succeeded'] = False
+            _warmup_thread = threading.Thread(target=_run_warmup, name='model-warmup', daemon=True)
+            _warmup_thread.start()
+        thread = _warmup_thread
+    if wait:
+        thread.join()
+    return thread
+
+def is_model_warming_up():
+    """True while the background warmup is still running"""
+    thread = _warmup_thread
+    return thread is not None and thread.is_alive() and thread is not threading.current_thread()
+
+def is_model_ready():
+    """True once a model package is loaded and cached"""
+    return _model_state[2] is not None
+
+def _run_warmup():
+    """Body of the warmup thread: load the model, training the fallback if needed"""
+    try:
+        try:
+            load_model()
+        except ModelNotReadyError:
+            _warmup_status['training'] = True
+            try:
+                _train_fallback_model()
+            finally:
+                _warmup_status['training'] = False
+            load_model()
+        _warmup_status['succeeded'] = True
+        _warmup_status['failures'] = 0
+        print("Model warmup complete")
     except Exception as e:
-        print(f"Error loading model: {e}")
-        # Fall back to creating a new sample model
-        sample_model = create_sample_model()
+        _warmup_status['failures'] += 1
+        delay = min(WARMUP_RETRY_BASE * 2 ** (_warmup_status['failures'] - 1), WARMUP_RETRY_MAX)
+        _warmup_status['retry_at'] = time.monotonic() + delay
+        print(f"Model warmup failed, retrying in {delay:.0f}s at the earliest: {e}")
+
+def _train_fallback_model():
+    """Train the sample model and persist it so it is never trained again"""
+    print("No usable model found, training sample model...")
+    model = create_sample_model()
+    
+    sample_model_path = get_sample_model_path()
+    os.makedirs(os.path.dirname(sample_model_path), exist_ok=True)
+    
+    # Write atomically so a concurrent reader never sees a partial pickle
+    tmp_path = f"{sample_model_path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model, f)
+    os.replace(tmp_path, sample_model_path)
+    return model
+
+def get_model_version():
+    """Return a short identifier of the currently cached model (content hash)"""
+    model_package = _model_state[2]
+    return model_package.get('model_version') if model_package else None
+
+def clear_model_cache():
+    """Drop the cached model so the next load_model() call reads from disk"""
+    global _model_state
+    with _model_lock:
+        _model_state = (None, None, None)
+
+def _load_model_from_disk(model_path):
+    """Read and unpickle the model package from disk"""
+    if os.path.basename(model_path) == MANIFEST_FILE:
+        try:
+            model_package = load_model_artifact(os.path.dirname(model_path), verify=True)
+            print(f"Model artifact loaded from {os.path.dirname(model_path)}")
+            return model_package
+        except Exception as e:
+            print(f"Error loading model artifact: {e}")
+            model_path = get_model_path(include_artifact=False)
+    
+    if os.path.exists(model_path):
+        try:
+            # Model, scaler and manifest are verified and assembled as one bundle
+            model_package = load_bundle(discover_bundle(model_path))
+            print(f"Model bundle loaded from {model_path} (scaler: {model_package['metadata']['scaler_source']})")
+            return model_package
+        except Exception as e:
+            print(f"Error loading model: {e}")
+    
+    # No usable model: serve the persisted sample model if one was trained
+    sample_model_path = get_sample_model_path()
+    if os.path.exists(sample_model_path):
+        try:
+            with open(sample_model_path, 'rb') as f:
+                sample_model = pickle.load(f)
+            print(f"Using fallback sample model from {sample_model_path}")
+            return _wrap_sample_model(sample_model)
+        except Exception as e:
+            print(f"Error loading sample model: {e}")
+    
+    raise ModelNotReadyError("No usable model file; the fallback model has not been trained yet")
+
+def _wrap_sample_model(model):
+    """Wrap a bare sample model (trained on unscaled features) in package format"""
+    return {
+        'model': model,
+        'scaler': None,
+        'feature_names': list(FEATURE_ORDER),
+        'feature_order': list(FEATURE_ORDER),
+        'metadata': {
+            'version': 'sample',
+            'model_file': None,
+            'scaler_source': None,
+            'verified': False,
+            'feature_order': list(FEATURE_ORDER)
+        }
+    }
+
+# Bounded LRU cache of single-student predictions, keyed by model version and
+# the normalized feature tuple. Inputs are coarse (integer scores, 1-5 and 1-10
+# ratings), so Streamlit reruns hit it constantly.
+PREDICTION_CACHE_SIZE = 4096
+_prediction_cache = OrderedDict()
+_prediction_cache_lock = threading.Lock()
+_prediction_cache_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_prediction_cache_model = None
+
+def _prediction_cache_key(model_package, student_data):
+    """Build the cache key: (version of model_package, rounded feature values in canonical order)"""
+    model_version = model_package.get('model_version') or id(model_package)
+    return (model_version, tuple(round(float(student_data[feature]), 4) for feature in FEATURE_ORDER))
+
+def _prediction_cache_get(cache_key):
+    """Return a cached (prediction, probability) or None, dropping entries of older models"""
+    global _prediction_cache_model
+    with _prediction_cache_lock:
+        if cache_key[0] != _prediction_cache_model:
+            # The model was swapped; every cached result is stale
+            if _prediction_cache:
+                _prediction_cache_stats['invalidations'] += 1
+            _prediction_cache.clear()
+            _prediction_cache_model = cache_key[0]
+        
+        result = _prediction_cache.get(cache_key)
+        if result is None:
+            _prediction_cache_stats['misses'] += 1
+            return None
+        _prediction_cache.move_to_end(cache_key)
+        _prediction_cache_stats['hits'] += 1
+        return result
+
+def _prediction_cache_put(cache_key, result):
+    """Store a prediction, evicting the least recently used entry when full"""
+    with _prediction_cache_lock:
+        if cache_key[0] != _prediction_cache_model:
+            return
+        _prediction_cache[cache_key] = result
+        _prediction_cache.move_to_end(cache_key)
+        while len(_prediction_cache) > PREDICTION_CACHE_SIZE:
+            _prediction_cache.popitem(last=False)
+
+def get_prediction_cache_stats():
+    """Return hit/miss counters and the current size of the prediction cache"""
+    with _prediction_cache_lock:
+        lookups = _prediction_cache_stats['hits'] + _prediction_cache_stats['misses']
         return {
-            'model': sample_model,
-            'scaler': None,
-            'feature_names': ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy'],
-            'feature_order': ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy']
+            **_prediction_cache_stats,
+            'size': len(_prediction_cache),
+            'max_size': PREDICTION_CACHE_SIZE,
+            'hit_rate': _prediction_cache_stats['hits'] / lookups if lookups else 0.0
         }
 
+def clear_prediction_cache():
+    """Empty the prediction cache and reset its counters"""
+    global _prediction_cache_model
+    with _prediction_cache_lock:
+        _prediction_cache.clear()
+        _prediction_cache_model = None
+        for key in _prediction_cache_stats:
+            _prediction_cache_stats[key] = 0
+
 def make_prediction(student_data):
     """
     Make a prediction for a student based on their data
@@ -142,31 +505,34 @@ def make_prediction(student_data):
     """
     try:
         model_package = load_model()
-        model = model_package['model']
+        
+        # Identical inputs against the same model are served from the LRU cache
+        cache_key = _prediction_cache_key(model_package, student_data)
+        cached_result = _prediction_cache_get(cache_key)
+        if cached_result is not None:
+            return cached_result
+        
+        model = _get_predictor(model_package, 1)
         scaler = model_package.get('scaler')
         
-        # Prepare input features in the correct order
-        features = np.array([[
-            student_data['math_score'],
-            student_data['reading_score'],
-            student_data['writing_score'],
-            student_data['attendance'],
-            student_data['behavior'],
-            student_data['literacy']
-        ]])
+        # Prepare input features in the order the model was trained with
+        feature_order = model_package.get('feature_order') or FEATURE_ORDER
+        features = np.array([[student_data[feature] for feature in feature_order]], dtype=float)
         
         # Apply scaling if the model uses StandardScaler (from user's notebook)
         if scaler is not None:
             features = scaler.transform(features)
         
-        # Make prediction
-        prediction = model.predict(features)[0]
+        # Make prediction; predict() is the argmax of predict_proba()
         prediction_proba = model.predict_proba(features)[0]
+        prediction = model.classes_[prediction_proba.argmax()]
         
         # Get probability of positive class (learning difficulty risk)
         risk_probability = prediction_proba[1] if len(prediction_proba) > 1 else prediction_proba[0]
         
-        return int(prediction), float(risk_probability)
+        result = (int(prediction), float(risk_probability))
+        _prediction_cache_put(cache_key, result)
+        return result
     
     except Exception as e:
         print(f"Error making prediction: {e}")
@@ -190,37 +556,210 @@ def make_prediction(student_data):
         
         return prediction, risk_probability
 
+# Model input columns accepted by make_predictions
+FEATURE_COLUMNS = list(FEATURE_ORDER)
+
+def get_risk_levels(probabilities):
+    """Map an array of risk probabilities to 'Low Risk'/'Medium Risk'/'High Risk' labels"""
+    probabilities = np.asarray(probabilities, dtype=float)
+    return np.select(
+        [probabilities < 0.3, probabilities < 0.7],
+        ['Low Risk', 'Medium Risk'],
+        default='High Risk'
+    )
+
+def _rule_based_probabilities(features):
+    """Vectorized version of the rule-based fallback used by make_prediction"""
+    academic_avg = features[:, 0:3].mean(axis=1)
+    risk_factors = (
+        (academic_avg < 70) * 2 +
+        (features[:, 3] < 80) +
+        (features[:, 4] < 3) +
+        (features[:, 5] < 5)
+    )
+    return np.minimum(risk_factors / 5.0, 1.0)
+
+def _get_explainer(model_package):
+    """Return a CompiledForest for tree contributions, compiling it once if needed"""
+    if model_package.get('compiled_model') is not None:
+        return model_package['compiled_model']
+    if 'explainer' not in model_package:
+        model_package['explainer'] = compile_forest(model_package['model'])
+    return model_package['explainer']
+
+def make_predictions(student_data, explain=False):
+    """
+    Make predictions for many students at once
+    
+    Args:
+        student_data (pd.DataFrame or array-like): Either a DataFrame with the
+            columns in FEATURE_COLUMNS (extra columns are kept) or a 2-D array
+            whose columns are in FEATURE_COLUMNS order.
+        explain (bool): Also attach per-feature tree path contributions to the
+            risk probability ('contribution_<feature>' columns, 'base_value'
+            and 'top_risk_factor'). Contributions plus base_value sum to the
+            probability.
+    
+    Returns:
+        pd.DataFrame: The input columns plus 'valid', 'validation_error',
+            'prediction', 'probability' and 'risk_level'. Rows that fail
+            validation have valid=False and NaN prediction/probability.
+    """
+    if isinstance(student_data, pd.DataFrame):
+        missing_columns = [col for col in FEATURE_COLUMNS if col not in student_data.columns]
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+        results = student_data.reset_index(drop=True).copy()
+        features = results[FEATURE_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    else:
+        features = np.asarray(student_data, dtype=float)
+        if features.ndim != 2 or features.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(f"Expected a 2-D array with {len(FEATURE_COLUMNS)} columns: {', '.join(FEATURE_COLUMNS)}")
+        results = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+    
+    # Validate every row in one pass
+    validation_error = np.full(len(features), '', dtype=object)
+    for col_idx, col in reversed(list(enumerate(FEATURE_COLUMNS))):
+        low, high = FEATURE_RANGES[col]
+        column = features[:, col_idx]
+        validation_error[np.isnan(column)] = f"{col} is missing or not numeric"
+        validation_error[(column < low) | (column > high)] = f"{col} must be between {low} and {high}"
+    valid = validation_error == ''
+    
+    probabilities = np.full(len(features), np.nan)
+    predictions = np.full(len(features), np.nan)
+    base_values = np.full(len(features), np.nan)
+    contributions = np.full((len(features), len(FEATURE_COLUMNS)), np.nan)
+    valid_features = features[valid]
+    
+    if len(valid_features):
+        try:
+            model_package = load_model()
+            model = _get_predictor(model_package, len(valid_features))
+            scaler = model_package.get('scaler')
+            
+            # Reorder columns to the order the model was trained with
+            feature_order = model_package.get('feature_order') or FEATURE_ORDER
+            model_input = valid_features[:, [FEATURE_COLUMNS.index(feature) for feature in feature_order]]
+            if scaler is not None:
+                model_input = scaler.transform(model_input)
+            
+            # A single predict_proba call; predict() is argmax over the same output
+            prediction_proba = model.predict_proba(model_input)
+            class_index = prediction_proba.argmax(axis=1)
+            predictions[valid] = np.asarray(model.classes_)[class_index]
+            risk_class = 1 if prediction_proba.shape[1] > 1 else 0
+            probabilities[valid] = prediction_proba[:, risk_class]
+            
+            if explain:
+                explainer = _get_explainer(model_package)
+                if explainer is not None:
+                    bias, model_contributions = explainer.explain(model_input, class_index=risk_class)
+                    base_values[valid] = bias
+                    # Back from model feature order to FEATURE_COLUMNS order
+                    contributions[np.ix_(valid, [feature_order.index(col) for col in FEATURE_COLUMNS])] = model_contributions
+        
+        except Exception as e:
+            print(f"Error making batch predictions: {e}")
+            fallback = _rule_based_probabilities(valid_features)
+            probabilities[valid] = fallback
+            predictions[valid] = (fallback > 0.5).astype(int)
+    
+    results['valid'] = valid
+    results['validation_error'] = validation_error
+    results['prediction'] = pd.array(predictions, dtype='Int64')
+    results['probability'] = probabilities
+    results['risk_level'] = np.where(valid, get_risk_levels(np.nan_to_num(probabilities)), None)
+    
+    if explain:
+        for col_idx, col in enumerate(FEATURE_COLUMNS):
+            results[f'contribution_{col}'] = contributions[:, col_idx]
+        results['base_value'] = base_values
+        explained = ~np.isnan(contributions).any(axis=1)
+        top_factor = np.asarray(FEATURE_COLUMNS, dtype=object)[np.nan_to_num(contributions, nan=-np.inf).argmax(axis=1)]
+        results['top_risk_factor'] = np.where(explained, top_factor, None)
+    return results
+
+def prediction_records(scored, timestamp=None):
+    """
+    Records to save for the valid rows of make_predictions() output, in the
+    shape of a single saved prediction. Optional student_name, grade_level
+    and notes columns of the upload are kept.
+    """
+    timestamp = timestamp or datetime.now().isoformat()
+    columns = [col for col in ('student_name', 'grade_level', 'notes') if col in scored.columns]
+    columns += ['prediction', 'probability', 'risk_level'] + FEATURE_COLUMNS
+    valid = scored.loc[scored['valid'], columns].astype(object)
+    # Python scalars (None for blanks), so the records serialize like the form's
+    rows = valid.where(valid.notna(), None).to_dict('records')
+    return [{'timestamp': timestamp, **row} for row in rows]
+
+def explain_prediction(student_data):
+    """
+    Explain a single student's risk probability
+    
+    Args:
+        student_data (dict): Same fields as make_prediction()
+    
+    Returns:
+        dict: {'base_value': float, 'contributions': {feature: float}} where
+            base_value plus all contributions equals the risk probability,
+            or None if the model cannot be explained.
+    """
+    row = make_predictions(pd.DataFrame([student_data]), explain=True).iloc[0]
+    if pd.isna(row['base_value']):
+        return None
+    return {
+        'base_value': float(row['base_value']),
+        'contributions': {col: float(row[f'contribution_{col}']) for col in FEATURE_COLUMNS}
+    }
+
+# Display names used by the dashboards, keyed by model feature
+FEATURE_DISPLAY_NAMES = {
+    'math_score': 'Math Score',
+    'reading_score': 'Reading Score',
+    'writing_score': 'Writing Score',
+    'attendance': 'Attendance',
+    'behavior': 'Behavior',
+    'literacy': 'Literacy'
+}
+
+DEFAULT_FEATURE_IMPORTANCE = {
+    'Math Score': 0.20,
+    'Reading Score': 0.25,
+    'Writing Score': 0.15,
+    'Attendance': 0.15,
+    'Behavior': 0.15,
+    'Literacy': 0.10
+}
+
 def get_feature_importance():
-    """Get feature importance from the model"""
+    """Get feature importance from the model metadata (computed once at load time)"""
     try:
-        model_package = load_model()
-        model = model_package['model']
-        
-        if hasattr(model, 'feature_importances_'):
-            feature_names = ['Math Score', 'Reading Score', 'Writing Score', 'Attendance', 'Behavior', 'Literacy']
-            importance_dict = dict(zip(feature_names, model.feature_importances_))
-            return importance_dict
-        else:
-            # Return default importance if model doesn't support it
-            return {
-                'Math Score': 0.20,
-                'Reading Score': 0.25,
-                'Writing Score': 0.15,
-                'Attendance': 0.15,
-                'Behavior': 0.15,
-                'Literacy': 0.10
-            }
+        importances = load_model()['metadata'].get('feature_importances')
+        if importances:
+            return {FEATURE_DISPLAY_NAMES[feature]: value for feature, value in importances.items()}
+        # Return default importance if model doesn't support it
+        return dict(DEFAULT_FEATURE_IMPORTANCE)
     
     except Exception as e:
         print(f"Error getting feature importance: {e}")
-        return {
-            'Math Score': 0.20,
-            'Reading Score': 0.25,
-            'Writing Score': 0.15,
-            'Attendance': 0.15,
-            'Behavior': 0.15,
-            'Literacy': 0.10
-        }
+        return dict(DEFAULT_FEATURE_IMPORTANCE)
+
+def get_permutation_importance():
+    """
+    Get permutation importance (mean accuracy drop per feature) from the model metadata
+    
+    Returns None while it is still being computed in the background.
+    """
+    try:
+        importances = load_model()['metadata'].get('permutation_importance')
+    except Exception as e:
+        print(f"Error getting permutation importance: {e}")
+        return None
+    if not importances:
+        return None
+    return {FEATURE_DISPLAY_NAMES[feature]: value['mean'] for feature, value in importances.items()}
 
 def validate_student_data(student_data):
     """Validate student data before making prediction"""
@@ -0,0 +1,133 @@
+"""
+Per-child observation index with pre-parsed dates.
+
+Observations are partitioned by child. Within a partition, dates are kept as
+a sorted list of ordinal integers (date.toordinal(), tie-broken by save
+order) alongside the records, so a start_date..end_date query is two
+bisects and a slice instead of parsing and comparing every observation on
+every render.
+
+utils/data_utils.py keeps one index in step with the cached journal records
+and answers query_parent_observations() from it.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+
+# Observations whose date cannot be parsed sort before every real date
+UNKNOWN_ORDINAL = 0
+
+
+def to_ordinal(value):
+    """Ordinal of a date, datetime or ISO date string; UNKNOWN_ORDINAL if it cannot be parsed"""
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except (TypeError, ValueError):
+        return UNKNOWN_ORDINAL
+
+
+# Partition keys combine the date and the record's position in the store:
+# ordinal << SEQUENCE_BITS | (sequence + SEQUENCE_OFFSET). Sorting by key
+# sorts by date, then by save order, and a key doubles as a pagination
+# cursor. The offset keeps the negative positions of archived records
+# (see utils/data_utils.py) from spilling into the date bits.
+SEQUENCE_BITS = 32
+SEQUENCE_OFFSET = 1 << (SEQUENCE_BITS - 1)
+
+
+def make_key(ordinal, sequence):
+    return (ordinal << SEQUENCE_BITS) | (sequence + SEQUENCE_OFFSET)
+
+
+def split_key(key):
+    """Key -> (date ordinal, sequence), the cursor form handed out to callers"""
+    return (key >> SEQUENCE_BITS, (key & ((1 << SEQUENCE_BITS) - 1)) - SEQUENCE_OFFSET)
+
+
+class ObservationIndex:
+    """Observations partitioned by child name, each partition sorted by date"""
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        # child name -> (sorted keys, records in the same order)
+        self._partitions = {}
+        # Records indexed so far; the next record's sequence number
+        self.size = 0
+        self.add_many(records)
+
+    def add_many(self, records):
+        """Index records that follow the already indexed ones in the store"""
+        with self._lock:
+            for record in records:
+                self._add(record)
+
+    def add(self, record):
+        with self._lock:
+            self._add(record)
+
+    def _add(self, record):
+        keys, partition = self._partitions.setdefault(record.get('child_name'), ([], []))
+        key = make_key(to_ordinal(record.get('date')), self.size)
+        if not keys or key > keys[-1]:
+            # Observations are usually recorded in date order: plain append
+            keys.append(key)
+            partition.append(record)
+        else:
+            # Back-dated entry: sequence numbers only grow, so it lands after that day's earlier saves
+            position = bisect_right(keys, key)
+            keys.insert(position, key)
+            partition.insert(position, record)
+        self.size += 1
+
+    def children(self):
+        """Names of all children with observations"""
+        with self._lock:
+            return [name for name in self._partitions if name is not None]
+
+    def count(self, child_name):
+        with self._lock:
+            keys, _ = self._partitions.get(child_name, ((), ()))
+            return len(keys)
+
+    def query(self, child_name, start_date=None, end_date=None, descending=False, limit=None, after=None):
+        """
+        Observations of one child between start_date and end_date (inclusive),
+        ordered by date. Observations with an unreadable date are only
+        returned when no start_date is given.
+        """
+        return [record for _, record in self.query_keyed(child_name, start_date, end_date, descending, limit, after)]
+
+    def query_keyed(self, child_name, start_date=None, end_date=None, descending=False, limit=None, after=None):
+        """
+        Like query(), but returns (cursor, record) pairs. Passing a pair's
+        cursor as after continues with the records that follow it.
+        """
+        with self._lock:
+            partition = self._partitions.get(child_name)
+            if partition is None:
+                return []
+            keys, records = partition
+            low = 0 if start_date is None else bisect_left(keys, make_key(to_ordinal(start_date), -SEQUENCE_OFFSET))
+            high = len(keys) if end_date is None else bisect_left(keys, make_key(to_ordinal(end_date) + 1, -SEQUENCE_OFFSET))
+            if after is not None:
+                after_key = make_key(*after)
+                if descending:
+                    high = min(high, bisect_left(keys, after_key))
+                else:
+                    low = max(low, bisect_right(keys, after_key))
+            if low >= high:
+                return []
+            if descending:
+                if limit is not None:
+                    low = max(low, high - limit)
+                selected = range(high - 1, low - 1, -1)
+            else:
+                if limit is not None:
+                    high = min(high, low + limit)
+                selected = range(low, high)
+            return [(split_key(keys[i]), records[i]) for i in selected]
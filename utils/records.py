@@ -0,0 +1,281 @@
+"""
+Typed record classes for stored predictions and parent observations.
+
+Records are slotted dataclasses, so they are smaller than the ~20-key dicts
+they replace and their fields are plain attributes. decode_prediction() and
+decode_observation() convert a stored dict once, parsing timestamps and
+dates at load time; keys outside the schema are kept in ``extra``.
+records_to_columns() / records_to_frame() turn a list of records into typed
+NumPy columns (datetime64, float64) for charts and statistics.
+
+Records also answer record['key'] and record.get('key'), so code written for
+the dicts keeps working. Note that date fields hold date/datetime objects.
+"""
+
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime
+from functools import lru_cache
+from operator import attrgetter
+import numpy as np
+import pandas as pd
+
+
+def _to_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(text):
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return None
+
+
+def _to_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    # Many records share a day, so parsed dates are memoized
+    return _parse_date(str(value))
+
+
+def _to_float(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value):
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def _to_bool(value):
+    return None if value is None else bool(value)
+
+
+def _to_list(value):
+    return list(value) if isinstance(value, (list, tuple)) else []
+
+
+# Field kind -> (decoder, NumPy dtype of the column)
+FIELD_KINDS = {
+    'datetime': (_to_datetime, 'datetime64[us]'),
+    'date': (_to_date, 'datetime64[D]'),
+    'float': (_to_float, 'float64'),
+    'int': (_to_int, 'float64'),
+    'bool': (_to_bool, 'float64'),
+    'str': (_to_str, object),
+    'list': (_to_list, object)
+}
+
+
+class _RecordMixin:
+    """Dict-style access and conversion shared by the record classes"""
+
+    # Keeps the record classes free of a per-instance __dict__
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key in self.SCHEMA:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self.SCHEMA:
+            value = getattr(self, key)
+            return default if value is None else value
+        return (self.extra or {}).get(key, default)
+
+    def __contains__(self, key):
+        return (key in self.SCHEMA and getattr(self, key) is not None) or bool(self.extra and key in self.extra)
+
+    def to_dict(self):
+        """The record as a storable dict, with dates back in ISO format"""
+        data = {}
+        for name in self.SCHEMA:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value.isoformat() if isinstance(value, (date, datetime)) else value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+@dataclass(slots=True)
+class PredictionRecord(_RecordMixin):
+    timestamp: datetime = None
+    student_name: str = None
+    grade_level: str = None
+    teacher_name: str = None
+    assessment_date: date = None
+    math_score: float = None
+    reading_score: float = None
+    writing_score: float = None
+    attendance: float = None
+    behavior: float = None
+    literacy: float = None
+    prediction: int = None
+    probability: float = None
+    risk_level: str = None
+    notes: str = None
+    extra: dict = field(default=None, repr=False)
+
+    SCHEMA = {
+        'timestamp': 'datetime', 'student_name': 'str', 'grade_level': 'str', 'teacher_name': 'str',
+        'assessment_date': 'date', 'math_score': 'float', 'reading_score': 'float', 'writing_score': 'float',
+        'attendance': 'float', 'behavior': 'float', 'literacy': 'float', 'prediction': 'int',
+        'probability': 'float', 'risk_level': 'str', 'notes': 'str'
+    }
+
+
+@dataclass(slots=True)
+class ObservationRecord(_RecordMixin):
+    child_name: str = None
+    date: date = None
+    timestamp: datetime = None
+    homework_completion: float = None
+    reading_time: float = None
+    focus_level: str = None
+    subjects_struggled: list = None
+    behavior_rating: float = None
+    mood_rating: float = None
+    sleep_hours: float = None
+    energy_level: str = None
+    social_interactions: str = None
+    learning_wins: str = None
+    challenges_faced: str = None
+    strategies_used: str = None
+    screen_time: float = None
+    physical_activity: float = None
+    medication_taken: bool = None
+    special_events: str = None
+    extra: dict = field(default=None, repr=False)
+
+    SCHEMA = {
+        'child_name': 'str', 'date': 'date', 'timestamp': 'datetime', 'homework_completion': 'float',
+        'reading_time': 'float', 'focus_level': 'str', 'subjects_struggled': 'list',
+        'behavior_rating': 'float', 'mood_rating': 'float', 'sleep_hours': 'float', 'energy_level': 'str',
+        'social_interactions': 'str', 'learning_wins': 'str', 'challenges_faced': 'str',
+        'strategies_used': 'str', 'screen_time': 'float', 'physical_activity': 'float',
+        'medication_taken': 'bool', 'special_events': 'str'
+    }
+
+
+# Per-kind expression for one field value {v}; the common, already-typed case is
+# handled inline and only unusual values fall back to the converter functions
+_INLINE_CONVERSIONS = {
+    'datetime': "_to_datetime({v})",
+    'date': "_to_date({v})",
+    'float': "(float({v}) if {v}.__class__ in _NUMBERS else _to_float({v}))",
+    'int': "({v} if {v}.__class__ is int else _to_int({v}))",
+    'bool': "(None if {v} is None else bool({v}))",
+    'str': "({v} if {v} is None or {v}.__class__ is str else str({v}))",
+    'list': "({v} if {v}.__class__ is list else _to_list({v}))"
+}
+
+
+def _make_decoder(record_class):
+    """
+    Generate a decoder specialised to a record class's SCHEMA.
+
+    The generated function reads each field once and converts it with
+    straight-line code, which decodes about twice as fast as looping over
+    per-field converter functions.
+    """
+    schema = record_class.SCHEMA
+    names = [f.name for f in fields(record_class) if f.name != 'extra']
+    if names != list(schema):
+        raise ValueError(f"{record_class.__name__} fields and SCHEMA differ")
+
+    lines = ["def decode(data):", "    get = data.get"]
+    arguments = []
+    for position, name in enumerate(names):
+        lines.append(f"    v{position} = get({name!r})")
+        arguments.append(_INLINE_CONVERSIONS[schema[name]].format(v=f"v{position}"))
+    # Keys outside the schema are kept rather than dropped
+    lines.append("    extra = None if _KNOWN.issuperset(data) else {key: value for key, value in data.items() if key not in _KNOWN}")
+    lines.append(f"    return _RECORD_CLASS({', '.join(arguments)}, extra)")
+
+    namespace = {
+        '_NUMBERS': (int, float), '_KNOWN': frozenset(names), '_RECORD_CLASS': record_class,
+        '_to_datetime': _to_datetime, '_to_date': _to_date, '_to_float': _to_float,
+        '_to_int': _to_int, '_to_list': _to_list
+    }
+    exec("\n".join(lines), namespace)
+    decode = namespace['decode']
+    decode.__name__ = f"decode_{record_class.__name__}"
+    return decode
+
+
+decode_prediction = _make_decoder(PredictionRecord)
+decode_observation = _make_decoder(ObservationRecord)
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_NAT_ORDINAL = -1
+
+
+def records_to_columns(records, columns=None):
+    """
+    Convert records into a dict of NumPy arrays, one per schema field.
+
+    Dates become datetime64 (missing values NaT) and numeric, int and bool
+    fields float64 (missing values NaN), ready for vectorized statistics.
+    """
+    if not records:
+        return {}
+    schema = type(records[0]).SCHEMA
+    names = list(columns or schema)
+    # One attrgetter pass per record, then transpose rows into columns
+    getter = attrgetter(*names)
+    rows = [getter(record) for record in records]
+    value_columns = zip(*rows) if len(names) > 1 else [rows]
+
+    result = {}
+    for name, values in zip(names, value_columns):
+        dtype = FIELD_KINDS[schema[name]][1]
+        if dtype == 'float64':
+            result[name] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        elif dtype == object:
+            column = np.empty(len(values), dtype=object)
+            column[:] = values
+            result[name] = column
+        elif dtype == 'datetime64[D]':
+            # Day numbers convert in one vectorized step; missing dates become NaT
+            ordinals = np.array([_NAT_ORDINAL if value is None else value.toordinal() for value in values], dtype=np.int64)
+            column = (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+            column[ordinals == _NAT_ORDINAL] = np.datetime64('NaT')
+            result[name] = column
+        else:
+            result[name] = pd.to_datetime(list(values)).to_numpy(dtype=dtype)
+    return result
+
+
+def records_to_frame(records, columns=None):
+    """DataFrame of the records' schema fields with typed columns (see records_to_columns)"""
+    if not records:
+        return pd.DataFrame(columns=list(columns or []))
+    return pd.DataFrame(records_to_columns(records, columns), copy=False)
@@ -0,0 +1,325 @@
+"""
+Tiered retention for the record journals in utils/data_utils.py.
+
+The journals only keep the current school term ("hot" data). When a process
+first uses a journal, and again once a new term has started, any records
+dated before the term are rolled into an immutable compressed segment under
+data/archive/<dataset>/ (zstd if the zstandard package is installed,
+otherwise gzip), and the journal is rewritten with the rest. Loading pages
+therefore parses one term of records, not years of history.
+
+data/archive/<dataset>/segments.json lists the segments in order, with the
+first and last day each covers, and the day the hot journal starts at
+(``hot_from``). Date-range queries that start before ``hot_from`` also read
+the overlapping segments.
+
+The journal swap is logged in the manifest before it happens, so a crash
+mid-rollover is finished by recover() on the next start.
+
+With the SQLite backend (utils/sqlite_store.py) roll_over_table() does the
+same for a table: the old rows go to a segment and are deleted in one write
+transaction, and a delete cut short by a crash is finished on the next
+rollover.
+
+Usage:
+    python -m utils.retention            # roll over anything older than this term
+    python -m utils.retention --before 2024-09-01
+"""
+
+import os
+import io
+import json
+import gzip
+import hashlib
+from datetime import date, datetime
+from functools import lru_cache
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+from utils import sqlite_store
+from utils.journal import read_journal_from
+
+ARCHIVE_DIR = "data/archive"
+MANIFEST_FILE = "segments.json"
+
+# Months in which a school term starts; the current term is kept hot
+TERM_START_MONTHS = tuple(sorted(int(month) for month in os.environ.get('EDUSCAN_TERM_START_MONTHS', '1,5,9').split(',')))
+ARCHIVE_CODEC = os.environ.get('EDUSCAN_ARCHIVE_CODEC', 'zstd' if ZSTD_AVAILABLE else 'gzip')
+SEGMENT_EXTENSIONS = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}
+
+
+def get_term_start(day=None):
+    """First day of the school term containing day (default today)"""
+    day = day or date.today()
+    started = [month for month in TERM_START_MONTHS if month <= day.month]
+    if started:
+        return date(day.year, started[-1], 1)
+    return date(day.year - 1, TERM_START_MONTHS[-1], 1)
+
+
+def record_day(record, date_key):
+    """ISO day of a record, or '' if it has none"""
+    value = record.get(date_key)
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    return str(value or '')[:10]
+
+
+def _archive_dir(dataset):
+    return os.path.join(ARCHIVE_DIR, dataset)
+
+
+def read_manifest(dataset):
+    try:
+        with open(os.path.join(_archive_dir(dataset), MANIFEST_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {'hot_from': None, 'segments': [], 'pending_journal': None, 'pending_rows': None}
+
+
+def _write_manifest(dataset, manifest):
+    manifest_path = os.path.join(_archive_dir(dataset), MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path)
+
+
+def _compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9)
+
+
+def _decompress(data, codec):
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read zstd archive segments (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return gzip.decompress(data)
+
+
+def _write_segment(dataset, records, date_key):
+    """Write records to a new immutable segment and return its manifest entry"""
+    days = [record_day(record, date_key) for record in records]
+    data = ''.join(json.dumps(record, default=str) + '\n' for record in records).encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    file_name = f"{min(days)}_{max(days)}_{digest[:12]}{SEGMENT_EXTENSIONS[ARCHIVE_CODEC]}"
+    file_path = os.path.join(_archive_dir(dataset), file_name)
+    tmp_path = f"{file_path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_compress(data, ARCHIVE_CODEC))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+    return {
+        'file': file_name,
+        'codec': ARCHIVE_CODEC,
+        'first_day': min(days),
+        'last_day': max(days),
+        'count': len(records),
+        'sha256': digest
+    }
+
+
+def read_segment(dataset, entry):
+    """All records of one archive segment. The list is shared; do not modify it."""
+    return _read_segment_file(os.path.join(_archive_dir(dataset), entry['file']), entry.get('codec', 'gzip'))
+
+
+# Segments never change once written (their names include a content hash),
+# so the most recently read ones are kept decoded
+@lru_cache(maxsize=8)
+def _read_segment_file(file_path, codec):
+    with open(file_path, 'rb') as f:
+        data = _decompress(f.read(), codec)
+    return [json.loads(line) for line in io.StringIO(data.decode('utf-8')) if line.strip()]
+
+
+def recover(dataset, journal_path):
+    """Finish a rollover that was interrupted after its segment was recorded"""
+    manifest = read_manifest(dataset)
+    pending = manifest.get('pending_journal')
+    if not pending:
+        return False
+    if os.path.exists(pending):
+        # The new hot journal was complete before it was logged; swap it in
+        os.replace(pending, journal_path)
+    manifest['pending_journal'] = None
+    _write_manifest(dataset, manifest)
+    print(f"Recovered interrupted {dataset} rollover")
+    return True
+
+
+def needs_roll_over(journal_path, date_key, cutoff=None):
+    """
+    Whether any record of the journal is dated before cutoff (default: start
+    of the current term). Records are not in date order (observations can be
+    back-dated), so the whole journal is scanned, stopping at the first old
+    record.
+    """
+    cutoff = (cutoff or get_term_start()).isoformat()
+    try:
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    day = record_day(json.loads(line), date_key)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash; the journal reader skips it too
+                    continue
+                if day and day < cutoff:
+                    return True
+    except OSError:
+        return False
+    return False
+
+
+def roll_over(dataset, journal, date_key, cutoff=None):
+    """
+    Move every record of the journal dated before cutoff (default: start of
+    the current term) into a new archive segment. Records without a date stay
+    hot. Returns the number of archived records.
+    """
+    cutoff = (cutoff or get_term_start()).isoformat()
+    os.makedirs(_archive_dir(dataset), exist_ok=True)
+
+    with journal.exclusive():
+        recover(dataset, journal.file_path)
+        records, _ = read_journal_from(journal.file_path)
+        archived, hot = [], []
+        for record in records:
+            day = record_day(record, date_key)
+            (archived if day and day < cutoff else hot).append(record)
+        if not archived:
+            return 0
+
+        entry = _write_segment(dataset, archived, date_key)
+
+        pending = f"{journal.file_path}.rollover"
+        with open(pending, 'w', encoding='utf-8') as f:
+            for record in hot:
+                f.write(json.dumps(record, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Log the segment and the pending swap together, then swap
+        manifest = read_manifest(dataset)
+        manifest['segments'].append(entry)
+        manifest['hot_from'] = max(filter(None, [manifest.get('hot_from'), cutoff]))
+        manifest['pending_journal'] = pending
+        _write_manifest(dataset, manifest)
+
+        os.replace(pending, journal.file_path)
+        manifest['pending_journal'] = None
+        _write_manifest(dataset, manifest)
+
+    print(f"Archived {len(archived)} {dataset} records dated before {cutoff} to {entry['file']}")
+    return len(archived)
+
+
+def _finish_row_delete(dataset, conn):
+    """Delete the rows of a table rollover whose segment was recorded but whose delete never committed"""
+    manifest = read_manifest(dataset)
+    pending = manifest.get('pending_rows')
+    if not pending:
+        return
+    sqlite_store.delete_rows_dated_before(conn, pending['table'], pending['before'], pending['last_id'])
+    manifest['pending_rows'] = None
+    _write_manifest(dataset, manifest)
+
+
+def roll_over_table(dataset, table, date_key, cutoff=None, db_path=None):
+    """
+    SQLite backend counterpart of roll_over(): move every row of the table
+    dated before cutoff (default: start of the current term) into a new
+    archive segment. Returns the number of archived rows.
+    """
+    cutoff = (cutoff or get_term_start()).isoformat()
+    os.makedirs(_archive_dir(dataset), exist_ok=True)
+
+    # The write lock is held throughout, so no other process rolls over or
+    # saves between reading the rows and deleting them
+    with sqlite_store.write_transaction(db_path) as conn:
+        _finish_row_delete(dataset, conn)
+        rows = sqlite_store.rows_dated_before(conn, table, cutoff)
+        if not rows:
+            return 0
+        entry = _write_segment(dataset, [record for _, record in rows], date_key)
+        entry['table'] = table
+
+        # Log the segment and the delete together; if the delete does not
+        # commit, the next rollover finishes it
+        manifest = read_manifest(dataset)
+        manifest['segments'].append(entry)
+        manifest['hot_from'] = max(filter(None, [manifest.get('hot_from'), cutoff]))
+        manifest['pending_rows'] = {'table': table, 'before': cutoff, 'last_id': rows[-1][0]}
+        _write_manifest(dataset, manifest)
+        sqlite_store.delete_rows_dated_before(conn, table, cutoff, rows[-1][0])
+
+    with sqlite_store.write_transaction(db_path):
+        manifest = read_manifest(dataset)
+        manifest['pending_rows'] = None
+        _write_manifest(dataset, manifest)
+
+    print(f"Archived {len(rows)} {dataset} rows dated before {cutoff} to {entry['file']}")
+    return len(rows)
+
+
+def get_hot_from(dataset):
+    """First day kept in the hot journal, or None if nothing was archived yet"""
+    return read_manifest(dataset).get('hot_from')
+
+
+def archived_count(dataset):
+    return sum(entry['count'] for entry in read_manifest(dataset)['segments'])
+
+
+def iter_archive(dataset, start_day=None, end_day=None, skip=0):
+    """
+    Yield (position, record) for archived records, oldest segment first.
+
+    position counts records across all segments. Segments entirely outside
+    start_day..end_day (ISO strings, inclusive) or before skip are not read.
+    """
+    position = 0
+    for entry in read_manifest(dataset)['segments']:
+        count = entry['count']
+        outside = ((start_day and entry['last_day'] < start_day) or
+                   (end_day and entry['first_day'] > end_day) or
+                   position + count <= skip)
+        if not outside:
+            try:
+                records = read_segment(dataset, entry)
+            except Exception as e:
+                print(f"Error reading archive segment {entry['file']}: {e}")
+                records = []
+            for offset, record in enumerate(records):
+                if position + offset >= skip:
+                    yield position + offset, record
+        position += count
+
+
+if __name__ == "__main__":
+    import argparse
+    from utils import data_utils
+
+    parser = argparse.ArgumentParser(description="Move records older than the current term into archive segments")
+    parser.add_argument('--before', default=None, help="Archive records dated before this ISO day (default: start of the current term)")
+    args = parser.parse_args()
+
+    cutoff = date.fromisoformat(args.before) if args.before else None
+    for name, (journal_path, legacy_path, date_key) in data_utils.RETENTION_DATASETS.items():
+        if data_utils.STORAGE_BACKEND == 'sqlite':
+            data_utils._get_sqlite_store()
+            archived = roll_over_table(name, data_utils.SQLITE_TABLES[name], date_key, cutoff)
+        else:
+            archived = roll_over(name, data_utils._get_journal(journal_path, legacy_path), date_key, cutoff)
+        print(f"{name}: {archived} records archived")
@@ -0,0 +1,234 @@
+"""
+Embedded SQLite storage backend for prediction and observation records.
+
+Selected in utils/data_utils.py with EDUSCAN_STORAGE_BACKEND=sqlite. The
+database runs in WAL mode, so page reads never block on a concurrent save.
+Each record is stored whole as JSON, next to the few columns the pages
+filter on, which are indexed:
+
+    predictions (student_name, timestamp), (timestamp)
+    parent_observations (child_name, date), (date)
+
+Per-student and per-child lookups and date ranges are therefore index
+range scans rather than full scans of the history.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_DB_FILE = "data/eduscan.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    student_name TEXT,
+    timestamp TEXT,
+    risk_level TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_student_timestamp ON predictions (student_name, timestamp);
+CREATE INDEX IF NOT EXISTS idx_predictions_timestamp ON predictions (timestamp);
+
+CREATE TABLE IF NOT EXISTS parent_observations (
+    id INTEGER PRIMARY KEY,
+    child_name TEXT,
+    date TEXT,
+    timestamp TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_observations_child_date ON parent_observations (child_name, date);
+CREATE INDEX IF NOT EXISTS idx_observations_date ON parent_observations (date);
+"""
+
+# Date column of each table that term retention (utils/retention.py) cuts on
+DATE_COLUMNS = {'predictions': 'timestamp', 'parent_observations': 'date'}
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_initialized_paths = set()
+
+
+def get_db_path():
+    """Database file, overridable with EDUSCAN_SQLITE_PATH"""
+    return os.environ.get('EDUSCAN_SQLITE_PATH', DEFAULT_DB_FILE)
+
+
+def get_connection(db_path=None):
+    """
+    Return this thread's connection to the database, creating the schema
+    on first use. sqlite3 connections cannot be shared between threads, so
+    each Streamlit session thread keeps its own.
+    """
+    db_path = db_path or get_db_path()
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives application crashes; only an OS crash can lose the last commits
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with _schema_lock:
+            if db_path not in _initialized_paths:
+                conn.executescript(SCHEMA)
+                _initialized_paths.add(db_path)
+        connections[db_path] = conn
+    return conn
+
+
+def close_connections():
+    """Close the connections opened by the current thread"""
+    for conn in getattr(_local, 'connections', {}).values():
+        conn.close()
+    _local.connections = {}
+
+
+def _prediction_row(record):
+    return (record.get('student_name'), _as_text(record.get('timestamp')),
+            record.get('risk_level'), json.dumps(record, default=str))
+
+
+def _observation_row(record):
+    return (record.get('child_name'), _as_text(record.get('date')),
+            _as_text(record.get('timestamp')), json.dumps(record, default=str))
+
+
+def _as_text(value):
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def insert_predictions(records, db_path=None):
+    """Insert prediction records in one transaction"""
+    conn = get_connection(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO predictions (student_name, timestamp, risk_level, record) VALUES (?, ?, ?, ?)",
+            [_prediction_row(record) for record in records]
+        )
+    return True
+
+
+def insert_observations(records, db_path=None):
+    """Insert parent observation records in one transaction"""
+    conn = get_connection(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO parent_observations (child_name, date, timestamp, record) VALUES (?, ?, ?, ?)",
+            [_observation_row(record) for record in records]
+        )
+    return True
+
+
+def count_rows(table, db_path=None):
+    if table not in ('predictions', 'parent_observations'):
+        raise ValueError(f"Unknown table: {table}")
+    return get_connection(db_path).execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def iter_rows_from(table, first_id=0, db_path=None):
+    """
+    Yield (id, record) for the rows with id >= first_id, in insertion order.
+    Rows are only ever appended, so an id works as a watermark for readers
+    that pick up where they stopped, until a term rollover
+    (utils/retention.py) deletes rows.
+    """
+    if table not in ('predictions', 'parent_observations'):
+        raise ValueError(f"Unknown table: {table}")
+    cursor = get_connection(db_path).execute(f"SELECT id, record FROM {table} WHERE id >= ? ORDER BY id", (int(first_id),))
+    for row_id, record in cursor:
+        yield row_id, json.loads(record)
+
+
+@contextmanager
+def write_transaction(db_path=None):
+    """
+    Run the block in one transaction that holds the database's write lock
+    from the start, so no other connection writes in between. Commits when
+    the block completes, rolls back if it raises.
+    """
+    conn = get_connection(db_path)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+
+
+def rows_dated_before(conn, table, cutoff):
+    """(id, record) of the rows whose date column is before the ISO day cutoff, in id order"""
+    column = DATE_COLUMNS[table]
+    cursor = conn.execute(f"SELECT id, record FROM {table} WHERE {column} != '' AND {column} < ? ORDER BY id", (cutoff,))
+    return [(row_id, json.loads(record)) for row_id, record in cursor]
+
+
+def delete_rows_dated_before(conn, table, cutoff, last_id):
+    """Delete what rows_dated_before() returned: the rows up to last_id dated before cutoff"""
+    column = DATE_COLUMNS[table]
+    conn.execute(f"DELETE FROM {table} WHERE {column} != '' AND {column} < ? AND id <= ?", (cutoff, int(last_id)))
+
+
+def _run_query(table, conditions, params, order_column, descending, limit, after, db_path):
+    """Yield ((order value, id), record) pairs; the pair's key is a keyset pagination cursor"""
+    conditions, params = list(conditions), list(params)
+    if after is not None:
+        conditions.append(f"({order_column}, id) {'<' if descending else '>'} (?, ?)")
+        params.extend(after)
+    sql = f"SELECT {order_column}, id, record FROM {table}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    # id breaks ties so records saved in the same instant keep insertion order
+    direction = "DESC" if descending else "ASC"
+    sql += f" ORDER BY {order_column} {direction}, id {direction}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    cursor = get_connection(db_path).execute(sql, params)
+    for order_value, row_id, record in cursor:
+        yield (order_value, row_id), json.loads(record)
+
+
+def query_predictions(student_name=None, start=None, end=None, risk_level=None,
+                      descending=False, limit=None, after=None, db_path=None):
+    """
+    Yield (cursor, record) pairs for the matching predictions, ordered by timestamp.
+
+    start and end are ISO timestamp bounds (end exclusive); utils/data_utils.py
+    turns date ranges into these. after continues from a previous cursor.
+    """
+    conditions, params = [], []
+    if student_name is not None:
+        conditions.append("student_name = ?")
+        params.append(student_name)
+    if start is not None:
+        conditions.append("timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("timestamp < ?")
+        params.append(end)
+    if risk_level is not None:
+        conditions.append("risk_level = ?")
+        params.append(risk_level)
+    return _run_query('predictions', conditions, params, "timestamp", descending, limit, after, db_path)
+
+
+def query_observations(child_name=None, start_date=None, end_date=None,
+                       descending=False, limit=None, after=None, db_path=None):
+    """Yield (cursor, record) pairs for the matching observations, ordered by date (bounds inclusive)"""
+    conditions, params = [], []
+    if child_name is not None:
+        conditions.append("child_name = ?")
+        params.append(child_name)
+    if start_date is not None:
+        conditions.append("date >= ?")
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append("date <= ?")
+        params.append(end_date)
+    return _run_query('parent_observations', conditions, params, "date", descending, limit, after, db_path)
@@ -0,0 +1,352 @@
+"""
+Offline outbox that syncs locally saved records to PostgreSQL.
+
+When DATABASE_URL is set, every prediction and parent observation saved
+through utils/data_utils.py is also appended to a local outbox journal
+(data/sync_outbox.jsonl) with a unique record uid. A background thread
+replays the outbox to PostgreSQL in batches whenever offline mode is off,
+so saves never wait on the network:
+
+- each batch is one transaction (utils/db_utils.py write_* functions); rows
+  whose record uid is already stored are skipped, so replaying a batch after
+  a crash or a lost reply never duplicates it;
+- if the database cannot be reached, retries back off exponentially;
+- a batch rejected for its data is retried record by record, and records
+  the database refuses are moved to data/sync_rejected.jsonl instead of
+  blocking the queue.
+
+data/sync_state.json records how far the outbox has been synced. The
+record_uid columns come from migration 3 in utils/db_migrations.py; until
+it is applied nothing is sent and the sync status reports the outdated
+schema.
+
+Usage:
+    python -m utils.sync_utils           # sync now, ignoring offline mode and backoff
+    python -m utils.sync_utils --status
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import threading
+from datetime import datetime, date
+
+from utils.journal import Journal, read_journal_from
+from utils.language_utils import load_app_settings
+
+try:
+    import psycopg2
+    from utils.db_utils import db_connection, write_predictions, write_parent_observations, invalidate_database_stats
+    POSTGRES_AVAILABLE = True
+    # Errors caused by the records themselves rather than by the connection
+    RECORD_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError, ValueError, TypeError)
+except ImportError:
+    POSTGRES_AVAILABLE = False
+
+OUTBOX_FILE = "data/sync_outbox.jsonl"
+SYNC_STATE_FILE = "data/sync_state.json"
+REJECTED_FILE = "data/sync_rejected.jsonl"
+
+SYNC_BATCH_SIZE = int(os.environ.get('EDUSCAN_SYNC_BATCH_SIZE', '200'))
+# Seconds between outbox checks of the background thread
+SYNC_INTERVAL = float(os.environ.get('EDUSCAN_SYNC_INTERVAL', '15'))
+# Retry delays after failed syncs: BASE, 2*BASE, 4*BASE, ... up to MAX seconds
+SYNC_BACKOFF_BASE = float(os.environ.get('EDUSCAN_SYNC_BACKOFF_BASE', '5'))
+SYNC_BACKOFF_MAX = float(os.environ.get('EDUSCAN_SYNC_BACKOFF_MAX', '600'))
+# A fully synced outbox larger than this is emptied
+OUTBOX_COMPACT_BYTES = int(os.environ.get('EDUSCAN_SYNC_COMPACT_BYTES', str(1024 * 1024)))
+
+# Migration (utils/db_migrations.py) that added the record_uid columns the writes rely on
+REQUIRED_SCHEMA_VERSION = 3
+
+# Record kind -> cursor-level writer
+_WRITERS = {
+    'prediction': lambda cur, records, uids: write_predictions(cur, records, uids),
+    'observation': lambda cur, records, uids: write_parent_observations(cur, records, uids)
+}
+
+_outbox = None
+_outbox_lock = threading.Lock()
+_sync_lock = threading.Lock()
+_worker = None
+_wakeup = threading.Event()
+# Set once the database schema was found new enough in this process
+_schema_ready = False
+
+
+class SchemaOutdatedError(RuntimeError):
+    """Raised when the database lacks the migrations the outbox writes need"""
+
+
+def _get_outbox():
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Journal(OUTBOX_FILE)
+            # Entries are written before the save returns and fsynced in the background
+            _outbox.enable_write_behind()
+        return _outbox
+
+
+def _read_state():
+    try:
+        with open(SYNC_STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {'offset': 0, 'skip': 0, 'failures': 0, 'next_attempt': 0.0,
+                'last_error': None, 'last_synced_at': None, 'synced': 0, 'rejected': 0}
+
+
+def _write_state(state):
+    tmp_path = f"{SYNC_STATE_FILE}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, SYNC_STATE_FILE)
+
+
+def is_offline():
+    """Whether offline mode is switched on in the app settings"""
+    return bool(load_app_settings().get('offline_mode', False))
+
+
+def enqueue(kind, record):
+    """
+    Queue a locally saved record for PostgreSQL. kind is 'prediction' or
+    'observation'. Returns immediately; the background thread does the sync.
+    """
+    return enqueue_many(kind, [record])[0]
+
+
+def enqueue_many(kind, records):
+    """Queue several records with one outbox write (e.g. a Batch Upload). Returns their uids."""
+    if kind not in _WRITERS:
+        raise ValueError(f"Unknown record kind: {kind}")
+    entries = []
+    for record in records:
+        record = dict(record)
+        # The conflict check compares (uid, timestamp/date), so replays must not fall back to "now"
+        record.setdefault('timestamp', datetime.now().isoformat())
+        if kind == 'observation':
+            record.setdefault('date', date.today().isoformat())
+        entries.append({'uid': uuid.uuid4().hex, 'kind': kind, 'record': record, 'queued_at': datetime.now().isoformat()})
+    if entries:
+        _get_outbox().append_many(entries, sync=False)
+        start_sync_worker()
+        _wakeup.set()
+    return [entry['uid'] for entry in entries]
+
+
+def _pending_entries(state):
+    entries, end_offset = read_journal_from(OUTBOX_FILE, state['offset'])
+    return entries[state['skip']:], end_offset
+
+
+def _backoff(state, error):
+    state['failures'] += 1
+    delay = min(SYNC_BACKOFF_MAX, SYNC_BACKOFF_BASE * 2 ** (state['failures'] - 1))
+    # Jitter keeps many schools coming back online from retrying in lockstep
+    state['next_attempt'] = time.time() + delay * random.uniform(0.5, 1.0)
+    state['last_error'] = str(error)
+    print(f"Database sync failed, retrying in about {delay:.0f}s: {error}")
+
+
+def _check_schema(conn):
+    """Raise SchemaOutdatedError unless migration REQUIRED_SCHEMA_VERSION is applied"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass('schema_migrations')")
+    version = None
+    if cur.fetchone()[0] is not None:
+        cur.execute("SELECT MAX(version) FROM schema_migrations")
+        version = cur.fetchone()[0]
+    conn.rollback()
+    if version is None or version < REQUIRED_SCHEMA_VERSION:
+        raise SchemaOutdatedError(
+            f"Database schema is at version {version or 0} but the outbox needs version "
+            f"{REQUIRED_SCHEMA_VERSION}; run python -m utils.db_migrations"
+        )
+    _schema_ready = True
+
+
+def _write_batch(conn, batch):
+    """Write one batch in one transaction. Returns the number of new rows."""
+    cur = conn.cursor()
+    inserted = 0
+    for kind, writer in _WRITERS.items():
+        entries = [entry for entry in batch if entry['kind'] == kind]
+        if entries:
+            inserted += writer(cur, [entry['record'] for entry in entries], [entry['uid'] for entry in entries])
+    conn.commit()
+    return inserted
+
+
+def _reject(entry, error):
+    with open(REJECTED_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({**entry, 'error': str(error), 'rejected_at': datetime.now().isoformat()}, default=str) + '\n')
+    print(f"Database rejected queued {entry['kind']} {entry['uid']}: {error}")
+
+
+def _write_batch_or_split(conn, batch):
+    """
+    Write a batch; if the database rejects its data, retry the records one
+    by one and set aside those it still rejects. Connection errors propagate.
+    Returns (rows inserted, records rejected).
+    """
+    try:
+        return _write_batch(conn, batch), 0
+    except RECORD_ERRORS:
+        conn.rollback()
+    inserted = rejected = 0
+    for entry in batch:
+        try:
+            inserted += _write_batch(conn, [entry])
+        except RECORD_ERRORS as e:
+            conn.rollback()
+            _reject(entry, e)
+            rejected += 1
+    return inserted, rejected
+
+
+def sync_now(force=False):
+    """
+    Replay the pending outbox entries to PostgreSQL.
+
+    Unless force is True, nothing is sent while offline mode is on or a
+    retry is backing off. Returns the number of entries synced, or None if
+    the sync did not run or failed.
+    """
+    global _schema_ready
+    if not POSTGRES_AVAILABLE:
+        return None
+    if not force and is_offline():
+        return None
+    with _sync_lock:
+        state = _read_state()
+        if not force and time.time() < state['next_attempt']:
+            return None
+        if os.path.exists(OUTBOX_FILE) and state['offset'] > os.path.getsize(OUTBOX_FILE):
+            # The outbox was emptied after its entries were synced
+            state['offset'], state['skip'] = 0, 0
+        entries, end_offset = _pending_entries(state)
+        if not entries:
+            if (state['offset'], state['skip']) != (end_offset, 0):
+                state['offset'], state['skip'] = end_offset, 0
+                _write_state(state)
+            _compact(state, end_offset)
+            return 0
+
+        synced = 0
+        with db_connection() as conn:
+            if not conn:
+                _backoff(state, "database unavailable")
+                _write_state(state)
+                return None
+            try:
+                _check_schema(conn)
+                for start in range(0, len(entries), SYNC_BATCH_SIZE):
+                    batch = entries[start:start + SYNC_BATCH_SIZE]
+                    inserted, rejected = _write_batch_or_split(conn, batch)
+                    synced += len(batch) - rejected
+                    state['synced'] += inserted
+                    state['rejected'] += rejected
+                    # Progress is saved per batch; a crash here only replays already stored uids
+                    state['skip'] += len(batch)
+                    _write_state(state)
+            except Exception as e:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                if isinstance(e, psycopg2.ProgrammingError):
+                    # e.g. a missing record_uid column: check the schema again on the next attempt
+                    _schema_ready = False
+                    e = SchemaOutdatedError(f"Database schema does not match the outbox ({e}); "
+                                            f"run python -m utils.db_migrations")
+                _backoff(state, e)
+                _write_state(state)
+                return None
+
+        state['offset'], state['skip'] = end_offset, 0
+        state['failures'], state['next_attempt'], state['last_error'] = 0, 0.0, None
+        state['last_synced_at'] = datetime.now().isoformat()
+        _write_state(state)
+        _compact(state, end_offset)
+    invalidate_database_stats()
+    return synced
+
+
+def _compact(state, end_offset):
+    """Empty a large outbox once everything in it is synced"""
+    if end_offset < OUTBOX_COMPACT_BYTES or state['skip']:
+        return
+    outbox = _get_outbox()
+    with outbox.exclusive():
+        if os.path.getsize(OUTBOX_FILE) != end_offset:
+            # New entries arrived meanwhile; compact on a later pass
+            return
+        # The state is reset first: a crash before the truncate only replays synced uids
+        state['offset'] = 0
+        _write_state(state)
+        os.truncate(OUTBOX_FILE, 0)
+
+
+def get_sync_status():
+    """Pending entry count, last sync, last error and retry time of the outbox"""
+    state = _read_state()
+    try:
+        pending = len(_pending_entries(state)[0])
+    except Exception:
+        pending = 0
+    return {
+        'pending': pending,
+        'offline': is_offline(),
+        'synced': state['synced'],
+        'rejected': state['rejected'],
+        'last_synced_at': state['last_synced_at'],
+        'last_error': state['last_error'],
+        'next_attempt': datetime.fromtimestamp(state['next_attempt']).isoformat() if state['next_attempt'] else None
+    }
+
+
+def _sync_loop():
+    while True:
+        # Woken early by new entries, otherwise checks every SYNC_INTERVAL
+        _wakeup.wait(SYNC_INTERVAL)
+        _wakeup.clear()
+        try:
+            sync_now()
+        except Exception as e:
+            print(f"Error syncing outbox: {e}")
+
+
+def start_sync_worker():
+    """Start the background sync thread (once per process)"""
+    global _worker
+    if not POSTGRES_AVAILABLE:
+        return False
+    with _outbox_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_sync_loop, name="outbox-sync", daemon=True)
+            _worker.start()
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sync the offline outbox to PostgreSQL")
+    parser.add_argument('--status', action='store_true', help="Show the outbox status and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        for key, value in get_sync_status().items():
+            print(f"{key}: {value}")
+    else:
+        result = sync_now(force=True)
+        print("Sync failed; see the error above" if result is None else f"Synced {result} record(s)")
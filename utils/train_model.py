@@ -0,0 +1,257 @@
+"""
+Reproducible training entry point for the learning difficulty model.
+
+Reproduces the pipeline of ``Model_train_ (3).ipynb``: StandardScaler over the
+six numeric predictors, an 80/20 split with random_state=42 and a 5-fold,
+F1-scored grid search over a RandomForestClassifier. Every (parameters, fold)
+cell is scored in parallel across all cores and cached on disk, so rerunning
+with an extended grid only computes the new cells. The result is written as
+the full bundle load_model() expects: the model package pickle, scaler.pkl,
+the 20% test split (test_split.npz) and a checksummed model_bundle.json (see
+utils/model_registry.py) whose metadata includes impurity and permutation
+importances on that test split.
+
+Usage:
+    python -m utils.train_model --data student_learning_dataset.csv
+    python -m utils.train_model --data data.csv --grid '{"n_estimators": [100, 200, 400]}'
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+
+from utils.model_registry import (
+    USER_MODEL_FILE, DEFAULT_SCALER_FILE, TEST_SPLIT_FILE, write_bundle_manifest, normalize_feature_order,
+    compute_feature_importances, compute_permutation_importance, save_test_split
+)
+
+# Columns and target used by the notebook
+SELECTED_COLUMNS = ['Math_Score', 'Reading_Score', 'Writing_Score', 'Attendance_Rate', 'Behavior_Score', 'Literacy_Level']
+TARGET_COLUMN = 'Risk_Label'
+
+# The notebook's GridSearchCV grid
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [100, 200],
+    'max_depth': [None, 10],
+    'min_samples_split': [2, 5],
+    'min_samples_leaf': [1, 2]
+}
+
+CV_FOLDS = 5
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+
+def load_dataset(csv_path):
+    """Load and clean the training CSV the same way the notebook does"""
+    df = pd.read_csv(csv_path)
+    df.columns = df.columns.str.strip().str.replace(" ", "_")
+    missing_columns = [col for col in SELECTED_COLUMNS + [TARGET_COLUMN] if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+    return df[SELECTED_COLUMNS], df[TARGET_COLUMN]
+
+
+def expand_grid(param_grid):
+    """List every parameter combination, in the same order as sklearn's ParameterGrid"""
+    combinations = [{}]
+    for name in sorted(param_grid):
+        combinations = [dict(combo, **{name: value}) for combo in combinations for value in param_grid[name]]
+    return combinations
+
+
+def _dataset_fingerprint(X, y):
+    """Hash the exact training arrays and CV setup, so cached scores are never reused for other data"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y).astype(np.int64).tobytes())
+    digest.update(f"{CV_FOLDS}-{RANDOM_STATE}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _cell_key(params, fold):
+    # Parameters at the estimator's default do not change the fit, so a grid
+    # extended with a default value still finds the cells cached before
+    defaults = RandomForestClassifier(random_state=RANDOM_STATE).get_params()
+    effective = {name: value for name, value in params.items() if name not in defaults or defaults[name] != value}
+    return f"{json.dumps(effective, sort_keys=True)}|{fold}"
+
+
+def _load_cache(cache_path):
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            print(f"Warning: ignoring unreadable fold cache {cache_path}")
+    return {}
+
+
+def _save_cache(cache_path, cache):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, cache_path)
+
+
+def _score_cell(estimator, params, X, y, train_idx, val_idx):
+    """Fit one grid cell on one fold and return its F1 score"""
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train_idx], y[train_idx])
+    return float(f1_score(y[val_idx], model.predict(X[val_idx])))
+
+
+def cached_grid_search(X, y, param_grid, cache_dir=None, n_jobs=-1):
+    """
+    Grid search with per-(params, fold) result caching.
+
+    Equivalent to GridSearchCV(rf, param_grid, cv=5, scoring='f1') but only
+    cells missing from the cache are computed.
+
+    Returns:
+        tuple: (best_params, results) where results is a list of dicts with
+            params, mean_score and fold scores, in grid order.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    estimator = RandomForestClassifier(random_state=RANDOM_STATE)
+    folds = list(StratifiedKFold(n_splits=CV_FOLDS).split(X, y))
+    candidates = expand_grid(param_grid)
+
+    cache_path = os.path.join(cache_dir, f"folds-{_dataset_fingerprint(X, y)}.json") if cache_dir else None
+    cache = _load_cache(cache_path)
+
+    missing = [(params, fold) for params in candidates for fold in range(len(folds))
+               if _cell_key(params, fold) not in cache]
+    print(f"Grid search: {len(candidates)} candidates x {len(folds)} folds, "
+          f"{len(missing)} cells to compute, {len(candidates) * len(folds) - len(missing)} cached")
+
+    if missing:
+        scores = Parallel(n_jobs=n_jobs)(
+            delayed(_score_cell)(estimator, params, X, y, folds[fold][0], folds[fold][1])
+            for params, fold in missing
+        )
+        for (params, fold), score in zip(missing, scores):
+            cache[_cell_key(params, fold)] = score
+        if cache_path:
+            _save_cache(cache_path, cache)
+
+    results = []
+    for params in candidates:
+        fold_scores = [cache[_cell_key(params, fold)] for fold in range(len(folds))]
+        results.append({'params': params, 'mean_score': float(np.mean(fold_scores)), 'fold_scores': fold_scores})
+
+    # Like GridSearchCV, ties go to the first candidate in grid order
+    best = max(results, key=lambda result: result['mean_score'])
+    return best['params'], results
+
+
+def train(csv_path, output_dir, param_grid=None, cache_dir=None, version=None, n_jobs=-1):
+    """
+    Run the full notebook pipeline and write the model bundle to output_dir.
+
+    Returns:
+        dict: The bundle metadata (best parameters, CV score and test metrics)
+    """
+    X, y = load_dataset(csv_path)
+
+    # Same order as the notebook: scale all rows, then split
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+    best_params, results = cached_grid_search(X_train, y_train, param_grid or DEFAULT_PARAM_GRID, cache_dir, n_jobs)
+
+    model = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=n_jobs, **best_params)
+    model.fit(X_train, y_train)
+    # Serve single predictions without thread dispatch overhead
+    model.set_params(n_jobs=None)
+
+    y_pred = model.predict(X_test)
+    y_prob = model.predict_proba(X_test)[:, 1]
+    metrics = {
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'precision': float(precision_score(y_test, y_pred)),
+        'recall': float(recall_score(y_test, y_pred)),
+        'f1': float(f1_score(y_test, y_pred)),
+        'roc_auc': float(roc_auc_score(y_test, y_prob))
+    }
+
+    version = version or datetime.now().strftime('%Y.%m.%d')
+    feature_order = normalize_feature_order(SELECTED_COLUMNS)
+    model_package = {
+        'model': model,
+        'scaler': scaler,
+        'feature_names': list(SELECTED_COLUMNS),
+        'feature_order': list(SELECTED_COLUMNS),
+        'model_type': 'RandomForestClassifier',
+        'version': version,
+        'trained_on': os.path.basename(csv_path)
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, USER_MODEL_FILE)
+    scaler_path = os.path.join(output_dir, DEFAULT_SCALER_FILE)
+    for path, obj in ((model_path, model_package), (scaler_path, scaler)):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(obj, f)
+        os.replace(tmp_path, path)
+    # Kept with the bundle so importances can be recomputed on the real held-out rows
+    test_split_path = os.path.join(output_dir, TEST_SPLIT_FILE)
+    save_test_split(test_split_path, X_test, y_test)
+
+    metadata = {
+        'trained_at': datetime.now().isoformat(),
+        'trained_on': os.path.basename(csv_path),
+        'n_samples': int(len(X)),
+        'best_params': best_params,
+        'cv_f1': max(result['mean_score'] for result in results),
+        'test_metrics': metrics,
+        # Importances are computed once here so the app reads them without touching the model
+        'feature_importances': compute_feature_importances(model, feature_order),
+        'permutation_importance': compute_permutation_importance(model, X_test, np.asarray(y_test), feature_order),
+        'permutation_importance_source': 'test_split'
+    }
+    write_bundle_manifest(model_path, scaler_path, version=version, feature_order=SELECTED_COLUMNS, metadata=metadata,
+                          test_split_path=test_split_path)
+    return metadata
+
+
+def main():
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Train the learning difficulty model and write its bundle")
+    parser.add_argument('--data', required=True, help="Training CSV with the notebook's columns")
+    parser.add_argument('--output', default=os.path.join(base_path, 'data'), help="Directory for the model bundle")
+    parser.add_argument('--grid', default=None, help="JSON parameter grid; merged over the notebook's grid")
+    parser.add_argument('--cache-dir', default=os.path.join(base_path, 'data', 'train_cache'),
+                        help="Where fold results are cached ('' disables caching)")
+    parser.add_argument('--version', default=None, help="Bundle version (defaults to today's date)")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    param_grid = dict(DEFAULT_PARAM_GRID)
+    if args.grid:
+        param_grid.update(json.loads(args.grid))
+
+    metadata = train(args.data, args.output, param_grid, args.cache_dir or None, args.version, args.n_jobs)
+    print(f"Best parameters: {metadata['best_params']} (CV F1 {metadata['cv_f1']:.3f})")
+    for name, value in metadata['test_metrics'].items():
+        print(f"{name.capitalize()}: {value:.3f}")
+    print(f"Model bundle written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()